@@ -0,0 +1,133 @@
+"""Partition driver_data by created_at
+
+Revision ID: 63c42bfdca29
+Revises: 89acf99799d3
+Create Date: 2026-10-17 23:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '63c42bfdca29'
+down_revision: Union[str, None] = '89acf99799d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Number of daily partitions created ahead of today by the migration, the API keeps extending them
+DAYS_AHEAD = 7
+
+# Creates the missing daily partitions `driver_data_pYYYYMMDD` for every day in [first_day, last_day]
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION driver_data_create_partitions(first_day date, last_day date) RETURNS integer AS $$
+DECLARE
+    partition_day date := first_day;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    WHILE partition_day <= last_day LOOP
+        partition_name := 'driver_data_p' || to_char(partition_day, 'YYYYMMDD');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF driver_data FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, partition_day, partition_day + 1);
+            created := created + 1;
+        END IF;
+        partition_day := partition_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Drops the daily partitions of days before before_day, which is how old data is removed
+DROP_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION driver_data_drop_partitions(before_day date) RETURNS integer AS $$
+DECLARE
+    partition_name text;
+    dropped integer := 0;
+BEGIN
+    FOR partition_name IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'driver_data'
+          AND child.relname ~ '^driver_data_p[0-9]{8}$'
+          AND to_date(right(child.relname, 8), 'YYYYMMDD') < before_day
+    LOOP
+        EXECUTE format('DROP TABLE %I', partition_name);
+        dropped := dropped + 1;
+    END LOOP;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.rename_table('driver_data', 'driver_data_unpartitioned')
+
+    op.create_table(
+        'driver_data',
+        sa.Column('id', sa.UUID(as_uuid=True), nullable=False),
+        sa.Column('driver_id', sa.UUID(as_uuid=True)),
+        sa.Column('latitude', sa.Float),
+        sa.Column('longitude', sa.Float),
+        sa.Column('altitude', sa.Float),
+        sa.Column('speed', sa.Float),
+        sa.Column('is_correct', sa.Boolean),
+        sa.Column('created_at', sa.DateTime, nullable=False, server_default=sa.func.now()),
+        # The partition key has to be part of the primary key
+        sa.PrimaryKeyConstraint('id', 'created_at', name='pk_driver_data'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    # Catches rows outside the created partitions, e.g. with a clock far in the future
+    op.execute("CREATE TABLE driver_data_default PARTITION OF driver_data DEFAULT")
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+    op.execute(DROP_PARTITIONS_FUNCTION)
+
+    # Indexes on the parent are created on every partition, including future ones
+    op.create_index('idx_driver_data_driver_id_created_at', 'driver_data', ['driver_id', 'created_at'])
+    op.create_index('idx_driver_data_created_at_brin', 'driver_data', ['created_at'], postgresql_using='brin')
+
+    # Partitions for the existing rows have to exist before they are copied, otherwise they would land
+    # in the default partition and block creating the partitions of their days later on
+    op.execute(f"""
+        SELECT driver_data_create_partitions(
+            LEAST(COALESCE((SELECT min(created_at)::date FROM driver_data_unpartitioned), current_date), current_date),
+            current_date + {DAYS_AHEAD})
+    """)
+    op.execute("""
+        INSERT INTO driver_data (id, driver_id, latitude, longitude, altitude, speed, is_correct, created_at)
+        SELECT id, driver_id, latitude, longitude, altitude, speed, is_correct, COALESCE(created_at, now())
+        FROM driver_data_unpartitioned
+    """)
+    # Also drops both duplicate indexes on driver_id
+    op.drop_table('driver_data_unpartitioned')
+
+
+def downgrade() -> None:
+    op.rename_table('driver_data', 'driver_data_partitioned')
+    op.create_table(
+        'driver_data',
+        sa.Column('id', sa.UUID(as_uuid=True), primary_key=True),
+        sa.Column('driver_id', sa.UUID(as_uuid=True), index=True),
+        sa.Column('latitude', sa.Float),
+        sa.Column('longitude', sa.Float),
+        sa.Column('altitude', sa.Float),
+        sa.Column('speed', sa.Float),
+        sa.Column('is_correct', sa.Boolean),
+        sa.Column('created_at', sa.DateTime),
+        sa.Index('idx_driver_id', 'driver_id')
+    )
+    op.execute("""
+        INSERT INTO driver_data (id, driver_id, latitude, longitude, altitude, speed, is_correct, created_at)
+        SELECT id, driver_id, latitude, longitude, altitude, speed, is_correct, created_at
+        FROM driver_data_partitioned
+    """)
+    # Dropping the parent drops all partitions and their indexes
+    op.drop_table('driver_data_partitioned')
+    op.execute("DROP FUNCTION driver_data_create_partitions(date, date)")
+    op.execute("DROP FUNCTION driver_data_drop_partitions(date)")
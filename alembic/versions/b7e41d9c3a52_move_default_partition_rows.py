@@ -0,0 +1,75 @@
+"""Move rows out of the default driver_data partition when creating a partition
+
+Revision ID: b7e41d9c3a52
+Revises: 63c42bfdca29
+Create Date: 2026-10-17 23:58:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e41d9c3a52'
+down_revision: Union[str, None] = '63c42bfdca29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows of a day that landed in the default partition, e.g. while the maintenance was not running,
+# make `CREATE TABLE ... PARTITION OF` fail for that day. The partition is therefore created detached,
+# the rows are moved into it and it is attached afterwards, all within the calling transaction.
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION driver_data_create_partitions(first_day date, last_day date) RETURNS integer AS $$
+DECLARE
+    partition_day date := first_day;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    WHILE partition_day <= last_day LOOP
+        partition_name := 'driver_data_p' || to_char(partition_day, 'YYYYMMDD');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE driver_data INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                           partition_name);
+            EXECUTE format('WITH moved AS (DELETE FROM driver_data_default WHERE created_at >= %L AND created_at < %L '
+                           'RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                           partition_day, partition_day + 1, partition_name);
+            EXECUTE format('ALTER TABLE driver_data ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, partition_day, partition_day + 1);
+            created := created + 1;
+        END IF;
+        partition_day := partition_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# The function as created by the partitioning migration
+PREVIOUS_CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION driver_data_create_partitions(first_day date, last_day date) RETURNS integer AS $$
+DECLARE
+    partition_day date := first_day;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    WHILE partition_day <= last_day LOOP
+        partition_name := 'driver_data_p' || to_char(partition_day, 'YYYYMMDD');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF driver_data FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, partition_day, partition_day + 1);
+            created := created + 1;
+        END IF;
+        partition_day := partition_day + 1;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_CREATE_PARTITIONS_FUNCTION)
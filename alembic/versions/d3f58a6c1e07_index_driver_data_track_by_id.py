@@ -0,0 +1,27 @@
+"""Add id to the driver_data track index
+
+Revision ID: d3f58a6c1e07
+Revises: b7e41d9c3a52
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f58a6c1e07'
+down_revision: Union[str, None] = 'b7e41d9c3a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Track pages are keyed by (created_at, id), rows inserted in one transaction share created_at
+    op.create_index('idx_driver_data_driver_id_created_at_id', 'driver_data', ['driver_id', 'created_at', 'id'])
+    op.drop_index('idx_driver_data_driver_id_created_at', table_name='driver_data')
+
+
+def downgrade() -> None:
+    op.create_index('idx_driver_data_driver_id_created_at', 'driver_data', ['driver_id', 'created_at'])
+    op.drop_index('idx_driver_data_driver_id_created_at_id', table_name='driver_data')
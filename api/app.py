@@ -1,11 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from api.middleware import StageTimingMiddleware
+from api.database.session import init_db_engine, dispose_db_engine
 from api.services.driver_geo.routers import router as DriverGeoRouter
+from api.services.driver_geo.utils.executor import graph_executor
+from api.services.driver_geo.utils.partitions import partition_maintainer
+from api.services.driver_geo.utils.spill import spill_replayer
+from api.services.driver_geo.utils.workers import metrics_publisher
+from api.services.driver_geo.utils.write_behind import write_behind
+from constants.core.tracing import tracer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db_engine()
+    graph_executor.start()
+    write_behind.start()
+    spill_replayer.start()
+    partition_maintainer.start()
+    metrics_publisher.start()
+    yield
+    await metrics_publisher.stop()
+    await partition_maintainer.stop()
+    await spill_replayer.stop()
+    await write_behind.stop()
+    graph_executor.stop()
+    await dispose_db_engine()
+
 
 app = FastAPI(
     title="Driver Geo Test",
     docs_url="/docs",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
+app.add_middleware(StageTimingMiddleware, tracer=tracer)
 app.include_router(DriverGeoRouter, tags=['Driver geo'], prefix='/api/v1')
-
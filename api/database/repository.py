@@ -1,7 +1,9 @@
 import uuid
-from typing import Generic, TypeVar
+from typing import AsyncIterator, Generic, Optional, Sequence, TypeVar
 
-from sqlalchemy import BinaryExpression, select
+from sqlalchemy import BinaryExpression, ColumnElement, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from api.database.models import Base
 
@@ -22,7 +24,50 @@ class DatabaseRepository(Generic[Model]):
         await self.session.refresh(instance)
         return instance
 
-    async def get(self, pk: uuid.UUID) -> Model | None:
+    async def create_many(self, data: list[dict], ignore_conflicts: bool = False) -> int:
+        """
+        Inserts all rows with a single multi-row INSERT and one COMMIT.
+
+        Args:
+            data (list[dict]): Column values for every row to insert.
+            ignore_conflicts (bool): Skip rows whose primary key already exists, which makes
+                inserting rows with preassigned keys idempotent.
+
+        Returns:
+            int: The number of inserted rows, rows skipped as conflicts are not counted.
+        """
+        if not data:
+            return 0
+        try:
+            if ignore_conflicts:
+                # asyncpg reports no row count for a batch, only inserted rows are returned instead
+                statement = postgresql_insert(self.model).on_conflict_do_nothing() \
+                    .returning(*self.model.__table__.primary_key.columns)
+                inserted = len((await self.session.execute(statement, data)).all())
+            else:
+                await self.session.execute(insert(self.model), data)
+                inserted = len(data)
+            await self.session.commit()
+        except SQLAlchemyError:
+            await self.session.rollback()
+            raise
+        return inserted
+
+    async def get(self, pk: uuid.UUID | tuple) -> Model | None:
+        """
+        Finds a row by its primary key.
+
+        Args:
+            pk (uuid.UUID | tuple): The primary key, a tuple of all its columns for a composite key. For a composite
+                key like the (id, created_at) of a partitioned table, the first column alone is accepted as well,
+                the row is then looked up in every partition.
+
+        Returns:
+            Model | None: The row, None if there is none.
+        """
+        primary_key = list(self.model.__table__.primary_key.columns)
+        if len(primary_key) > 1 and not isinstance(pk, tuple):
+            return await self.session.scalar(select(self.model).where(primary_key[0] == pk))
         return await self.session.get(self.model, pk)
 
     async def filter(
@@ -32,4 +77,28 @@ class DatabaseRepository(Generic[Model]):
         query = select(self.model)
         if expressions:
             query = query.where(*expressions)
-        return list(await self.session.scalars(query))
\ No newline at end of file
+        return list(await self.session.scalars(query))
+
+    async def stream(
+        self,
+        *expressions: BinaryExpression,
+        order_by: Sequence[ColumnElement] = (),
+        limit: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Sequence[Model]]:
+        """
+        Reads matching rows through a server-side cursor, so only one batch is held in memory at a time.
+
+        Args:
+            *expressions (BinaryExpression): Filter conditions.
+            order_by (Sequence[ColumnElement]): Sort order, which should match an index for keyset pagination.
+            limit (Optional[int]): Maximum number of rows, None for all of them.
+            batch_size (int): Number of rows fetched from the cursor at once.
+
+        Yields:
+            Sequence[Model]: The next batch of rows.
+        """
+        query = select(self.model).where(*expressions).order_by(*order_by).limit(limit)
+        result = await self.session.stream_scalars(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield rows
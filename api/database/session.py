@@ -1,7 +1,10 @@
 from collections.abc import AsyncGenerator
+from typing import Optional
+
 from sqlalchemy import text
 from sqlalchemy import exc
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
@@ -9,11 +12,45 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.exc import SQLAlchemyError
 from config import settings
 
+# Process-wide engine and session factory, created once in the app lifespan
+engine: Optional[AsyncEngine] = None
+session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def init_db_engine() -> AsyncEngine:
+    """
+    Creates the process-wide engine and connection pool if it does not exist yet.
+
+    Returns:
+        AsyncEngine: The shared engine.
+    """
+    global engine, session_factory
+    if engine is None:
+        engine = create_async_engine(
+            settings.database.url,
+            pool_size=settings.database.pool_size,
+            max_overflow=settings.database.max_overflow,
+            pool_timeout=settings.database.pool_timeout_seconds,
+            pool_recycle=settings.database.pool_recycle_seconds,
+            pool_pre_ping=settings.database.pool_pre_ping,
+            connect_args={"statement_cache_size": settings.database.statement_cache_size},
+        )
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    return engine
+
+
+async def dispose_db_engine() -> None:
+    """Closes all pooled connections and drops the process-wide engine."""
+    global engine, session_factory
+    if engine is not None:
+        await engine.dispose()
+    engine = None
+    session_factory = None
+
 
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
-    engine = create_async_engine(settings.database.url)
-    factory = async_sessionmaker(engine)
-    async with factory() as session:
+    init_db_engine()
+    async with session_factory() as session:
         try:
             yield session
             await session.commit()
@@ -23,10 +60,9 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
 
 
 async def check_db_connection() -> bool:
-    engine = create_async_engine(settings.database.url)
-    async with engine.connect() as conn:
-        try:
+    try:
+        async with init_db_engine().connect() as conn:
             await conn.execute(text("SELECT 1"))
             return True
-        except SQLAlchemyError:
-            return False
+    except (SQLAlchemyError, OSError):
+        return False
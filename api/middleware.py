@@ -0,0 +1,30 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.core.tracing import Tracer
+
+
+class StageTimingMiddleware:
+    """
+    Starts a trace for every HTTP request and completes it when the response starts.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Tracer) -> None:
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = self.tracer.start(scope["path"])
+
+        async def send_with_trace(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                self.tracer.finish(trace)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            self.tracer.reset(token)
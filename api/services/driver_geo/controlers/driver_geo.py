@@ -1,61 +1,182 @@
 import time
-from typing import Dict, Any
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, AsyncIterator
+from uuid import UUID
 
-from tenacity import RetryError
+from pydantic import ValidationError
+from sqlalchemy import tuple_
 
-from api.database.session import check_db_connection
-from api.services.driver_geo.models.driver import DriverDataRepository
-from api.services.driver_geo.schemas.base import BasicResponse, ApiMetrics
-from api.services.driver_geo.schemas.driver_geo import DriverDataRequestSchema, DriverDataResponseSchema
-from api.services.driver_geo.utils.database import retry_to_save_to_db
-from api.services.driver_geo.utils.map import get_shortest_path_length
+from api.database.repository import DatabaseRepository
+from api.database.session import check_db_connection, get_db_session
+from api.services.driver_geo.models.driver import DriverData
+from api.services.driver_geo.schemas.base import BasicResponse, ApiMetrics, StageTimings, RequestTrace
+from api.services.driver_geo.schemas.driver_geo import DriverDataRequestSchema, DriverDataResponseSchema, \
+    DriverDataBatchRequestSchema, DriverDataBatchResponseSchema, DriverDataStreamRecordSchema, \
+    DriverDataStreamResponseSchema, StreamRecordError, DriverTrackPointSchema, DriverLatestPositionSchema, NearbyDriverSchema, NearbyDriversResponseSchema
+from api.services.driver_geo.utils.map import get_node_path_length_async, get_nearest_node, haversine_distance, \
+    is_within_bounds, get_node_path_lengths_to_async
+from api.services.driver_geo.utils.spill import spill_log
+from api.services.driver_geo.utils.workers import metrics_publisher
+from api.services.driver_geo.utils.write_behind import write_behind
 from config import settings
-from constants.core.buffered_data import buffered_data
+from constants.core.driver_state import driver_states, driver_positions
 from constants.core.logs import logger
 from constants.core.metrics import metrics
+from constants.core.tracing import tracer
 from fastapi import status
 
-from constants.map.core import city_G
+from utils.core.driver_state import DriverState
+from utils.core.profiling import capture_profile
 
 
-async def update_driver_geo(driver_data: DriverDataRequestSchema,
-                            repository: DriverDataRepository) -> DriverDataResponseSchema:
+async def update_driver_geo(driver_data: DriverDataRequestSchema) -> DriverDataResponseSchema:
     """
-    Updates the driver's geographic data, validates it, and saves it to the database.
+    Updates the driver's geographic data, validates it, and queues it for saving to the database.
 
     Args:
         driver_data (DriverDataRequestSchema): The incoming driver data to be processed.
-        repository (DriverDataRepository): Repository instance for database operations.
 
     Returns:
         DriverDataResponseSchema: The response schema containing the processed data.
     """
-    driver_id = driver_data.driver_id
+    current_data = await process_driver_data(driver_data)
+    with tracer.stage("persist"):
+        await write_behind.put(current_data)
 
-    metrics["total_coordinates"] += 1
-    metrics["unique_drivers"].add(driver_id)
+    return DriverDataResponseSchema(**current_data)
 
-    previous_data = buffered_data[driver_id][-1] if len(buffered_data[driver_id]) > 0 else None
-    is_correct = validate_driver_data(driver_data, previous_data)
 
-    if not is_correct:
-        logger.warning(f"Anomalous data detected: {driver_data.model_dump()}")
+async def update_driver_geo_batch(batch: DriverDataBatchRequestSchema) -> DriverDataBatchResponseSchema:
+    """
+    Validates a batch of driver geographic data and queues it for saving to the database.
+
+    Records are validated in the order they were received, so every record is compared with
+    the previous record of the same driver, whether it came in this batch or an earlier request.
+
+    Args:
+        batch (DriverDataBatchRequestSchema): The incoming batch of driver data to be processed.
+
+    Returns:
+        DriverDataBatchResponseSchema: The response schema containing the processed records.
+    """
+    processed = [await process_driver_data(driver_data) for driver_data in batch.records]
+    with tracer.stage("persist"):
+        for data in processed:
+            await write_behind.put(data)
+
+    return DriverDataBatchResponseSchema(
+        records=[DriverDataResponseSchema(**data) for data in processed],
+        anomalies=sum(1 for data in processed if not data["is_correct"]),
+        queued=len(processed)
+    )
+
+
+async def update_driver_geo_stream(lines: AsyncIterator[bytes]) -> DriverDataStreamResponseSchema:
+    """
+    Validates newline-delimited driver data as it arrives and queues it for saving to the database.
+
+    Every line goes through the same validation and persistence as `update_driver_geo`, in the order
+    the lines were received. Lines failing schema validation are skipped and reported, and do not stop the stream.
+
+    A line may carry the `created_at` time its fix was captured, so a backfill is stored at its original time
+    and the distance between consecutive fixes of a driver is checked against the time between their captures.
+
+    Args:
+        lines (AsyncIterator[bytes]): One JSON encoded driver data record per line.
+
+    Returns:
+        DriverDataStreamResponseSchema: Counts of processed records and errors of the first rejected lines.
+    """
+    received = queued = anomalies = rejected = 0
+    errors: List[StreamRecordError] = []
+    async for line in lines:
+        received += 1
+        try:
+            driver_data = DriverDataStreamRecordSchema.model_validate_json(line)
+        except ValidationError as e:
+            rejected += 1
+            if len(errors) < settings.stream.max_reported_errors:
+                errors.append(StreamRecordError(line=received, message=str(e)))
+            continue
+
+        current_data = await process_driver_data(driver_data)
+        with tracer.stage("persist"):
+            await write_behind.put(current_data)
+        queued += 1
+        anomalies += not current_data["is_correct"]
+
+    return DriverDataStreamResponseSchema(
+        received=received,
+        queued=queued,
+        anomalies=anomalies,
+        rejected=rejected,
+        errors=errors
+    )
+
 
+async def process_driver_data(driver_data: DriverDataRequestSchema) -> Dict[str, Any]:
+    """
+    Validates the driver's geographic data, updates metrics and remembers it as the driver's previous point.
+
+    Args:
+        driver_data (DriverDataRequestSchema): The incoming driver data to be processed.
+
+    Returns:
+        Dict[str, Any]: The record to be saved including the `is_correct` flag.
+    """
     current_data = driver_data.model_dump()
-    current_data['is_correct'] = is_correct
-    buffered_data[driver_id].append(current_data)
-    await save_buffered_data(driver_id, repository)
+    driver_id = current_data["driver_id"]
+    # Fixes without a capture time are stored at the time they are received
+    captured_at = current_data.get("created_at")
+    current_data["created_at"] = captured_at or datetime.utcnow()
+    if captured_at is not None:
+        captured_at = captured_at.replace(tzinfo=timezone.utc).timestamp()
 
-    return DriverDataResponseSchema(**current_data)
+    started_at = time.perf_counter()
+    metrics.inc("coordinates")
+    metrics.unique_drivers.add(driver_id)
+
+    with tracer.stage("snap"):
+        current_node = get_nearest_node(driver_data.longitude, driver_data.latitude)
+
+    # Remember the point before validation yields to the event loop,
+    # so the next fix of the driver is compared with this one
+    current_state = DriverState(driver_data.latitude, driver_data.longitude, driver_data.altitude,
+                                driver_data.speed, True, current_node, time.monotonic(), captured_at)
+    previous_data = driver_states.swap(driver_id, current_state)
+
+    is_correct = await validate_driver_data(driver_data, previous_data, current_node,
+                                            previous_data.node if previous_data else None, captured_at)
+
+    if not is_correct:
+        logger.warning("Anomalous data detected: driver %s at (%s, %s), speed %s km/h, altitude %s m", driver_id,
+                       driver_data.latitude, driver_data.longitude, driver_data.speed, driver_data.altitude,
+                       extra={"event": "anomaly"})
+
+    current_data['is_correct'] = current_state.is_correct = is_correct
+    # Only positions that passed validation are offered to nearby driver queries,
+    # an anomalous fix leaves the driver at its last valid position
+    if driver_states.update_if_current(driver_id, current_state) and is_correct:
+        driver_positions.update(driver_id, driver_data.longitude, driver_data.latitude, current_state)
+    metrics.observe("ingest", time.perf_counter() - started_at)
+    return current_data
 
 
-def validate_driver_data(driver_data: DriverDataRequestSchema, previous_data: Dict[str, Any]) -> bool:
+async def validate_driver_data(driver_data: DriverDataRequestSchema, previous_data: Optional[DriverState],
+                               current_node: Optional[int] = None, previous_node: Optional[int] = None,
+                               captured_at: Optional[float] = None) -> bool:
     """
     Validates the driver's geographic data against predefined limits and previous data.
 
+    The road graph search runs on the graph executor configured by `routing.execution_mode`.
+
     Args:
         driver_data (DriverDataRequestSchema): The incoming driver data to be validated.
-        previous_data (Dict[str, Any]): The previous data for comparison, if available.
+        previous_data (Optional[DriverState]): The previous data for comparison, if available.
+        current_node (Optional[int]): Graph node the incoming data is snapped to, if already known.
+        previous_node (Optional[int]): Graph node the previous data was snapped to, if already known.
+        captured_at (Optional[float]): Epoch time the incoming data was captured, if the client sent it.
 
     Returns:
         bool: True if the data is correct, False otherwise.
@@ -64,47 +185,167 @@ def validate_driver_data(driver_data: DriverDataRequestSchema, previous_data: Di
 
     if driver_data.speed > settings.data_limits.max_speed_kmh:
         is_correct = False
-        metrics["speed_violations"] += 1
-        logger.info(f"Speed violation detected: {driver_data.speed} km/h")
+        metrics.inc("speed_violations")
+        logger.info("Speed violation detected: %s km/h", driver_data.speed, extra={"event": "speed_violation"})
 
     if driver_data.altitude < settings.data_limits.min_altitude_m or driver_data.altitude > settings.data_limits.max_altitude_m:
         is_correct = False
-        metrics["altitude_violations"] += 1
-        logger.info(f"Altitude violation detected: {driver_data.altitude} m")
+        metrics.inc("altitude_violations")
+        logger.info("Altitude violation detected: %s m", driver_data.altitude, extra={"event": "altitude_violation"})
 
-    if previous_data:
-        distance = get_shortest_path_length(
+    # Cheapest checks first: the graph is only searched when the bounding box and
+    # the straight-line lower bound can not decide on their own
+    if not is_within_bounds(driver_data.longitude, driver_data.latitude,
+                            settings.location.longitude_range, settings.location.latitude_range):
+        is_correct = False
+        metrics.inc("location_violations")
+        logger.info("Location violation detected: (%s, %s)", driver_data.latitude, driver_data.longitude,
+                    extra={"event": "location_violation"})
+    elif previous_data:
+        interval = settings.driver_service.send_interval_seconds
+        # Fixes that both carry a capture time, e.g. of a backfill, may be any time apart
+        if captured_at is not None and previous_data.captured_at is not None:
+            interval = abs(captured_at - previous_data.captured_at)
+        max_possible_distance = (settings.data_limits.max_speed_kmh * 1000 / 3600) * interval
+        distance = haversine_distance(
             driver_data.longitude,
             driver_data.latitude,
-            previous_data["longitude"],
-            previous_data["latitude"],
-            city_G
+            previous_data.longitude,
+            previous_data.latitude
         )
+        if distance <= max_possible_distance:
+            if current_node is None:
+                current_node = get_nearest_node(driver_data.longitude, driver_data.latitude)
+            if previous_node is None:
+                previous_node = get_nearest_node(previous_data.longitude, previous_data.latitude)
+            with tracer.stage("route"):
+                distance = await get_node_path_length_async(current_node, previous_node, cutoff=max_possible_distance)
 
-        max_possible_distance = (settings.data_limits.max_speed_kmh * 1000 / 3600) * settings.driver_service.send_interval_seconds
         if distance > max_possible_distance:
             is_correct = False
-            metrics["distance_violations"] += 1
-            logger.info(f"Distance violation detected: {distance} meters")
+            metrics.inc("distance_violations")
+            logger.info("Distance violation detected: %s meters", distance, extra={"event": "distance_violation"})
 
     return is_correct
 
 
-async def save_buffered_data(driver_id: str, repository: DriverDataRepository):
+def get_driver_latest(driver_id: UUID) -> Optional[DriverLatestPositionSchema]:
     """
-    Saves buffered driver data to the database and handles potential retries.
+    Returns the latest position of a driver from the in-memory per-driver state, without touching the database.
 
     Args:
-        driver_id (str): The ID of the driver whose data is being saved.
-        repository (DriverDataRepository): Repository instance for database operations.
+        driver_id (UUID): The ID of the driver.
+
+    Returns:
+        Optional[DriverLatestPositionSchema]: The latest position, or None if the driver is unknown or idle
+        for longer than the driver state TTL.
     """
-    for item in buffered_data[driver_id][:-1]:
-        try:
-            await retry_to_save_to_db(repository, item)
-            buffered_data[driver_id].remove(item)
-            logger.info(f"Successfully saved data to DB: {item}")
-        except RetryError as e:
-            logger.error(f"Failed to write to DB: {item} \n {e}")
+    state = driver_states.get(str(driver_id))
+    if state is None:
+        return None
+    return DriverLatestPositionSchema(
+        driver_id=driver_id,
+        latitude=state.latitude,
+        longitude=state.longitude,
+        altitude=state.altitude,
+        speed=state.speed,
+        is_correct=state.is_correct,
+        age_seconds=time.monotonic() - state.updated_at
+    )
+
+
+async def get_nearby_drivers(latitude: float, longitude: float, radius: float, k: int,
+                             rank_by: str = "straight") -> NearbyDriversResponseSchema:
+    """
+    Finds the active drivers nearest to a point from the in-memory position grid.
+
+    With `rank_by="road"` the drivers within the straight-line radius are ranked by the road distance
+    from their snapped node to the node of the point, computed by a single reverse Dijkstra search
+    bounded by the radius. Drivers farther than the radius by road are left out.
+
+    Args:
+        latitude (float): Latitude of the point.
+        longitude (float): Longitude of the point.
+        radius (float): Search radius in meters.
+        k (int): Maximum number of drivers.
+        rank_by (str): "straight" for the straight-line distance, "road" for the road distance.
+
+    Returns:
+        NearbyDriversResponseSchema: The drivers found, nearest first.
+    """
+    # Straight-line distance is a lower bound of the road distance, so road ranking needs every candidate
+    candidates = driver_positions.nearby(longitude, latitude, radius, k if rank_by == "straight" else None)
+    now = time.monotonic()
+    found = []
+    for driver_id, distance, state in candidates:
+        # Skips drivers whose state expired since they were indexed
+        if driver_states.get(driver_id) is None:
+            driver_positions.remove(driver_id)
+            continue
+        found.append((distance, driver_id, state))
+
+    if rank_by == "road" and found:
+        with tracer.stage("route"):
+            lengths = await get_node_path_lengths_to_async(get_nearest_node(longitude, latitude), radius)
+        found = sorted((lengths[state.node], driver_id, state) for _, driver_id, state in found if state.node in lengths)
+
+    return NearbyDriversResponseSchema(drivers=[
+        NearbyDriverSchema(
+            driver_id=driver_id,
+            latitude=state.latitude,
+            longitude=state.longitude,
+            distance_m=distance,
+            age_seconds=now - state.updated_at
+        )
+        for distance, driver_id, state in found[:k]
+    ])
+
+
+def _to_utc(value: datetime) -> datetime:
+    """Converts an aware datetime to the naive UTC datetimes stored in driver_data."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def stream_driver_track(driver_id: UUID, start: datetime, end: datetime, after: Optional[datetime],
+                              after_id: Optional[UUID], limit: int) -> AsyncIterator[bytes]:
+    """
+    Streams the stored track of a driver as newline-delimited JSON, oldest point first.
+
+    Rows are read through a server-side cursor in the order of the `(driver_id, created_at, id)` index,
+    so neither the database nor the API sorts or buffers the whole track. Long tracks are read page
+    by page with keyset pagination: the next page starts after the `(created_at, id)` of the last point,
+    so points sharing a `created_at`, e.g. of one bulk insert, are never skipped at a page boundary.
+
+    The session is opened here rather than by a request dependency, because the body is produced
+    after the handler returned.
+
+    Args:
+        driver_id (UUID): The ID of the driver.
+        start (datetime): Start of the time range, inclusive.
+        end (datetime): End of the time range, exclusive.
+        after (Optional[datetime]): Keyset cursor, only points after it are returned.
+        after_id (Optional[UUID]): ID of the point at `after`, required with it.
+        limit (int): Maximum number of points.
+
+    Yields:
+        bytes: Chunks of JSON encoded track points, one per line.
+    """
+    conditions = [
+        DriverData.driver_id == driver_id,
+        DriverData.created_at >= _to_utc(start),
+        DriverData.created_at < _to_utc(end),
+    ]
+    if after is not None:
+        conditions.append(tuple_(DriverData.created_at, DriverData.id) > tuple_(_to_utc(after), after_id))
+
+    async with asynccontextmanager(get_db_session)() as session:
+        repository = DatabaseRepository(DriverData, session)
+        async for rows in repository.stream(*conditions, order_by=(DriverData.created_at, DriverData.id), limit=limit,
+                                            batch_size=settings.track.batch_size):
+            yield b"".join(DriverTrackPointSchema.model_validate(row).model_dump_json().encode() + b"\n"
+                           for row in rows)
 
 
 async def health_check() -> BasicResponse:
@@ -115,7 +356,7 @@ async def health_check() -> BasicResponse:
         BasicResponse: Response indicating the health status of the service.
     """
     if await check_db_connection():
-        logger.info("Health check passed.")
+        logger.info("Health check passed.", extra={"event": "health_check"})
         return BasicResponse(status=status.HTTP_200_OK, message="healthy")
     else:
         logger.error("Health check failed.")
@@ -124,18 +365,100 @@ async def health_check() -> BasicResponse:
 
 def get_metrics() -> ApiMetrics:
     """
-    Retrieves the current metrics of the service.
+    Retrieves the current metrics of the service, summed over all worker processes in the shared worker mode.
 
     Returns:
         ApiMetrics: The current metrics summary of the service.
     """
+    registry, gauges = metrics_publisher.collect()
     metrics_summary = {
-        "uptime": time.time() - metrics["start_time"],
-        "total_coordinates": metrics["total_coordinates"],
-        "unique_drivers": len(metrics["unique_drivers"]),
-        "speed_violations": metrics["speed_violations"],
-        "altitude_violations": metrics["altitude_violations"],
-        "db_records": metrics["db_records"]
+        "uptime": time.time() - registry.start_time,
+        "total_coordinates": registry.counters["coordinates"].value,
+        "coordinates_per_minute": registry.counters["coordinates"].per_minute.total(),
+        "coordinates_per_hour": registry.counters["coordinates"].per_hour.total(),
+        "unique_drivers": registry.unique_drivers.count(),
+        "speed_violations": registry.counters["speed_violations"].value,
+        "altitude_violations": registry.counters["altitude_violations"].value,
+        "distance_violations": registry.counters["distance_violations"].value,
+        "location_violations": registry.counters["location_violations"].value,
+        "db_records": registry.counters["db_records"].value,
+        "pending_db_records": gauges["pending_db_records"],
+        "db_flushes": registry.counters["db_flushes"].value,
+        "spilled_records": registry.counters["spilled_records"].value,
+        "replayed_records": registry.counters["replayed_records"].value,
+        "spill_segments": len(spill_log.segments()),
+        "spill_backlog_bytes": spill_log.backlog_bytes(),
+        "last_flush_size": int(registry.gauges["last_flush_size"].value),
+        "last_flush_interval": registry.gauges["last_flush_interval"].value,
+        "last_flush_duration": registry.gauges["last_flush_duration"].value,
+        "ingest_p50": registry.histograms["ingest"].quantile(0.5),
+        "ingest_p99": registry.histograms["ingest"].quantile(0.99),
+        "path_cache_hits": gauges["path_cache_hits"],
+        "path_cache_misses": gauges["path_cache_misses"],
+        "path_cache_size": gauges["path_cache_size"],
+        "tracked_drivers": len(driver_states),
+        "evicted_drivers": driver_states.evicted,
+        "driver_state_bytes": driver_states.nbytes
     }
-    logger.info(f"Metrics summary: {metrics_summary}")
+    logger.info("Metrics summary: %s", metrics_summary, extra={"event": "metrics_summary"})
     return ApiMetrics(**metrics_summary)
+
+
+def get_stage_timings() -> StageTimings:
+    """
+    Retrieves percentiles of the time ingest requests spend in every stage.
+
+    Returns:
+        StageTimings: Aggregated timings of every stage.
+    """
+    return StageTimings(stages=tracer.summary())
+
+
+def get_sampled_traces(limit: int) -> List[RequestTrace]:
+    """
+    Retrieves the most recent sampled per-request traces.
+
+    Args:
+        limit (int): Maximum number of traces.
+
+    Returns:
+        List[RequestTrace]: The traces, newest first.
+    """
+    return [RequestTrace(**trace) for trace in tracer.sampled_traces(limit)]
+
+
+async def get_profile(seconds: float) -> str:
+    """
+    Captures a cProfile report of the live process.
+
+    Args:
+        seconds (float): How long to profile, capped by `profiling.max_profile_seconds`.
+
+    Returns:
+        str: The `pstats` report.
+    """
+    return await capture_profile(min(seconds, settings.profiling.max_profile_seconds))
+
+
+def get_prometheus_metrics() -> str:
+    """
+    Renders the current metrics of the service in the Prometheus text exposition format,
+    summed over all worker processes in the shared worker mode.
+
+    Returns:
+        str: The exposition text.
+    """
+    registry, gauges = metrics_publisher.collect()
+    return registry.render_prometheus({
+        "pending_db_records": ("Number of records waiting to be written to the database", gauges["pending_db_records"]),
+        "spill_segments": ("Number of spill log segments waiting to be replayed", len(spill_log.segments())),
+        "spill_backlog_bytes": ("Size of the spill log segments waiting to be replayed in bytes",
+                                spill_log.backlog_bytes()),
+        "path_cache_hits": ("Number of road distances answered from the cache", gauges["path_cache_hits"]),
+        "path_cache_misses": ("Number of road distances computed on the graph", gauges["path_cache_misses"]),
+        "path_cache_size": ("Number of node pairs currently in the road distance cache", gauges["path_cache_size"]),
+        "tracked_drivers": ("Number of drivers whose last fix is kept in memory", len(driver_states)),
+        "evicted_drivers": ("Number of idle drivers evicted from memory", driver_states.evicted),
+        "driver_state_bytes": ("Estimated memory taken by per-driver state in bytes", driver_states.nbytes),
+        "live_driver_positions": ("Number of valid driver positions indexed for nearby queries", len(driver_positions)),
+    })
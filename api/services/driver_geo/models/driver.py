@@ -4,7 +4,7 @@ from typing import Annotated
 
 from fastapi import Depends
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Float, Boolean, DateTime, Index
+from sqlalchemy import Float, Boolean, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from api.database.models import Base
 from api.database.repository import DatabaseRepository
@@ -14,21 +14,27 @@ from api.services.driver_geo.controlers.dependencies import get_repository
 class DriverData(Base):
     """
     SQLAlchemy model for storing driver data.
+
+    The table is range partitioned by `created_at` into daily partitions, which are created ahead
+    and dropped after the retention period by the partition maintenance of the API.
     """
 
     __tablename__ = "driver_data"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    driver_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), index=True)
+    driver_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True))
     latitude: Mapped[float] = mapped_column(Float)
     longitude: Mapped[float] = mapped_column(Float)
     altitude: Mapped[float] = mapped_column(Float)
     speed: Mapped[float] = mapped_column(Float)
     is_correct: Mapped[bool] = mapped_column(Boolean)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=datetime.utcnow,
+                                                 server_default=func.now())
 
     __table_args__ = (
-        Index('idx_driver_id', 'driver_id'),
+        Index('idx_driver_data_driver_id_created_at_id', 'driver_id', 'created_at', 'id'),
+        Index('idx_driver_data_created_at_brin', 'created_at', postgresql_using='brin'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
     )
 
 
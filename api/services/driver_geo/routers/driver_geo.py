@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Body
-from api.services.driver_geo.controlers.driver_geo import update_driver_geo, health_check, get_metrics
-from api.services.driver_geo.models.driver import DriverDataRepository
-from api.services.driver_geo.schemas.base import ApiMetrics, BasicResponse
-from api.services.driver_geo.schemas.driver_geo import DriverDataRequestSchema, DriverDataResponseSchema
+from datetime import datetime
+from typing import List, Literal, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Body, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from api.services.driver_geo.controlers.driver_geo import update_driver_geo, health_check, get_metrics, \
+    update_driver_geo_batch, get_prometheus_metrics, get_stage_timings, get_sampled_traces, get_profile, \
+    update_driver_geo_stream, get_driver_latest, stream_driver_track, get_nearby_drivers
+from api.services.driver_geo.schemas.base import ApiMetrics, BasicResponse, StageTimings, RequestTrace
+from api.services.driver_geo.schemas.driver_geo import DriverDataRequestSchema, DriverDataResponseSchema, \
+    DriverDataBatchRequestSchema, DriverDataBatchResponseSchema, DriverDataStreamResponseSchema, \
+    DriverLatestPositionSchema, NearbyDriversResponseSchema
+from api.services.driver_geo.utils.ndjson import NDJSONError, create_decompressor, iter_ndjson_lines
 from config import settings, load_settings, Settings
 from constants.core.logs import logger
+from constants.core.tracing import tracer
 
 router = APIRouter()
 
@@ -15,24 +25,180 @@ router = APIRouter()
              response_description="The response will include the processed driver data.",
              response_model=DriverDataResponseSchema)
 async def update_driver_geo_handler(
-        repository: DriverDataRepository,
         driver_data: DriverDataRequestSchema = Body(...)) -> DriverDataResponseSchema:
     """
     Handles the update of driver geographic data.
 
     Args:
-        repository (DriverDataRepository): Repository instance for database operations.
         driver_data (DriverDataRequestSchema): The incoming driver data to be processed.
 
     Returns:
         DriverDataResponseSchema: The response schema containing the processed data.
     """
-    logger.info(f"Received driver data for update: {driver_data}")
-    response = await update_driver_geo(driver_data, repository)
-    logger.info(f"Driver data update response: {response}")
+    tracer.mark_handler_start()
+    logger.info("Received driver data for update: driver %s at (%s, %s)", driver_data.driver_id,
+                driver_data.latitude, driver_data.longitude, extra={"event": "fix_received"})
+    response = await update_driver_geo(driver_data)
+    logger.info("Driver data update response: driver %s, correct %s", response.driver_id, response.is_correct,
+                extra={"event": "fix_processed"})
+    tracer.mark_handler_end()
+    return response
+
+
+@router.post("/driver-geo/batch",
+             summary="Update Driver Geographic Data in Batch",
+             description="Endpoint to update the geographic data of many drivers at once.",
+             response_description="The response will include the processed driver data for every record.",
+             response_model=DriverDataBatchResponseSchema)
+async def update_driver_geo_batch_handler(
+        batch: DriverDataBatchRequestSchema = Body(...)) -> DriverDataBatchResponseSchema:
+    """
+    Handles the batched update of driver geographic data.
+
+    Args:
+        batch (DriverDataBatchRequestSchema): The incoming batch of driver data to be processed.
+
+    Returns:
+        DriverDataBatchResponseSchema: The response schema containing the processed records.
+    """
+    tracer.mark_handler_start()
+    logger.info("Received batch of %d driver data records", len(batch.records), extra={"event": "batch_received"})
+    response = await update_driver_geo_batch(batch)
+    logger.info("Driver data batch response: %d anomalies, %d queued", response.anomalies, response.queued,
+                extra={"event": "batch_processed"})
+    tracer.mark_handler_end()
+    return response
+
+
+@router.post("/driver-geo/stream",
+             summary="Stream Driver Geographic Data",
+             description="Endpoint to ingest a newline-delimited JSON body of driver data, optionally compressed "
+                         "with gzip or zstd as given by the Content-Encoding header. Records are validated as the "
+                         "body arrives, so it can be of any size. Every line may carry the `created_at` time "
+                         "its fix was captured, for backfills of recent history.",
+             response_description="The response will include counts of processed and rejected records.",
+             response_model=DriverDataStreamResponseSchema)
+async def update_driver_geo_stream_handler(request: Request) -> DriverDataStreamResponseSchema:
+    """
+    Handles streamed updates of driver geographic data.
+
+    Args:
+        request (Request): The request with an NDJSON body of driver data records.
+
+    Returns:
+        DriverDataStreamResponseSchema: Counts of processed records and errors of the first rejected lines.
+    """
+    tracer.mark_handler_start()
+    encoding = request.headers.get("content-encoding")
+    try:
+        create_decompressor(encoding)
+    except NDJSONError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+
+    logger.info("Receiving driver data stream, encoding %s", encoding or "identity", extra={"event": "batch_received"})
+    try:
+        response = await update_driver_geo_stream(
+            iter_ndjson_lines(request.stream(), encoding, settings.stream.max_line_bytes,
+                              settings.stream.max_body_bytes))
+    except NDJSONError as e:
+        # Records before the broken part are already processed and queued
+        logger.error("Driver data stream aborted: %s", e)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.info("Driver data stream response: %d queued, %d anomalies, %d rejected", response.queued,
+                response.anomalies, response.rejected, extra={"event": "batch_processed"})
+    tracer.mark_handler_end()
+    return response
+
+
+@router.get("/drivers/nearby",
+            summary="Find Nearby Drivers",
+            description="Endpoint to find the active drivers nearest to a point, ranked by straight-line distance "
+                        "or by road distance. It is answered from memory, only road ranking searches the road graph.",
+            response_description="The response will include the drivers within the radius, nearest first.",
+            response_model=NearbyDriversResponseSchema)
+async def get_nearby_drivers_handler(
+        lat: float = Query(..., ge=-90, le=90, description="Latitude of the point"),
+        lon: float = Query(..., ge=-180, le=180, description="Longitude of the point"),
+        radius: float = Query(1000, gt=0, le=settings.nearby.max_radius_m, description="Search radius in meters"),
+        k: int = Query(10, ge=1, le=settings.nearby.max_k, description="Maximum number of drivers"),
+        rank_by: Literal["straight", "road"] = Query("straight", description="Distance used to rank the drivers")
+) -> NearbyDriversResponseSchema:
+    """
+    Handles requests for the drivers near a point.
+
+    Args:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        radius (float): Search radius in meters.
+        k (int): Maximum number of drivers.
+        rank_by (str): "straight" or "road".
+
+    Returns:
+        NearbyDriversResponseSchema: The drivers found, nearest first.
+    """
+    return await get_nearby_drivers(lat, lon, radius, k, rank_by)
+
+
+@router.get("/drivers/{driver_id}/latest",
+            summary="Get Latest Driver Position",
+            description="Endpoint to get the latest known position of a driver. It is answered from memory, "
+                        "so it can be polled frequently without loading the database.",
+            response_description="The response will include the latest position and its age.",
+            response_model=DriverLatestPositionSchema)
+async def get_driver_latest_handler(driver_id: UUID) -> DriverLatestPositionSchema:
+    """
+    Handles requests for the latest position of a driver.
+
+    Args:
+        driver_id (UUID): The ID of the driver.
+
+    Returns:
+        DriverLatestPositionSchema: The latest position of the driver.
+    """
+    response = get_driver_latest(driver_id)
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No recent position of the driver")
     return response
 
 
+@router.get("/drivers/{driver_id}/track",
+            summary="Stream Driver Track",
+            description="Endpoint to stream the stored points of a driver within a time range as newline-delimited "
+                        "JSON, oldest first. To read past `limit` points, request the next page with `after` and "
+                        "`after_id` set to the `created_at` and `id` of the last received point.",
+            response_description="The response will include one track point per line.",
+            response_class=StreamingResponse)
+async def get_driver_track_handler(
+        driver_id: UUID,
+        start: datetime = Query(..., description="Start of the time range, inclusive"),
+        end: Optional[datetime] = Query(None, description="End of the time range, exclusive, now by default"),
+        after: Optional[datetime] = Query(None, description="Only return points after the point created at this time"),
+        after_id: Optional[UUID] = Query(None, description="ID of the point created at `after`"),
+        limit: int = Query(settings.track.max_points, ge=1, le=settings.track.max_points,
+                           description="Maximum number of points")) -> StreamingResponse:
+    """
+    Handles requests for the track of a driver.
+
+    Args:
+        driver_id (UUID): The ID of the driver.
+        start (datetime): Start of the time range, inclusive.
+        end (Optional[datetime]): End of the time range, exclusive, now by default.
+        after (Optional[datetime]): Keyset cursor of the previous page.
+        after_id (Optional[UUID]): ID of the last point of the previous page.
+        limit (int): Maximum number of points.
+
+    Returns:
+        StreamingResponse: The track points as newline-delimited JSON.
+    """
+    if (after is None) != (after_id is None):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="after and after_id have to be given together")
+    end = end or datetime.utcnow()
+    logger.info("Streaming track of driver %s from %s to %s", driver_id, start, end, extra={"event": "track_requested"})
+    return StreamingResponse(stream_driver_track(driver_id, start, end, after, after_id, limit),
+                             media_type="application/x-ndjson")
+
+
 @router.get("/health-check",
             summary="Check Service Health",
             description="Endpoint to check the health status of the service.",
@@ -46,7 +212,7 @@ async def health_check_handler() -> BasicResponse:
         BasicResponse: Response indicating the health status of the service.
     """
     response = await health_check()
-    logger.info(f"Health check response: {response}")
+    logger.info("Health check response: %s", response, extra={"event": "health_check"})
     return response
 
 
@@ -63,10 +229,78 @@ def get_metrics_handler() -> ApiMetrics:
         ApiMetrics: The current metrics summary of the service.
     """
     metrics_summary = get_metrics()
-    logger.info(f"Metrics summary: {metrics_summary}")
+    logger.info("Metrics summary: %s", metrics_summary, extra={"event": "metrics_summary"})
     return metrics_summary
 
 
+@router.get("/metrics/prometheus",
+            summary="Get Service Metrics for Prometheus",
+            description="Endpoint to retrieve current service metrics, including latency histograms, in the Prometheus text format.",
+            response_description="The response will include current service metrics in the Prometheus text format.",
+            response_class=PlainTextResponse)
+def get_prometheus_metrics_handler() -> PlainTextResponse:
+    """
+    Retrieves and returns current service metrics in the Prometheus text exposition format.
+
+    Returns:
+        PlainTextResponse: The exposition text.
+    """
+    return PlainTextResponse(get_prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/metrics/stages",
+            summary="Get Ingest Stage Timings",
+            description="Endpoint to retrieve percentiles of the time ingest requests spend in the parse, snap, route, persist and serialize stages.",
+            response_description="The response will include aggregated timings of every stage.",
+            response_model=StageTimings)
+def get_stage_timings_handler() -> StageTimings:
+    """
+    Retrieves and returns aggregated ingest stage timings.
+
+    Returns:
+        StageTimings: Aggregated timings of every stage.
+    """
+    return get_stage_timings()
+
+
+@router.get("/metrics/traces",
+            summary="Get Sampled Request Traces",
+            description="Endpoint to retrieve the most recent sampled per-request stage timings. Sampling is configured by `profiling.trace_sample_rate`.",
+            response_description="The response will include the most recent sampled traces, newest first.",
+            response_model=List[RequestTrace])
+def get_sampled_traces_handler(limit: int = Query(100, ge=1, le=10000)) -> List[RequestTrace]:
+    """
+    Retrieves and returns the most recent sampled request traces.
+
+    Args:
+        limit (int): Maximum number of traces.
+
+    Returns:
+        List[RequestTrace]: The traces, newest first.
+    """
+    return get_sampled_traces(limit)
+
+
+@router.post("/debug/profile",
+             summary="Profile the Live Process",
+             description="Endpoint to capture a cProfile report of the live process for the given number of seconds. Enabled by `profiling.profile_endpoint_enabled`.",
+             response_description="The response will include the pstats report.",
+             response_class=PlainTextResponse)
+async def get_profile_handler(seconds: float = Query(10, gt=0)) -> PlainTextResponse:
+    """
+    Profiles the live process and returns the report.
+
+    Args:
+        seconds (float): How long to profile.
+
+    Returns:
+        PlainTextResponse: The pstats report.
+    """
+    if not settings.profiling.profile_endpoint_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    return PlainTextResponse(await get_profile(seconds))
+
+
 @router.get("/settings",
             summary="Retrieve Current Settings",
             description="Endpoint to retrieve the current settings of the service.",
@@ -1,4 +1,5 @@
 import datetime
+from typing import Dict
 
 import status as status
 from pydantic import BaseModel, Field
@@ -29,19 +30,78 @@ class BasicResponse(BaseModel):
 class ApiMetrics(BaseModel):
     uptime: datetime.timedelta = Field(..., description="Time duration since the service started")
     total_coordinates: int = Field(..., description="Total number of coordinates processed")
-    unique_drivers: int = Field(..., description="Number of unique drivers recorded")
+    coordinates_per_minute: int = Field(..., description="Number of coordinates processed during the last minute")
+    coordinates_per_hour: int = Field(..., description="Number of coordinates processed during the last hour")
+    unique_drivers: int = Field(..., description="Estimated number of unique drivers recorded")
     speed_violations: int = Field(..., description="Number of speed violations detected")
     altitude_violations: int = Field(..., description="Number of altitude violations detected")
+    distance_violations: int = Field(..., description="Number of distance violations detected")
+    location_violations: int = Field(..., description="Number of coordinates outside the configured city bounds")
     db_records: int = Field(..., description="Number of records saved to the database")
+    pending_db_records: int = Field(..., description="Number of records waiting to be written to the database")
+    db_flushes: int = Field(..., description="Number of group commits made by the write-behind flusher")
+    spilled_records: int = Field(..., description="Number of records spilled to disk while the database was unavailable")
+    replayed_records: int = Field(..., description="Number of spilled records replayed into the database")
+    spill_segments: int = Field(..., description="Number of spill log segments waiting to be replayed")
+    spill_backlog_bytes: int = Field(..., description="Size of the spill log segments waiting to be replayed in bytes")
+    last_flush_size: int = Field(..., description="Number of records written by the last group commit")
+    last_flush_interval: float = Field(..., description="Seconds between the last two group commits")
+    last_flush_duration: float = Field(..., description="Seconds spent on the last group commit")
+    ingest_p50: float = Field(..., description="Median time to process one coordinate in seconds")
+    ingest_p99: float = Field(..., description="99th percentile of the time to process one coordinate in seconds")
+    path_cache_hits: int = Field(..., description="Number of road distances answered from the cache")
+    path_cache_misses: int = Field(..., description="Number of road distances computed on the graph")
+    path_cache_size: int = Field(..., description="Number of node pairs currently in the road distance cache")
+    tracked_drivers: int = Field(..., description="Number of drivers whose last fix is kept in memory")
+    evicted_drivers: int = Field(..., description="Number of idle drivers evicted from memory")
+    driver_state_bytes: int = Field(..., description="Estimated memory taken by per-driver state in bytes")
 
     class Config:
         json_schema_extra = {
             "example": {
                 "uptime": "1 day, 1:33:21",  # Example format of timedelta
                 "total_coordinates": 44,
+                "coordinates_per_minute": 30,
+                "coordinates_per_hour": 44,
                 "unique_drivers": 13,
                 "speed_violations": 32,
                 "altitude_violations": 11,
-                "db_records": 14
+                "distance_violations": 5,
+                "location_violations": 2,
+                "db_records": 14,
+                "pending_db_records": 3,
+                "db_flushes": 7,
+                "spilled_records": 0,
+                "replayed_records": 0,
+                "spill_segments": 0,
+                "spill_backlog_bytes": 0,
+                "last_flush_size": 2,
+                "last_flush_interval": 0.5,
+                "last_flush_duration": 0.012,
+                "ingest_p50": 0.0004,
+                "ingest_p99": 0.003,
+                "path_cache_hits": 21,
+                "path_cache_misses": 9,
+                "path_cache_size": 9,
+                "tracked_drivers": 13,
+                "evicted_drivers": 0,
+                "driver_state_bytes": 4096
             }
         }
+
+
+class StageTiming(BaseModel):
+    count: int = Field(..., description="Number of timed executions of the stage")
+    mean: float = Field(..., description="Mean time spent in the stage in seconds")
+    p50: float = Field(..., description="Median time spent in the stage in seconds")
+    p90: float = Field(..., description="90th percentile of the time spent in the stage in seconds")
+    p99: float = Field(..., description="99th percentile of the time spent in the stage in seconds")
+
+
+class StageTimings(BaseModel):
+    stages: Dict[str, StageTiming] = Field(..., description="Timings of the parse, snap, route, persist and serialize stages")
+
+
+class RequestTrace(BaseModel):
+    path: str = Field(..., description="Path of the traced request")
+    stages: Dict[str, float] = Field(..., description="Time spent in every stage of the request in seconds")
@@ -1,6 +1,10 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field, constr, confloat
+from pydantic import BaseModel, Field, constr, confloat, field_validator
+
+from config import settings
 
 
 class DriverDataRequestSchema(BaseModel):
@@ -48,3 +52,136 @@ class DriverDataResponseSchema(DriverDataRequestSchema):
                 "is_correct": True
             }
         }
+
+
+class DriverDataBatchRequestSchema(BaseModel):
+    """
+    Schema for batched driver data requests sent by fleet gateways.
+    """
+    records: List[DriverDataRequestSchema] = Field(..., min_length=1, max_length=10000,
+                                                   description="Driver data records ordered by time of capture")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "records": [
+                    {
+                        "driver_id": "1c6921bc-deae-4a56-8123-7056c6b62901",
+                        "latitude": 37.7749,
+                        "longitude": -122.4194,
+                        "speed": 60.0,
+                        "altitude": 15.0
+                    }
+                ]
+            }
+        }
+
+
+class DriverDataBatchResponseSchema(BaseModel):
+    """
+    Schema for the response of batched driver data requests.
+    """
+    records: List[DriverDataResponseSchema] = Field(..., description="Processed driver data records")
+    anomalies: int = Field(..., description="Number of records flagged as anomalous")
+    queued: int = Field(..., description="Number of records queued for writing to the database")
+
+
+class DriverDataStreamRecordSchema(DriverDataRequestSchema):
+    """
+    Schema of a line of a streamed NDJSON body, which may carry the time the fix was captured.
+    """
+    created_at: Optional[datetime] = Field(None, description="Time the fix was captured, UTC unless the offset is "
+                                                             "given, defaults to the time it is received")
+
+    @field_validator("created_at")
+    @classmethod
+    def check_capture_time(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Converts the capture time to naive UTC and rejects times outside the accepted window."""
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        now = datetime.utcnow()
+        if value > now + timedelta(seconds=settings.stream.max_capture_skew_seconds):
+            raise ValueError("created_at is in the future")
+        if value < now - timedelta(days=settings.stream.max_capture_age_days):
+            raise ValueError(f"created_at is more than {settings.stream.max_capture_age_days} days old")
+        return value
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "driver_id": "1c6921bc-deae-4a56-8123-7056c6b62901",
+                "latitude": 37.7749,
+                "longitude": -122.4194,
+                "speed": 60.0,
+                "altitude": 15.0,
+                "created_at": "2024-05-01T12:00:00Z"
+            }
+        }
+
+
+class StreamRecordError(BaseModel):
+    """
+    Schema of a rejected line of a streamed NDJSON body.
+    """
+    line: int = Field(..., description="Line number within the body, starting at 1")
+    message: str = Field(..., description="Why the line was rejected")
+
+
+class DriverDataStreamResponseSchema(BaseModel):
+    """
+    Schema for the response of streamed NDJSON driver data requests.
+    """
+    received: int = Field(..., description="Number of non-empty lines received")
+    queued: int = Field(..., description="Number of records queued for writing to the database")
+    anomalies: int = Field(..., description="Number of records flagged as anomalous")
+    rejected: int = Field(..., description="Number of lines that failed schema validation")
+    errors: List[StreamRecordError] = Field(..., description="Errors of the first rejected lines")
+
+
+class DriverTrackPointSchema(BaseModel):
+    """
+    Schema of a stored point of a driver's track.
+    """
+    id: UUID = Field(..., description="Unique identifier of the point, the keyset cursor together with created_at")
+    latitude: float = Field(..., description="Latitude coordinate of the driver's location")
+    longitude: float = Field(..., description="Longitude coordinate of the driver's location")
+    altitude: float = Field(..., description="Altitude of the driver in meters")
+    speed: float = Field(..., description="Speed of the driver in km/h")
+    is_correct: bool = Field(..., description="Indicates if anomalies detected")
+    created_at: datetime = Field(..., description="Time the point was captured or received, in UTC")
+
+    class Config:
+        from_attributes = True
+
+
+class DriverLatestPositionSchema(BaseModel):
+    """
+    Schema of the latest known position of a driver.
+    """
+    driver_id: UUID = Field(..., description="Unique identifier for the driver")
+    latitude: float = Field(..., description="Latitude coordinate of the driver's location")
+    longitude: float = Field(..., description="Longitude coordinate of the driver's location")
+    altitude: float = Field(..., description="Altitude of the driver in meters")
+    speed: float = Field(..., description="Speed of the driver in km/h")
+    is_correct: bool = Field(..., description="Indicates if anomalies detected")
+    age_seconds: float = Field(..., description="Seconds since the position was received")
+
+
+class NearbyDriverSchema(BaseModel):
+    """
+    Schema of a driver found near a point.
+    """
+    driver_id: UUID = Field(..., description="Unique identifier for the driver")
+    latitude: float = Field(..., description="Latitude coordinate of the driver's location")
+    longitude: float = Field(..., description="Longitude coordinate of the driver's location")
+    distance_m: float = Field(..., description="Straight-line or road distance to the point in meters")
+    age_seconds: float = Field(..., description="Seconds since the position was received")
+
+
+class NearbyDriversResponseSchema(BaseModel):
+    """
+    Schema for the response of nearby driver requests.
+    """
+    drivers: List[NearbyDriverSchema] = Field(..., description="Drivers within the radius, nearest first")
@@ -0,0 +1,52 @@
+from typing import Dict, Optional
+
+from constants.map.csr import city_csr, city_landmarks
+
+
+def get_csr_path_length(original_node: int, destination_node: int, cutoff: Optional[float] = None) -> float:
+    """
+    Computes the shortest path length between two graph nodes with the array-backed routing engine.
+
+    The module only depends on the CSR arrays, so process workers that run it memory-map them from
+    the map artifact and never load the networkx graph.
+
+    Args:
+        original_node (int): ID of the starting node.
+        destination_node (int): ID of the destination node.
+        cutoff (Optional[float]): Search radius in meters, `math.inf` is returned if the destination is farther.
+
+    Returns:
+        float: The length of the shortest path between the two nodes in meters.
+    """
+    return city_csr.path_length(original_node, destination_node, cutoff)
+
+
+def get_alt_path_length(original_node: int, destination_node: int, cutoff: Optional[float] = None) -> float:
+    """
+    Computes the shortest path length between two graph nodes with landmark-guided A* (ALT).
+
+    Args:
+        original_node (int): ID of the starting node.
+        destination_node (int): ID of the destination node.
+        cutoff (Optional[float]): Search radius in meters, `math.inf` is returned if the destination is farther.
+
+    Returns:
+        float: The length of the shortest path between the two nodes in meters.
+    """
+    return city_landmarks.path_length(original_node, destination_node, cutoff)
+
+
+def get_csr_path_lengths_to(destination_node: int, cutoff: float) -> Dict[int, float]:
+    """
+    Computes the shortest path lengths from every node within a radius to one graph node with the array-backed graph.
+
+    Serves the nearby drivers lookup of both the csr and the alt engine, landmarks do not help a one-to-many search.
+
+    Args:
+        destination_node (int): ID of the destination node.
+        cutoff (float): Search radius in meters, farther nodes are left out.
+
+    Returns:
+        Dict[int, float]: Road distance in meters to the destination of every node within the radius.
+    """
+    return city_csr.path_lengths_to(destination_node, cutoff)
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 from tenacity import retry, stop_after_attempt, wait_fixed
 
@@ -8,21 +8,25 @@ from constants.core.metrics import metrics
 
 
 @retry(stop=stop_after_attempt(5), wait=wait_fixed(1))
-async def retry_to_save_to_db(repository: DatabaseRepository, data: Dict) -> None:
+async def retry_to_save_batch_to_db(repository: DatabaseRepository, data: List[Dict]) -> int:
     """
-    Attempts to save data to the database with retries on failure.
+    Attempts to save a batch of records to the database in a single bulk insert with retries on failure.
 
     Args:
         repository (DatabaseRepository): The repository instance to interact with the database.
-        data (Dict): The data to be saved in the database.
+        data (List[Dict]): The records to be saved in the database.
+
+    Returns:
+        int: The number of saved records.
 
     Raises:
         Exception: Re-raises the exception to allow retry logic to handle it.
     """
     try:
-        await repository.create(data)
-        metrics["db_records"] += 1
-        logger.info(f"Successfully saved data to DB: {data}")
-        logger.info(f"Updated database record count: {metrics['db_records']}")
+        saved = await repository.create_many(data)
+        metrics.inc("db_records", saved)
+        logger.info("Successfully saved %d records to DB", saved, extra={"event": "db_saved"})
+        return saved
     except Exception as e:
-        logger.error(f"Error saving data to DB: {data} \nException: {e}")
+        logger.error("Error saving batch of %d records to DB \nException: %s", len(data), e)
+        raise
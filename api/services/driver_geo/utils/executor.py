@@ -0,0 +1,92 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import settings
+from constants.core.logs import logger
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+
+def init_graph_worker(engine: str) -> None:
+    """
+    Process pool initializer that loads the routing graph once per worker.
+
+    For the `networkx` engine the worker builds its own copy of `city_G`. For the `csr` and `alt` engines
+    it only memory-maps the CSR arrays and landmark tables of the map artifact, which all workers share read-only.
+    Either way the first task sent to the worker does not pay for loading.
+
+    Args:
+        engine (str): The routing engine the worker will run.
+    """
+    if engine in ("csr", "alt"):
+        import api.services.driver_geo.utils.csr_routing  # noqa: F401
+    else:
+        import api.services.driver_geo.utils.nx_routing  # noqa: F401
+
+
+class GraphExecutor:
+    """
+    Runs CPU-bound graph searches according to the configured execution mode.
+
+    - `inline` runs them on the event loop, as before.
+    - `thread` moves them to a thread pool, which keeps the loop responsive but still shares the GIL.
+    - `process` moves them to a process pool whose workers hold their own copy of the city graph,
+      so a single API process can use all cores.
+    """
+
+    def __init__(self, mode: str, workers: Optional[int] = None, start_method: str = "spawn",
+                 engine: str = "networkx") -> None:
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{mode}', expected one of {EXECUTION_MODES}")
+        self.mode = mode
+        self.workers = workers
+        self.start_method = start_method
+        self.engine = engine
+        self._pool: Optional[Executor] = None
+
+    def start(self) -> None:
+        """Creates the worker pool for `thread` and `process` modes."""
+        if self._pool is not None or self.mode == "inline":
+            return
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="graph")
+        else:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=init_graph_worker,
+                initargs=(self.engine,),
+            )
+        logger.info("Started graph executor in %s mode", self.mode)
+
+    def stop(self) -> None:
+        """Shuts the worker pool down, dropping searches that have not started yet."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs a function in the worker pool, or on the event loop when there is none.
+
+        Args:
+            func (Callable[..., Any]): A module-level function, so it can be sent to a worker process.
+            *args (Any): Picklable arguments of the function.
+
+        Returns:
+            Any: The result of the function.
+        """
+        if self._pool is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+
+
+# Process-wide executor for graph searches
+graph_executor = GraphExecutor(
+    mode=settings.routing.execution_mode,
+    workers=settings.routing.workers,
+    start_method=settings.routing.process_start_method,
+    engine=settings.routing.engine,
+)
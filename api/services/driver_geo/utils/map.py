@@ -1,59 +1,127 @@
-import networkx as nx
-import osmnx as ox
+import math
+from typing import Dict, Optional, List
 
-from constants.core.logs import logger
-from constants.map.core import city_G
+from api.services.driver_geo.utils.csr_routing import get_csr_path_length, get_alt_path_length, \
+    get_csr_path_lengths_to
+from api.services.driver_geo.utils.executor import graph_executor
+from config import settings
+from constants.map.core import city_node_index, path_length_cache
+from utils.map.cache import PathLengthCache
+from utils.map.index import NodeIndex, EARTH_RADIUS_M
 
+# The networkx engine is only imported when it is selected, so the csr and alt engines never load
+# networkx or the City graph, in the API processes as well as in their graph workers
+if settings.routing.engine in ("csr", "alt"):
+    path_length_function = get_csr_path_length if settings.routing.engine == "csr" else get_alt_path_length
+    path_lengths_to_function = get_csr_path_lengths_to
+else:
+    from api.services.driver_geo.utils.nx_routing import get_node_path_length as path_length_function, \
+        get_node_path_lengths_to as path_lengths_to_function
 
-def get_shortest_path_length(
+
+def haversine_distance(
         original_longitude: float,
         original_latitude: float,
         destination_longitude: float,
-        destination_latitude: float,
-        city_G: nx.Graph) -> float:
+        destination_latitude: float) -> float:
     """
-    Computes the shortest path length between two geographic coordinates using a graph.
+    Computes the great-circle distance between two geographic coordinates.
+
+    No road route can be shorter than this, so it is a cheap lower bound for `get_shortest_path_length`.
 
     Args:
         original_longitude (float): Longitude of the starting point.
         original_latitude (float): Latitude of the starting point.
         destination_longitude (float): Longitude of the destination point.
         destination_latitude (float): Latitude of the destination point.
-        city_G (nx.Graph): The graph representing the city's street network.
 
     Returns:
-        float: The length of the shortest path between the two points in meters.
+        float: The distance between the two points in meters.
+    """
+    lat1, lat2 = math.radians(original_latitude), math.radians(destination_latitude)
+    half_dlat = (lat2 - lat1) / 2
+    half_dlon = math.radians(destination_longitude - original_longitude) / 2
+    a = math.sin(half_dlat) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def is_within_bounds(longitude: float, latitude: float,
+                     longitude_range: List[float], latitude_range: List[float]) -> bool:
+    """
+    Checks whether a geographic coordinate lies inside a bounding box.
+
+    Args:
+        longitude (float): Longitude of the point.
+        latitude (float): Latitude of the point.
+        longitude_range (List[float]): Minimum and maximum longitude of the box.
+        latitude_range (List[float]): Minimum and maximum latitude of the box.
+
+    Returns:
+        bool: True if the point is inside the box, False otherwise.
+    """
+    return (longitude_range[0] <= longitude <= longitude_range[1]
+            and latitude_range[0] <= latitude <= latitude_range[1])
+
 
-    Raises:
-        ValueError: If nodes cannot be found for the given coordinates.
-        NetworkXNoPath: If no path exists between the two nodes.
+def get_nearest_node(longitude: float, latitude: float, node_index: NodeIndex = city_node_index) -> int:
     """
-    try:
-        # Find nearest nodes in the graph
-        original_node = ox.distance.nearest_nodes(city_G, original_longitude, original_latitude)
-        destination_node = ox.distance.nearest_nodes(city_G, destination_longitude, destination_latitude)
+    Snaps a geographic coordinate to the nearest node of the city graph.
 
-        if original_node is None or destination_node is None:
-            raise ValueError("One or both of the nearest nodes could not be found for the given coordinates.")
+    Args:
+        longitude (float): Longitude of the point.
+        latitude (float): Latitude of the point.
+        node_index (NodeIndex): The prebuilt index over the graph nodes.
 
-        # Uncomment to draw a path plot on map
-        # distance = nx.shortest_path(city_G, original_node, destination_node, weight='length')
-        # route_map = ox.plot_graph_route(city_G, distance)
+    Returns:
+        int: ID of the nearest node.
+    """
+    return node_index.nearest(longitude, latitude)
 
-        # Compute the shortest path length
-        route_length = nx.shortest_path_length(city_G, original_node, destination_node, weight='length')
 
-        logger.info(
-            f"Shortest path length from ({original_latitude}, {original_longitude}) to ({destination_latitude}, {destination_longitude}): {route_length} meters")
+async def get_node_path_length_async(
+        original_node: int,
+        destination_node: int,
+        cutoff: Optional[float] = None,
+        path_cache: Optional[PathLengthCache] = path_length_cache) -> float:
+    """
+    Computes the shortest path length between two graph nodes on the configured graph executor.
 
-        return route_length
+    Identical nodes and cached node pairs are answered on the event loop, only graph searches are sent to the executor.
+    The search uses the routing engine selected by `routing.engine`.
 
-    except ValueError as ve:
-        logger.error(f"Value error: {ve}")
-        raise
-    except nx.NetworkXNoPath as np:
-        logger.error(f"No path found between nodes: {np}")
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        raise
+    Args:
+        original_node (int): ID of the starting node.
+        destination_node (int): ID of the destination node.
+        cutoff (Optional[float]): Search radius in meters, `math.inf` is returned if the destination is farther.
+        path_cache (Optional[PathLengthCache]): Cache of distances between node pairs, None to always search the graph.
+
+    Returns:
+        float: The length of the shortest path between the two nodes in meters.
+    """
+    if original_node == destination_node:
+        return 0.0
+
+    if path_cache is not None:
+        route_length = path_cache.get(original_node, destination_node, cutoff)
+        if route_length is not None:
+            return route_length
+
+    route_length = await graph_executor.run(path_length_function, original_node, destination_node, cutoff)
+
+    if path_cache is not None:
+        path_cache.put(original_node, destination_node, route_length, cutoff)
+    return route_length
+
+
+async def get_node_path_lengths_to_async(destination_node: int, cutoff: float) -> Dict[int, float]:
+    """
+    Computes the shortest path lengths from every node within a radius to one graph node on the configured graph executor.
+
+    Args:
+        destination_node (int): ID of the destination node.
+        cutoff (float): Search radius in meters, farther nodes are left out.
+
+    Returns:
+        Dict[int, float]: Road distance in meters to the destination of every node within the radius.
+    """
+    return await graph_executor.run(path_lengths_to_function, destination_node, cutoff)
@@ -0,0 +1,156 @@
+import zlib
+from typing import AsyncIterator, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd bodies are rejected when the package is not installed
+    zstandard = None
+
+SUPPORTED_ENCODINGS = ("identity", "gzip", "zstd")
+
+_DECOMPRESSION_ERRORS = (zlib.error,) if zstandard is None else (zlib.error, zstandard.ZstdError)
+
+# Most decompressed bytes handed out at once, so a small chunk can not expand into a huge buffer
+DECOMPRESS_PIECE_BYTES = 65536
+
+# zstd can not limit the output of a call, but a block of at most 128 KiB takes at least 4 bytes of input,
+# so compressed input is fed in slices that expand to at most 2 MiB
+ZSTD_INPUT_SLICE_BYTES = 64
+
+
+class NDJSONError(ValueError):
+    """
+    Raised when a streamed NDJSON body cannot be decoded.
+    """
+
+
+class _IdentityDecompressor:
+    eof = True
+
+    def decompress(self, chunk: bytes) -> Iterator[bytes]:
+        yield chunk
+
+
+class _GzipDecompressor:
+    """
+    Incremental gzip decoder with bounded output.
+
+    A body of several concatenated gzip members is decoded member after member, like the gzip tool does.
+    """
+
+    def __init__(self) -> None:
+        # 16 + MAX_WBITS makes zlib expect a gzip header and trailer
+        self._member = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    @property
+    def eof(self) -> bool:
+        return self._member.eof and not self._member.unused_data
+
+    def decompress(self, chunk: bytes) -> Iterator[bytes]:
+        data = chunk
+        while True:
+            if self._member.eof:
+                data = self._member.unused_data + data
+                if not data:
+                    return
+                self._member = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            piece = self._member.decompress(data, DECOMPRESS_PIECE_BYTES)
+            data = self._member.unconsumed_tail
+            if piece:
+                yield piece
+            # A full piece may leave more output buffered inside zlib even when all input is consumed
+            if not data and not self._member.eof and len(piece) < DECOMPRESS_PIECE_BYTES:
+                return
+
+
+class _ZstdDecompressor:
+    """
+    Incremental zstd decoder with bounded output, which decodes concatenated frames one after another.
+    """
+
+    def __init__(self) -> None:
+        self._frame = zstandard.ZstdDecompressor().decompressobj()
+
+    @property
+    def eof(self) -> bool:
+        return self._frame.eof
+
+    def decompress(self, chunk: bytes) -> Iterator[bytes]:
+        for start in range(0, len(chunk), ZSTD_INPUT_SLICE_BYTES):
+            data = chunk[start:start + ZSTD_INPUT_SLICE_BYTES]
+            while data:
+                if self._frame.eof:
+                    self._frame = zstandard.ZstdDecompressor().decompressobj()
+                output = self._frame.decompress(data)
+                data = self._frame.unused_data if self._frame.eof else b""
+                for offset in range(0, len(output), DECOMPRESS_PIECE_BYTES):
+                    yield output[offset:offset + DECOMPRESS_PIECE_BYTES]
+
+
+def create_decompressor(encoding: Optional[str]):
+    """
+    Creates an incremental decompressor for a `Content-Encoding`.
+
+    Args:
+        encoding (Optional[str]): The content encoding, None or "identity" for an uncompressed body.
+
+    Returns:
+        An object whose `decompress(chunk)` yields the decompressed bytes available so far in pieces of bounded
+        size and whose `eof` tells whether the compressed stream ended at a frame boundary.
+
+    Raises:
+        NDJSONError: If the encoding is not supported.
+    """
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return _IdentityDecompressor()
+    if encoding == "gzip":
+        return _GzipDecompressor()
+    if encoding == "zstd" and zstandard is not None:
+        return _ZstdDecompressor()
+    raise NDJSONError(f"Unsupported content encoding '{encoding}', expected one of {', '.join(SUPPORTED_ENCODINGS)}")
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes], encoding: Optional[str],
+                            max_line_bytes: int, max_body_bytes: int) -> AsyncIterator[bytes]:
+    """
+    Decompresses a body chunk by chunk and yields its non-empty lines as soon as they are complete.
+
+    Only the current incomplete line and one decompressed piece are buffered, so memory does not grow
+    with the size of the body, nor with its compression ratio.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw body chunks, e.g. `request.stream()`.
+        encoding (Optional[str]): The `Content-Encoding` of the body.
+        max_line_bytes (int): Longest accepted line, guards against bodies without newlines.
+        max_body_bytes (int): Largest accepted decompressed body, guards against decompression bombs.
+
+    Yields:
+        bytes: One JSON document per line, without the trailing newline.
+
+    Raises:
+        NDJSONError: If the encoding is not supported, the body is corrupt or a line or the body is too long.
+    """
+    decompressor = create_decompressor(encoding)
+    buffer = b""
+    body_bytes = 0
+    async for chunk in chunks:
+        try:
+            for piece in decompressor.decompress(chunk):
+                body_bytes += len(piece)
+                if body_bytes > max_body_bytes:
+                    raise NDJSONError(f"Body larger than {max_body_bytes} bytes")
+
+                *lines, buffer = (buffer + piece).split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield line
+                if len(buffer) > max_line_bytes:
+                    raise NDJSONError(f"Line longer than {max_line_bytes} bytes")
+        except _DECOMPRESSION_ERRORS as e:
+            raise NDJSONError(f"Corrupt {encoding} body: {e}") from e
+
+    if not decompressor.eof:
+        raise NDJSONError(f"Truncated {encoding} body")
+    if buffer.strip():
+        yield buffer
@@ -0,0 +1,144 @@
+import math
+from typing import Dict, Optional
+
+import networkx as nx
+
+from constants.core.logs import logger
+from constants.map.core import city_node_index, path_length_cache
+from constants.map.graph import city_G
+from utils.map.cache import PathLengthCache
+from utils.map.index import NodeIndex
+
+
+def get_node_path_length(
+        original_node: int,
+        destination_node: int,
+        cutoff: Optional[float] = None,
+        city_G: nx.Graph = city_G) -> float:
+    """
+    Computes the shortest path length between two graph nodes.
+
+    Only node IDs go in and a float comes out, so the call is cheap to send to a worker process,
+    which searches its own copy of the city graph.
+
+    Args:
+        original_node (int): ID of the starting node.
+        destination_node (int): ID of the destination node.
+        cutoff (Optional[float]): Search radius in meters, `math.inf` is returned if the destination is farther.
+        city_G (nx.Graph): The graph representing the city's street network.
+
+    Returns:
+        float: The length of the shortest path between the two nodes in meters.
+
+    Raises:
+        NetworkXNoPath: If no path exists between the two nodes and no cutoff is given.
+    """
+    if cutoff is None:
+        return nx.shortest_path_length(city_G, original_node, destination_node, weight='length')
+    try:
+        route_length, _ = nx.single_source_dijkstra(
+            city_G, original_node, destination_node, cutoff=cutoff, weight='length')
+        return route_length
+    except nx.NetworkXNoPath:
+        return math.inf
+
+
+def get_node_path_lengths_to(
+        destination_node: int,
+        cutoff: float,
+        city_G: nx.Graph = city_G) -> Dict[int, float]:
+    """
+    Computes the shortest path lengths from every node within a radius to one graph node.
+
+    One Dijkstra search on the reversed graph replaces a search per starting node, which is what
+    ranking many drivers by their road distance to a single point needs.
+
+    Args:
+        destination_node (int): ID of the destination node.
+        cutoff (float): Search radius in meters, farther nodes are left out.
+        city_G (nx.Graph): The graph representing the city's street network.
+
+    Returns:
+        Dict[int, float]: Road distance in meters to the destination of every node within the radius.
+    """
+    reversed_G = city_G.reverse(copy=False) if city_G.is_directed() else city_G
+    return nx.single_source_dijkstra_path_length(reversed_G, destination_node, cutoff=cutoff, weight='length')
+
+
+def get_shortest_path_length(
+        original_longitude: float,
+        original_latitude: float,
+        destination_longitude: float,
+        destination_latitude: float,
+        city_G: nx.Graph,
+        original_node: Optional[int] = None,
+        destination_node: Optional[int] = None,
+        node_index: NodeIndex = city_node_index,
+        cutoff: Optional[float] = None,
+        path_cache: Optional[PathLengthCache] = path_length_cache) -> float:
+    """
+    Computes the shortest path length between two geographic coordinates using a graph.
+
+    Args:
+        original_longitude (float): Longitude of the starting point.
+        original_latitude (float): Latitude of the starting point.
+        destination_longitude (float): Longitude of the destination point.
+        destination_latitude (float): Latitude of the destination point.
+        city_G (nx.Graph): The graph representing the city's street network.
+        original_node (Optional[int]): Already snapped node of the starting point, if known.
+        destination_node (Optional[int]): Already snapped node of the destination point, if known.
+        node_index (NodeIndex): The prebuilt index over the graph nodes, used for points that are not snapped yet.
+        cutoff (Optional[float]): Search radius in meters. When given, the search stops as soon as
+            every node within the radius is explored and `math.inf` is returned if the destination is farther.
+        path_cache (Optional[PathLengthCache]): Cache of distances between node pairs, None to always search the graph.
+
+    Returns:
+        float: The length of the shortest path between the two points in meters.
+
+    Raises:
+        ValueError: If nodes cannot be found for the given coordinates.
+        NetworkXNoPath: If no path exists between the two nodes and no cutoff is given.
+    """
+    try:
+        # Find nearest nodes in the graph unless they are already known
+        if original_node is None:
+            original_node = node_index.nearest(original_longitude, original_latitude)
+        if destination_node is None:
+            destination_node = node_index.nearest(destination_longitude, destination_latitude)
+
+        if original_node is None or destination_node is None:
+            raise ValueError("One or both of the nearest nodes could not be found for the given coordinates.")
+
+        # Uncomment to draw a path plot on map
+        # distance = nx.shortest_path(city_G, original_node, destination_node, weight='length')
+        # route_map = ox.plot_graph_route(city_G, distance)
+
+        if original_node == destination_node:
+            return 0.0
+
+        if path_cache is not None:
+            route_length = path_cache.get(original_node, destination_node, cutoff)
+            if route_length is not None:
+                return route_length
+
+        # Compute the shortest path length
+        route_length = get_node_path_length(original_node, destination_node, cutoff, city_G)
+
+        if path_cache is not None:
+            path_cache.put(original_node, destination_node, route_length, cutoff)
+
+        logger.info("Shortest path length from (%s, %s) to (%s, %s): %s meters",
+                    original_latitude, original_longitude, destination_latitude, destination_longitude, route_length,
+                    extra={"event": "route_computed"})
+
+        return route_length
+
+    except ValueError as ve:
+        logger.error("Value error: %s", ve)
+        raise
+    except nx.NetworkXNoPath as np:
+        logger.error("No path found between nodes: %s", np)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error: %s", e)
+        raise
@@ -0,0 +1,79 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from api.database.session import get_db_session
+from config import settings
+from constants.core.logs import logger
+
+
+class PartitionMaintainer:
+    """
+    Keeps the daily partitions of driver_data ahead of time and applies retention.
+
+    Partitions for today and the next `days_ahead` days are created, and with a `retention_days`
+    the partitions of older days are dropped, which removes old data without a DELETE and the
+    vacuuming that follows it. Both are done by database functions created in the partitioning
+    migration, so the work is the same whether it is triggered here or by an external scheduler.
+    """
+
+    def __init__(self, days_ahead: int, retention_days: Optional[int], interval_seconds: float) -> None:
+        self.days_ahead = days_ahead
+        self.retention_days = retention_days
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Starts the periodic maintenance on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the periodic maintenance."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                created, dropped = await self.maintain()
+                if created or dropped:
+                    logger.info("Created %d and dropped %d driver_data partitions", created, dropped)
+            except (SQLAlchemyError, OSError) as e:
+                logger.error("Failed to maintain driver_data partitions, will retry \n %s", e)
+            await asyncio.sleep(self.interval_seconds)
+
+    async def maintain(self) -> Tuple[int, int]:
+        """
+        Creates the missing future partitions and drops the expired ones.
+
+        Returns:
+            Tuple[int, int]: Numbers of created and dropped partitions.
+        """
+        async with asynccontextmanager(get_db_session)() as session:
+            created = (await session.execute(
+                text("SELECT driver_data_create_partitions(current_date, current_date + CAST(:days AS integer))"),
+                {"days": self.days_ahead})).scalar_one()
+            dropped = 0
+            if self.retention_days is not None:
+                dropped = (await session.execute(
+                    text("SELECT driver_data_drop_partitions(current_date - CAST(:days AS integer))"),
+                    {"days": self.retention_days})).scalar_one()
+            await session.commit()
+        return created, dropped
+
+
+# Process-wide maintainer of the driver_data partitions
+partition_maintainer = PartitionMaintainer(
+    days_ahead=settings.partitions.days_ahead,
+    retention_days=settings.partitions.retention_days,
+    interval_seconds=settings.partitions.maintenance_interval_seconds,
+)
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from api.database.repository import DatabaseRepository
+from api.database.session import check_db_connection, get_db_session
+from api.services.driver_geo.models.driver import DriverData
+from config import settings, base_dir
+from constants.core.logs import logger
+from constants.core.metrics import metrics
+from utils.core.spill_log import SegmentReader, SpillLog
+
+
+def to_spill_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Assigns the primary key of a record before it is spilled.
+
+    The row keeps the time it was captured or received rather than the time it is replayed, and replaying
+    a segment twice, e.g. after a crash in the middle of it, inserts every row only once.
+
+    Args:
+        record (Dict[str, Any]): The record waiting for the database.
+
+    Returns:
+        Dict[str, Any]: The JSON serializable record with `id` and `created_at`.
+    """
+    return {**record, "id": str(uuid.uuid4()), "created_at": record["created_at"].isoformat()}
+
+
+def from_spill_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts a spilled record back to column values.
+
+    Args:
+        record (Dict[str, Any]): The record read from a segment.
+
+    Returns:
+        Dict[str, Any]: The column values of the row.
+    """
+    return {**record, "id": uuid.UUID(record["id"]), "created_at": datetime.fromisoformat(record["created_at"])}
+
+
+async def replay_batch_to_db(records: List[Dict[str, Any]]) -> int:
+    """
+    Writes spilled records to the driver_data table with a single bulk insert, skipping rows already written.
+
+    Args:
+        records (List[Dict[str, Any]]): The spilled records.
+
+    Returns:
+        int: The number of written records.
+    """
+    async with asynccontextmanager(get_db_session)() as session:
+        saved = await DatabaseRepository(DriverData, session).create_many(
+            [from_spill_record(record) for record in records], ignore_conflicts=True)
+    metrics.inc("db_records", saved)
+    return saved
+
+
+class SpillReplayer:
+    """
+    Drains the spill log into the database once it is reachable again.
+
+    Segments are replayed oldest first in batches of `batch_size` records and deleted once fully written.
+    A failed batch ends the attempt, the next one starts `interval_seconds` later from the beginning of the
+    same segment. When only the active segment of this process is left and the database is reachable, it is
+    sealed so it can be replayed, and the write-behind writer goes back to the database as soon as no segment
+    is left. Segments are read on a thread, so large batches do not block the event loop.
+    """
+
+    def __init__(self, spill_log: SpillLog, batch_size: int, interval_seconds: float) -> None:
+        self.spill_log = spill_log
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Starts replaying on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops replaying, segments left are replayed after the next start."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                while await self.replay():
+                    pass
+            except (SQLAlchemyError, OSError) as e:
+                logger.error("Failed to replay spilled records, will retry \n %s", e)
+            await asyncio.sleep(self.interval_seconds)
+
+    async def replay(self) -> bool:
+        """
+        Replays every segment that is not locked by a writer or another replayer.
+
+        The active segment of this process is sealed and replayed last, once all older segments are written
+        and the database is known to be reachable, so an outage does not leave a segment per attempt.
+
+        Returns:
+            bool: True if any segment was replayed, so more may be ready.
+        """
+        replayed = False
+        active_path = None
+        for path in self.spill_log.segments():
+            if self.spill_log.is_active(path):
+                active_path = path
+                continue
+            replayed |= await self._replay_segment(path)
+        if active_path is not None and (replayed or await check_db_connection()):
+            self.spill_log.seal()
+            replayed |= await self._replay_segment(active_path)
+        return replayed
+
+    async def _replay_segment(self, path: str) -> bool:
+        reader = await asyncio.to_thread(SegmentReader.claim, path)
+        if reader is None:
+            return False
+        try:
+            batches = reader.batches(self.batch_size)
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                await replay_batch_to_db(batch)
+                metrics.inc("replayed_records", len(batch))
+            await asyncio.to_thread(reader.remove)
+        finally:
+            reader.close()
+        metrics.inc("replayed_segments")
+        logger.info("Replayed spilled segment %s", path, extra={"event": "spill_replayed"})
+        return True
+
+
+# Process-wide log of records the database could not take, shared by the workers of the host
+spill_log = SpillLog(
+    directory=os.path.join(base_dir, settings.spill.directory),
+    segment_max_bytes=settings.spill.segment_max_bytes,
+)
+
+# Process-wide replayer of the spill log, it also drains segments left from a previous run
+spill_replayer = SpillReplayer(
+    spill_log=spill_log,
+    batch_size=settings.spill.replay_batch_size,
+    interval_seconds=settings.spill.replay_interval_seconds,
+)
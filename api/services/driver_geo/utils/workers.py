@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from api.services.driver_geo.utils.write_behind import write_behind
+from config import settings
+from constants.core.logs import logger
+from constants.core.metrics import metrics
+from constants.map.core import path_length_cache
+from utils.core.metrics import MetricsRegistry
+
+
+def get_local_gauges() -> Dict[str, float]:
+    """
+    Returns the gauges computed on demand that describe this process only.
+
+    Returns:
+        Dict[str, float]: Gauge values by name.
+    """
+    return {
+        "pending_db_records": write_behind.pending_records,
+        "path_cache_hits": path_length_cache.hits,
+        "path_cache_misses": path_length_cache.misses,
+        "path_cache_size": len(path_length_cache),
+    }
+
+
+def is_running(pid: int) -> bool:
+    """
+    Checks whether a process exists.
+
+    Args:
+        pid (int): The process ID.
+
+    Returns:
+        bool: True if the process is running, also when it belongs to another user.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsPublisher:
+    """
+    Shares the metrics of every worker process, so any worker can report the totals of all of them.
+
+    Each worker periodically writes a snapshot of its registry to a file of its own, named by its PID,
+    in a directory named by the PID of the process manager that started the workers. Files are replaced
+    atomically, so readers never see a partial snapshot. `collect` merges the snapshots of the other
+    workers with the live metrics of the calling one. The snapshot of a worker that stopped is kept,
+    so totals do not drop when a worker is restarted, but its on-demand gauges are no longer counted.
+    The directories of process managers that are no longer running are removed when a worker starts.
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: Optional[str], interval_seconds: float,
+                 local_gauges: Callable[[], Dict[str, float]]) -> None:
+        self.registry = registry
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self.local_gauges = local_gauges
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def path(self) -> str:
+        """The snapshot file of this process."""
+        return os.path.join(self.directory, f"{os.getpid()}.json")
+
+    def start(self) -> None:
+        """Starts publishing on the running event loop, if metrics are shared."""
+        if self.directory is not None and self._task is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._remove_stale_directories()
+            self._task = asyncio.create_task(self._run())
+
+    def _remove_stale_directories(self) -> None:
+        parent = os.path.dirname(self.directory)
+        for name in os.listdir(parent):
+            path = os.path.join(parent, name)
+            if name.isdigit() and path != self.directory and not is_running(int(name)):
+                shutil.rmtree(path, ignore_errors=True)
+
+    async def stop(self) -> None:
+        """Stops publishing and publishes the final snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self.publish()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.publish()
+            except OSError as e:
+                logger.error("Failed to publish metrics, will retry \n %s", e)
+            await asyncio.sleep(self.interval_seconds)
+
+    def publish(self) -> None:
+        """Writes the snapshot of this process."""
+        snapshot = {
+            "published_at": time.monotonic(),
+            "metrics": self.registry.snapshot(),
+            "gauges": self.local_gauges(),
+        }
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(temporary_path, self.path)
+
+    def collect(self) -> Tuple[MetricsRegistry, Dict[str, float]]:
+        """
+        Returns the metrics and on-demand gauges of all workers.
+
+        Returns:
+            Tuple[MetricsRegistry, Dict[str, float]]: The merged registry and the summed gauges,
+            only those of this process when metrics are not shared.
+        """
+        gauges = self.local_gauges()
+        if self.directory is None:
+            return self.registry, gauges
+
+        registry = self.registry.copy_definitions()
+        registry.merge(self.registry.snapshot())
+        now = time.monotonic()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(".json") or path == self.path:
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable metrics snapshot %s: %s", path, e)
+                continue
+            registry.merge(snapshot["metrics"])
+            if now - snapshot["published_at"] <= 3 * self.interval_seconds:
+                for gauge, value in snapshot["gauges"].items():
+                    gauges[gauge] = gauges.get(gauge, 0) + value
+        return registry, gauges
+
+
+# Process-wide publisher, metrics are only shared in the shared worker mode
+metrics_publisher = MetricsPublisher(
+    registry=metrics,
+    directory=os.path.join(settings.workers.state_dir, "metrics", str(os.getppid()))
+    if settings.workers.mode == "shared" else None,
+    interval_seconds=settings.workers.metrics_publish_interval_seconds,
+    local_gauges=get_local_gauges,
+)
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from tenacity import RetryError
+
+from api.database.repository import DatabaseRepository
+from api.database.session import get_db_session
+from api.services.driver_geo.models.driver import DriverData
+from api.services.driver_geo.utils.database import retry_to_save_batch_to_db
+from api.services.driver_geo.utils.spill import spill_log, to_spill_record
+from config import settings
+from constants.core.logs import logger
+from constants.core.metrics import metrics
+from utils.core.spill_log import SpillLog
+
+# Queued by `stop` to wake up the flusher waiting for records, it is never written
+_STOP = object()
+
+
+async def save_batch_to_db(records: List[Dict[str, Any]]) -> int:
+    """
+    Writes records to the driver_data table with a single bulk insert in its own session.
+
+    Args:
+        records (List[Dict[str, Any]]): The records to be saved in the database.
+
+    Returns:
+        int: The number of saved records.
+    """
+    async with asynccontextmanager(get_db_session)() as session:
+        return await retry_to_save_batch_to_db(DatabaseRepository(DriverData, session), records)
+
+
+class WriteBehindWriter:
+    """
+    Decouples ingest from database commits.
+
+    Requests put validated records on a bounded queue and return right away. A background
+    flusher drains the queue into group commits, flushing as soon as `flush_max_records`
+    records are collected or `flush_interval_seconds` passed since the first one arrived.
+    A full queue makes `put` wait, which applies backpressure to ingest instead of growing memory.
+
+    With a `spill_log`, a batch the database does not take is appended to the log on local disk instead
+    of being kept in memory, and while spilled records wait for replay, new batches go straight to the log
+    rather than through the retries of a database that is most likely still down.
+
+    Batches are written by `save_batch`, which can be replaced by a stand-in, e.g. in benchmarks.
+    """
+
+    def __init__(self, queue_size: int, flush_max_records: int, flush_interval_seconds: float,
+                 save_batch: Callable[[List[Dict[str, Any]]], Awaitable[int]] = save_batch_to_db,
+                 spill_log: Optional[SpillLog] = None) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.flush_max_records = flush_max_records
+        self.flush_interval_seconds = flush_interval_seconds
+        self.save_batch = save_batch
+        self.spill_log = spill_log
+        self._pending: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_flush_at: Optional[float] = None
+
+    @property
+    def pending_records(self) -> int:
+        """Number of records accepted but not yet written to the database."""
+        return self.queue.qsize() + len(self._pending)
+
+    async def put(self, record: Dict[str, Any]) -> None:
+        """
+        Queues a record for writing, waiting while the queue is full.
+
+        Args:
+            record (Dict[str, Any]): The record to be saved in the database.
+        """
+        await self.queue.put(record)
+
+    def start(self) -> None:
+        """Starts the background flusher on the running event loop."""
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the flusher and makes a final attempt to write everything still queued.
+
+        The flusher is asked to finish its current batch and exit rather than cancelled, because
+        `asyncio.wait_for` can swallow a cancellation that arrives as the awaited `get` completes,
+        which would leave the flusher waiting for records forever.
+        """
+        if self._task is not None:
+            self._stopping = True
+            # A full queue wakes the flusher anyway
+            if not self.queue.full():
+                self.queue.put_nowait(_STOP)
+            await self._task
+            self._task = None
+
+        while not self.queue.empty():
+            record = self.queue.get_nowait()
+            if record is not _STOP:
+                self._pending.append(record)
+        if self._pending:
+            await self._flush()
+        if self._pending:
+            logger.error("%d records were not written to DB on shutdown", len(self._pending))
+        if self.spill_log is not None:
+            self.spill_log.seal()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await self._collect()
+            if self._pending and not await self._flush() and not self._stopping:
+                await asyncio.sleep(self.flush_interval_seconds)
+
+    async def _collect(self) -> None:
+        """Fills the pending batch until it is full, the flush interval is over or the writer is stopping."""
+        if not self._pending:
+            record = await self.queue.get()
+            if record is _STOP:
+                return
+            self._pending.append(record)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval_seconds
+        while len(self._pending) < self.flush_max_records and not self._stopping:
+            if not self.queue.empty():
+                record = self.queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if record is _STOP:
+                return
+            self._pending.append(record)
+
+    async def _flush(self) -> bool:
+        """
+        Writes the pending batch with a single bulk insert.
+
+        On failure the batch is spilled, or kept for the next flush when there is no spill log.
+        """
+        if self.spill_log is not None and self.spill_log.has_backlog():
+            return await self._spill()
+
+        started_at = time.monotonic()
+        try:
+            saved = await self.save_batch(self._pending)
+        except (RetryError, SQLAlchemyError, OSError) as e:
+            if self.spill_log is not None:
+                logger.error("Failed to write %d records to DB, spilling them to disk \n %s", len(self._pending), e)
+                return await self._spill()
+            logger.error("Failed to write %d records to DB, will retry \n %s", len(self._pending), e)
+            return False
+
+        finished_at = time.monotonic()
+        metrics.inc("db_flushes")
+        metrics.set("last_flush_size", saved)
+        metrics.set("last_flush_duration", finished_at - started_at)
+        metrics.observe("db_flush", finished_at - started_at)
+        if self._last_flush_at is not None:
+            metrics.set("last_flush_interval", finished_at - self._last_flush_at)
+        self._last_flush_at = finished_at
+        self._pending = []
+        return True
+
+    async def _spill(self) -> bool:
+        """Appends the pending batch to the spill log, keeping it for the next flush on failure."""
+        # The fsync runs on a thread, so the event loop keeps serving requests while the disk flushes
+        try:
+            await asyncio.to_thread(self.spill_log.append, [to_spill_record(record) for record in self._pending])
+        except OSError as e:
+            logger.error("Failed to spill %d records to disk, will retry \n %s", len(self._pending), e)
+            return False
+        metrics.inc("spilled_records", len(self._pending))
+        self._pending = []
+        return True
+
+
+# Process-wide writer shared by all ingest requests
+write_behind = WriteBehindWriter(
+    queue_size=settings.write_behind.queue_size,
+    flush_max_records=settings.write_behind.flush_max_records,
+    flush_interval_seconds=settings.write_behind.flush_interval_seconds,
+    spill_log=spill_log if settings.spill.enabled else None,
+)
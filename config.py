@@ -1,5 +1,5 @@
 import json
-from typing import List
+from typing import Dict, List, Literal, Optional
 from pydantic_settings import BaseSettings
 import os
 
@@ -11,6 +11,9 @@ class DriverServiceSettings(BaseSettings):
 
 class DriverSettings(BaseSettings):
     number_of_drivers: int
+    generator_mode: Literal["threaded", "async"] = "threaded"
+    concurrency: int = 100
+    target_requests_per_second: Optional[float] = None
 
 
 class LocationSettings(BaseSettings):
@@ -32,10 +35,114 @@ class DatabaseSettings(BaseSettings):
     password: str
     database_name: str
     url: str
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout_seconds: float = 30
+    pool_recycle_seconds: int = 1800
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100
 
 
 class ElevationSettings(BaseSettings):
     lookup_url: str
+    provider: Literal["http", "dem"] = "http"
+    grid_size: int = 200
+    cache_size: int = 100000
+    cache_precision: int = 4
+
+
+class DriverStateSettings(BaseSettings):
+    ttl_seconds: float = 600
+    max_drivers: int = 1000000
+
+
+class LoggingSettings(BaseSettings):
+    level: str = "INFO"
+    json_output: bool = True
+    sample_rates: Dict[str, int] = {
+        "fix_received": 100,
+        "fix_processed": 100,
+        "batch_received": 10,
+        "batch_processed": 10,
+        "route_computed": 100,
+        "db_saved": 100,
+        "health_check": 10,
+        "metrics_summary": 10,
+    }
+
+
+class MapSettings(BaseSettings):
+    artifact_dir: str = "map_data"
+
+
+class NearbySettings(BaseSettings):
+    cell_size_m: float = 250
+    max_radius_m: float = 5000
+    max_k: int = 100
+
+
+class PartitionSettings(BaseSettings):
+    days_ahead: int = 7
+    retention_days: Optional[int] = None
+    maintenance_interval_seconds: int = 3600
+
+
+class ProfilingSettings(BaseSettings):
+    trace_sample_rate: float = 0.0
+    trace_buffer_size: int = 1000
+    profile_endpoint_enabled: bool = False
+    max_profile_seconds: int = 60
+
+
+class RoutingSettings(BaseSettings):
+    engine: Literal["networkx", "csr", "alt"] = "networkx"
+    landmarks: int = 16
+    path_cache_size: int = 100000
+    execution_mode: Literal["inline", "thread", "process"] = "inline"
+    workers: Optional[int] = None
+    process_start_method: Literal["spawn", "forkserver", "fork"] = "spawn"
+
+
+class SimulationSettings(BaseSettings):
+    movement: Literal["random", "trajectory"] = "random"
+    seed: Optional[int] = None
+    speed_anomaly_rate: float = 0.0
+    altitude_anomaly_rate: float = 0.0
+    teleport_rate: float = 0.0
+
+
+class SpillSettings(BaseSettings):
+    enabled: bool = True
+    directory: str = "spill"
+    segment_max_bytes: int = 67108864
+    replay_batch_size: int = 5000
+    replay_interval_seconds: float = 5.0
+
+
+class StreamSettings(BaseSettings):
+    max_body_bytes: int = 268435456
+    max_capture_age_days: int = 7
+    max_capture_skew_seconds: int = 60
+    max_line_bytes: int = 65536
+    max_reported_errors: int = 100
+
+
+class TrackSettings(BaseSettings):
+    batch_size: int = 1000
+    max_points: int = 100000
+
+
+class WorkersSettings(BaseSettings):
+    mode: Literal["single", "shared"] = "single"
+    state_dir: str = "/dev/shm/driver_geo"
+    probe_window: int = 32
+    metrics_publish_interval_seconds: float = 1.0
+
+
+class WriteBehindSettings(BaseSettings):
+    queue_size: int = 100000
+    flush_max_records: int = 1000
+    flush_interval_seconds: float = 0.5
 
 
 class Settings(BaseSettings):
@@ -45,6 +152,19 @@ class Settings(BaseSettings):
     data_limits: DataLimitsSettings
     database: DatabaseSettings
     elevation: ElevationSettings
+    driver_state: DriverStateSettings = DriverStateSettings()
+    logging: LoggingSettings = LoggingSettings()
+    map: MapSettings = MapSettings()
+    nearby: NearbySettings = NearbySettings()
+    partitions: PartitionSettings = PartitionSettings()
+    profiling: ProfilingSettings = ProfilingSettings()
+    routing: RoutingSettings = RoutingSettings()
+    simulation: SimulationSettings = SimulationSettings()
+    spill: SpillSettings = SpillSettings()
+    stream: StreamSettings = StreamSettings()
+    track: TrackSettings = TrackSettings()
+    workers: WorkersSettings = WorkersSettings()
+    write_behind: WriteBehindSettings = WriteBehindSettings()
 
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -1,5 +0,0 @@
-from collections import defaultdict
-from typing import Dict, List, Any
-
-# Buffer for driver data
-buffered_data: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
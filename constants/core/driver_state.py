@@ -0,0 +1,29 @@
+import os
+
+from config import settings
+from utils.core.driver_state import DriverStateStore
+from utils.core.shared_driver_state import SharedDriverStateStore, SharedPositionIndex
+from utils.map.grid import PositionGrid
+
+if settings.workers.mode == "shared":
+    # Last fix and latest valid position of every active driver, shared by all worker processes
+    driver_states = SharedDriverStateStore(
+        path=os.path.join(settings.workers.state_dir, "driver_states"),
+        capacity=settings.driver_state.max_drivers,
+        ttl_seconds=settings.driver_state.ttl_seconds,
+        probe_window=settings.workers.probe_window,
+    )
+    driver_positions = SharedPositionIndex(driver_states)
+else:
+    # Latest valid position of every active driver, for nearby driver queries
+    driver_positions = PositionGrid(
+        cell_size_m=settings.nearby.cell_size_m,
+        origin_latitude=sum(settings.location.latitude_range) / 2,
+    )
+
+    # Last fix of every active driver, used as the previous point for distance checks
+    driver_states = DriverStateStore(
+        ttl_seconds=settings.driver_state.ttl_seconds,
+        max_drivers=settings.driver_state.max_drivers,
+        on_evict=driver_positions.remove,
+    )
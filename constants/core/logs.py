@@ -1,5 +1,8 @@
 import logging
 
-# Global logger
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from config import settings
+from utils.core.logs import setup_logging
+
+# Global logger, records are formatted and written by a background thread
+log_listener = setup_logging(settings.logging.level, settings.logging.json_output, settings.logging.sample_rates)
 logger = logging.getLogger(__name__)
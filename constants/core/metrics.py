@@ -1,12 +1,22 @@
-import time
+from utils.core.metrics import MetricsRegistry
 
 # Web app metrics
-metrics = {
-    "start_time": time.time(),
-    "total_coordinates": 0,
-    "unique_drivers": set(),
-    "speed_violations": 0,
-    "altitude_violations": 0,
-    "distance_violations": 0,
-    "db_records": 0
-}
+metrics = MetricsRegistry("driver_geo")
+
+metrics.counter("coordinates", "Number of coordinates processed")
+metrics.counter("speed_violations", "Number of speed violations detected")
+metrics.counter("altitude_violations", "Number of altitude violations detected")
+metrics.counter("distance_violations", "Number of distance violations detected")
+metrics.counter("location_violations", "Number of coordinates outside the configured city bounds")
+metrics.counter("db_records", "Number of records saved to the database")
+metrics.counter("db_flushes", "Number of group commits made by the write-behind flusher")
+metrics.counter("spilled_records", "Number of records written to the spill log while the database was unavailable")
+metrics.counter("replayed_records", "Number of spilled records replayed into the database")
+metrics.counter("replayed_segments", "Number of spill log segments fully replayed into the database")
+
+metrics.gauge("last_flush_size", "Number of records written by the last group commit")
+metrics.gauge("last_flush_interval", "Seconds between the last two group commits")
+metrics.gauge("last_flush_duration", "Seconds spent on the last group commit")
+
+metrics.histogram("ingest", "Time to process one coordinate")
+metrics.histogram("db_flush", "Time of one group commit")
@@ -0,0 +1,10 @@
+from config import settings
+from constants.core.metrics import metrics
+from utils.core.tracing import Tracer
+
+# Per-stage timing of ingest requests
+tracer = Tracer(
+    registry=metrics,
+    sample_rate=settings.profiling.trace_sample_rate,
+    buffer_size=settings.profiling.trace_buffer_size,
+)
@@ -1,5 +1,33 @@
-from config import settings
-from utils.map.core import load_city_road_data
+import os
+from typing import Optional
 
-# City graph and City graph edges
-city_G, city_edges = load_city_road_data(settings.location.city)
+from config import settings, base_dir
+from utils.map.artifact import city_artifact_path, load_node_index, read_manifest
+from utils.map.cache import PathLengthCache
+from utils.map.index import NodeIndex
+
+city_artifact = city_artifact_path(os.path.join(base_dir, settings.map.artifact_dir), settings.location.city)
+
+
+def _read_city_manifest() -> Optional[dict]:
+    manifest = read_manifest(city_artifact)
+    return manifest if manifest is not None and manifest.get("city") == settings.location.city else None
+
+
+def _load_city_node_index() -> NodeIndex:
+    if city_manifest is not None:
+        return load_node_index(city_artifact)
+
+    # No artifact, index the downloaded City graph instead
+    from constants.map.graph import city_G
+    return NodeIndex.from_graph(city_G)
+
+
+# Manifest of the local map artifact of the City, None when the City is downloaded on start
+city_manifest = _read_city_manifest()
+
+# Nearest-node snapping index over City graph nodes, loaded from the artifact without the graph itself
+city_node_index = _load_city_node_index()
+
+# Road distances between already seen node pairs
+path_length_cache = PathLengthCache(settings.routing.path_cache_size)
@@ -0,0 +1,28 @@
+from config import settings
+from constants.map.core import city_artifact, city_manifest
+from utils.map.csr import CSRGraph
+from utils.map.landmarks import LandmarkIndex
+
+
+def _load_city_csr() -> CSRGraph:
+    if city_manifest is not None and CSRGraph.exists(city_artifact):
+        return CSRGraph.load(city_artifact)
+
+    # No artifact, convert the downloaded City graph instead
+    from constants.map.graph import city_G
+    return CSRGraph.from_graph(city_G)
+
+
+def _load_city_landmarks(csr: CSRGraph) -> LandmarkIndex:
+    # Tables are only reused if the artifact was built with the configured landmarks and for this graph
+    if (city_manifest is not None and city_manifest.get("landmarks") == settings.routing.landmarks
+            and city_manifest.get("nodes") == len(csr.node_ids) and LandmarkIndex.exists(city_artifact, len(csr.node_ids))):
+        return LandmarkIndex.load(csr, city_artifact)
+    return LandmarkIndex.build(csr, settings.routing.landmarks)
+
+
+# Array-backed City graph, only loaded for the csr and alt routing engines
+city_csr = _load_city_csr() if settings.routing.engine in ("csr", "alt") else None
+
+# ALT landmark tables over the City graph, only loaded for the alt routing engine
+city_landmarks = _load_city_landmarks(city_csr) if settings.routing.engine == "alt" else None
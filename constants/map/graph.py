@@ -0,0 +1,22 @@
+from typing import Tuple
+
+from geopandas import GeoDataFrame
+from networkx import MultiDiGraph
+
+from config import settings
+from constants.map.core import city_artifact, city_manifest
+from utils.map.artifact import load_graph
+
+
+def _load_city_graph() -> Tuple[MultiDiGraph, GeoDataFrame]:
+    if city_manifest is not None:
+        return load_graph(city_artifact)
+
+    # No artifact, download the City from OpenStreetMap instead
+    from utils.map.core import load_city_road_data
+    return load_city_road_data(settings.location.city)
+
+
+# City graph and City graph edges, only loaded for the networkx routing engine, the generators
+# and to convert a City that has no map artifact
+city_G, city_edges = _load_city_graph()
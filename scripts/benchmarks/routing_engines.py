@@ -0,0 +1,145 @@
+import argparse
+import json
+import math
+import random
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from api.services.driver_geo.utils.nx_routing import get_node_path_length
+from config import settings
+from constants.core.logs import logger
+from constants.map.graph import city_G
+from utils.map.csr import CSRGraph
+from utils.map.landmarks import LandmarkIndex
+
+
+def sample_node_pairs(G: nx.MultiDiGraph, count: int, radius: Optional[float], seed: int) -> List[Tuple[int, int]]:
+    """
+    Samples node pairs to route between.
+
+    Args:
+        G (nx.MultiDiGraph): The graph representing the city's street network.
+        count (int): Number of pairs.
+        radius (Optional[float]): When given, destinations are drawn from nodes reachable within this many meters,
+            which mimics consecutive fixes of one driver. Otherwise destinations are uniform over the city.
+        seed (int): Seed of the random generator, so runs are comparable.
+
+    Returns:
+        List[Tuple[int, int]]: The sampled (origin, destination) pairs.
+    """
+    rng = random.Random(seed)
+    nodes = list(G.nodes)
+    pairs = []
+    while len(pairs) < count:
+        origin = rng.choice(nodes)
+        if radius is None:
+            pairs.append((origin, rng.choice(nodes)))
+            continue
+        nearby = list(nx.single_source_dijkstra_path_length(G, origin, cutoff=radius, weight="length"))
+        pairs.append((origin, rng.choice(nearby)))
+    return pairs
+
+
+def measure(path_length: Callable[[int, int, Optional[float]], float], pairs: List[Tuple[int, int]],
+            cutoff: Optional[float]) -> Tuple[Dict[str, float], List[float]]:
+    """
+    Times one routing engine over all pairs.
+
+    Args:
+        path_length (Callable[[int, int, Optional[float]], float]): The engine's path length function.
+        pairs (List[Tuple[int, int]]): The (origin, destination) pairs.
+        cutoff (Optional[float]): Search radius passed to every query.
+
+    Returns:
+        Tuple[Dict[str, float], List[float]]: Latency statistics in microseconds and the computed lengths.
+    """
+    timings, lengths = [], []
+    for origin, destination in pairs:
+        started_at = time.perf_counter()
+        try:
+            lengths.append(path_length(origin, destination, cutoff))
+        except nx.NetworkXNoPath:
+            lengths.append(math.inf)
+        timings.append((time.perf_counter() - started_at) * 1e6)
+    timings.sort()
+    return {
+        "mean_us": statistics.fmean(timings),
+        "p50_us": timings[len(timings) // 2],
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        "queries_per_second": len(timings) / (sum(timings) / 1e6),
+    }, lengths
+
+
+def main() -> None:
+    """
+    Compares the networkx, csr and alt routing engines on the configured city graph and prints JSON results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark routing engines against networkx.")
+    parser.add_argument("--pairs", type=int, default=500, help="Number of node pairs per scenario")
+    parser.add_argument("--landmarks", type=int, default=settings.routing.landmarks, help="Number of ALT landmarks")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the pair sampler")
+    parser.add_argument("--output", help="File to write JSON results to, stdout by default")
+    args = parser.parse_args()
+
+    max_possible_distance = (settings.data_limits.max_speed_kmh * 1000 / 3600) * settings.driver_service.send_interval_seconds
+
+    started_at = time.perf_counter()
+    csr = CSRGraph.from_graph(city_G)
+    csr_build_seconds = time.perf_counter() - started_at
+    started_at = time.perf_counter()
+    landmarks = LandmarkIndex.build(csr, args.landmarks)
+    landmarks_build_seconds = time.perf_counter() - started_at
+
+    engines = {
+        "networkx": lambda origin, destination, cutoff: get_node_path_length(origin, destination, cutoff, city_G),
+        "csr": csr.path_length,
+        "alt": landmarks.path_length,
+    }
+    scenarios = {
+        "nearby_bounded": (2 * max_possible_distance, max_possible_distance),
+        "city_wide_bounded": (None, max_possible_distance),
+        "city_wide_unbounded": (None, None),
+    }
+
+    results = {
+        "graph": {"nodes": city_G.number_of_nodes(), "edges": city_G.number_of_edges()},
+        "preprocessing": {
+            "csr_build_seconds": csr_build_seconds,
+            "csr_megabytes": csr.nbytes / 2 ** 20,
+            "landmarks": len(landmarks.positions),
+            "landmarks_build_seconds": landmarks_build_seconds,
+            "landmarks_megabytes": (landmarks.from_landmarks.nbytes + landmarks.to_landmarks.nbytes) / 2 ** 20,
+        },
+        "scenarios": {},
+    }
+    for name, (radius, cutoff) in scenarios.items():
+        pairs = sample_node_pairs(city_G, args.pairs, radius, args.seed)
+        scenario = {"cutoff_m": cutoff}
+        reference = None
+        for engine, path_length in engines.items():
+            stats, lengths = measure(path_length, pairs, cutoff)
+            if reference is None:
+                reference = lengths
+            else:
+                stats["mismatches"] = sum(
+                    1 for expected, actual in zip(reference, lengths)
+                    if not (expected == actual or math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-6)))
+            scenario[engine] = stats
+        for engine in ("csr", "alt"):
+            scenario[engine]["speedup"] = scenario["networkx"]["mean_us"] / scenario[engine]["mean_us"]
+        results["scenarios"][name] = scenario
+        logger.info(f"Benchmarked scenario {name}")
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
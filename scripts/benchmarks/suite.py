@@ -0,0 +1,422 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+import networkx as nx
+import osmnx as ox
+from networkx import MultiDiGraph
+
+from config import settings, base_dir
+from constants.core.logs import logger
+from utils.map.artifact import city_artifact_path, load_city_map, write_map_artifact
+from utils.map.csr import CSRGraph
+from utils.map.index import EARTH_RADIUS_M
+
+SAMPLE_GRAPH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_graph.json")
+
+# Straight-line distance ranges in meters that routing queries are grouped by
+DISTANCE_BUCKETS = ((0, 100), (100, 500), (500, 2000))
+
+BENCHMARKS = ("graph_loading", "validation", "routing", "ingest")
+
+
+class InMemoryDriverDataStore:
+    """
+    Local stand-in for the driver_data table, used as the `save_batch` of the write-behind writer.
+
+    Records are only counted. An optional commit latency mimics the round trip to a real database.
+    """
+
+    def __init__(self, commit_latency_seconds: float = 0.0) -> None:
+        self.commit_latency_seconds = commit_latency_seconds
+        self.records = 0
+        self.batches = 0
+
+    async def save_batch(self, records: List[Dict[str, Any]]) -> int:
+        if self.commit_latency_seconds:
+            await asyncio.sleep(self.commit_latency_seconds)
+        self.records += len(records)
+        self.batches += 1
+        return len(records)
+
+
+def load_sample_graph(path: str) -> Tuple[str, MultiDiGraph]:
+    """
+    Loads the bundled sample road graph.
+
+    The file holds `[id, longitude, latitude]` nodes and `[u, v, length]` edges in the layout of
+    an unprojected osmnx graph, so it goes through the same code paths as a downloaded city.
+
+    Args:
+        path (str): The sample graph JSON file.
+
+    Returns:
+        Tuple[str, MultiDiGraph]: The name of the sample city and its graph.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    G = nx.MultiDiGraph(crs=data["crs"])
+    for node, x, y in data["nodes"]:
+        G.add_node(node, x=x, y=y)
+    for u, v, length in data["edges"]:
+        G.add_edge(u, v, length=length)
+    return data["city"], G
+
+
+def use_sample_map(path: str, artifact_dir: str) -> MultiDiGraph:
+    """
+    Stores the sample graph as a map artifact and points the settings to it.
+
+    Must run before anything loading the city map, like the API modules, is imported.
+
+    Args:
+        path (str): The sample graph JSON file.
+        artifact_dir (str): Directory to write the artifact to.
+
+    Returns:
+        MultiDiGraph: The sample graph.
+    """
+    city, G = load_sample_graph(path)
+    landmarks = settings.routing.landmarks if settings.routing.engine == "alt" else 0
+    write_map_artifact(G, ox.graph_to_gdfs(G, nodes=False), city, city_artifact_path(artifact_dir, city), landmarks)
+
+    xs = [data["x"] for _, data in G.nodes(data=True)]
+    ys = [data["y"] for _, data in G.nodes(data=True)]
+    settings.location.city = city
+    settings.location.latitude_range = [min(ys) - 0.001, max(ys) + 0.001]
+    settings.location.longitude_range = [min(xs) - 0.001, max(xs) + 0.001]
+    settings.map.artifact_dir = artifact_dir
+    if settings.routing.execution_mode == "process":
+        # Spawned workers read settings.json again and would load the configured city instead
+        settings.routing.execution_mode = "thread"
+    return G
+
+
+def latency_stats(timings: List[float]) -> Dict[str, float]:
+    """
+    Summarizes latencies.
+
+    Args:
+        timings (List[float]): Latencies in seconds.
+
+    Returns:
+        Dict[str, float]: Count, mean and percentiles in microseconds and operations per second.
+    """
+    timings = sorted(timings)
+    total = sum(timings)
+
+    def percentile(q: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * q))] * 1e6
+
+    return {
+        "count": len(timings),
+        "mean_us": total / len(timings) * 1e6,
+        "p50_us": percentile(0.5),
+        "p90_us": percentile(0.9),
+        "p99_us": percentile(0.99),
+        "ops_per_second": len(timings) / total if total else math.inf,
+    }
+
+
+def fit_send_interval(G: MultiDiGraph) -> float:
+    """
+    Stretches the fix interval, so a driver can cover a couple of typical edges of the graph between fixes.
+
+    With the configured interval a driver may cover less than the shortest edge of the sample graph, tracks
+    would then never leave their first node and the road distance check would never run.
+
+    Args:
+        G (MultiDiGraph): The road graph.
+
+    Returns:
+        float: The maximum distance a driver covers between fixes in meters.
+    """
+    speed = settings.data_limits.max_speed_kmh * 1000 / 3600
+    lengths = sorted(length for _, _, length in G.edges(data="length"))
+    min_distance = 2 * lengths[len(lengths) // 2]
+    if speed * settings.driver_service.send_interval_seconds < min_distance:
+        settings.driver_service.send_interval_seconds = min_distance / speed
+    return speed * settings.driver_service.send_interval_seconds
+
+
+def sample_tracks(G: MultiDiGraph, drivers: int, fixes: int, radius: float, rng: random.Random) -> List[List[int]]:
+    """
+    Samples driver tracks that move to another node within the road distance a driver covers between fixes.
+
+    Args:
+        G (MultiDiGraph): The road graph.
+        drivers (int): Number of tracks.
+        fixes (int): Number of nodes per track.
+        radius (float): Maximum road distance between consecutive nodes in meters.
+        rng (random.Random): The random generator.
+
+    Returns:
+        List[List[int]]: The node IDs of every track.
+    """
+    nodes = list(G.nodes)
+    tracks = []
+    for _ in range(drivers):
+        track = [rng.choice(nodes)]
+        while len(track) < fixes:
+            reachable = nx.single_source_dijkstra_path_length(G, track[-1], cutoff=radius, weight="length")
+            # A driver stays put only on a dead end
+            nearby = [node for node in reachable if node != track[-1]] or [track[-1]]
+            track.append(rng.choice(nearby))
+        tracks.append(track)
+    return tracks
+
+
+def sample_bucket_pairs(G: MultiDiGraph, count: int, rng: random.Random) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Samples node pairs for every distance bucket.
+
+    Args:
+        G (MultiDiGraph): The road graph.
+        count (int): Number of pairs per bucket. Buckets the graph is too small for get fewer.
+        rng (random.Random): The random generator.
+
+    Returns:
+        Dict[str, List[Tuple[int, int]]]: The (origin, destination) pairs keyed by bucket name.
+    """
+    nodes = list(G.nodes)
+    buckets = {f"{low}-{high}m": [] for low, high in DISTANCE_BUCKETS}
+    for _ in range(count * len(DISTANCE_BUCKETS) * 200):
+        origin, destination = rng.choice(nodes), rng.choice(nodes)
+        distance = straight_line_distance(G, origin, destination)
+        for (low, high), pairs in zip(DISTANCE_BUCKETS, buckets.values()):
+            if low <= distance < high and len(pairs) < count:
+                pairs.append((origin, destination))
+        if all(len(pairs) >= count for pairs in buckets.values()):
+            break
+    return buckets
+
+
+def straight_line_distance(G: MultiDiGraph, origin: int, destination: int) -> float:
+    """Great-circle distance between two graph nodes in meters."""
+    lat1, lat2 = math.radians(G.nodes[origin]["y"]), math.radians(G.nodes[destination]["y"])
+    half_dlon = math.radians(G.nodes[destination]["x"] - G.nodes[origin]["x"]) / 2
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def driver_fix(G: MultiDiGraph, driver_id: uuid.UUID, node: int) -> Dict[str, Any]:
+    """Builds a valid fix of a driver standing on a graph node."""
+    return {
+        "driver_id": str(driver_id),
+        "latitude": G.nodes[node]["y"],
+        "longitude": G.nodes[node]["x"],
+        "speed": settings.data_limits.max_speed_kmh / 2,
+        "altitude": (settings.data_limits.min_altitude_m + settings.data_limits.max_altitude_m) / 2,
+    }
+
+
+def bench_graph_loading(repeats: int) -> Dict[str, Any]:
+    """Times loading the city map and the CSR arrays from the artifact."""
+    path = city_artifact_path(os.path.join(base_dir, settings.map.artifact_dir), settings.location.city)
+    results = {}
+    for name, load in (
+            ("map_artifact", lambda: load_city_map(settings.location.city, os.path.join(base_dir, settings.map.artifact_dir))),
+            ("csr_arrays", lambda: CSRGraph.load(path)),
+    ):
+        timings = []
+        for _ in range(repeats):
+            started_at = time.perf_counter()
+            load()
+            timings.append(time.perf_counter() - started_at)
+        results[name] = latency_stats(timings)
+    return results
+
+
+async def bench_validation(G: MultiDiGraph, tracks: List[List[int]]) -> Dict[str, Any]:
+    """Times `validate_driver_data` on the first fix of a driver and on fixes following a previous one."""
+    from api.services.driver_geo.controlers.driver_geo import validate_driver_data
+    from api.services.driver_geo.schemas.driver_geo import DriverDataRequestSchema
+    from constants.map.core import path_length_cache
+    from utils.core.driver_state import DriverState
+
+    fixes = [[DriverDataRequestSchema(**driver_fix(G, uuid.uuid4(), node)) for node in track] for track in tracks]
+    results = {}
+
+    path_length_cache.clear()
+    timings = []
+    for track, track_fixes in zip(tracks, fixes):
+        for node, fix in zip(track, track_fixes):
+            started_at = time.perf_counter()
+            await validate_driver_data(fix, None, node, None)
+            timings.append(time.perf_counter() - started_at)
+    results["without_previous"] = latency_stats(timings)
+
+    path_length_cache.clear()
+    timings, valid = [], 0
+    for track, track_fixes in zip(tracks, fixes):
+        for previous_node, node, previous_fix, fix in zip(track, track[1:], track_fixes, track_fixes[1:]):
+            previous = DriverState(previous_fix.latitude, previous_fix.longitude, previous_fix.altitude,
+                                   previous_fix.speed, True, previous_node, time.monotonic())
+            started_at = time.perf_counter()
+            valid += await validate_driver_data(fix, previous, node, previous_node)
+            timings.append(time.perf_counter() - started_at)
+    results["with_previous"] = latency_stats(timings)
+    results["with_previous"]["valid_share"] = valid / len(timings)
+    results["with_previous"]["path_cache_hits"] = path_length_cache.hits
+    results["with_previous"]["path_cache_misses"] = path_length_cache.misses
+    return results
+
+
+def bench_routing(G: MultiDiGraph, pairs_per_bucket: int, rng: random.Random) -> Dict[str, Any]:
+    """Times uncached `get_shortest_path_length` queries, snapping included, per distance bucket."""
+    from api.services.driver_geo.utils.nx_routing import get_shortest_path_length
+    from constants.map.graph import city_G
+
+    results = {}
+    for bucket, pairs in sample_bucket_pairs(G, pairs_per_bucket, rng).items():
+        if not pairs:
+            continue
+        timings, no_path = [], 0
+        for origin, destination in pairs:
+            started_at = time.perf_counter()
+            try:
+                get_shortest_path_length(G.nodes[origin]["x"], G.nodes[origin]["y"],
+                                         G.nodes[destination]["x"], G.nodes[destination]["y"],
+                                         city_G, path_cache=None)
+            except nx.NetworkXNoPath:
+                no_path += 1
+            timings.append(time.perf_counter() - started_at)
+        results[bucket] = latency_stats(timings)
+        results[bucket]["no_path"] = no_path
+    return results
+
+
+async def bench_ingest(G: MultiDiGraph, tracks: List[List[int]], concurrency: int,
+                       commit_latency_seconds: float) -> Dict[str, Any]:
+    """
+    Times `POST /driver-geo/` end to end through an in-process ASGI client.
+
+    Fixes are sent in rounds, one per driver and round, so every driver's fixes arrive in order
+    and all but the first are validated against a previous point.
+    """
+    import httpx
+
+    from api.app import app
+    from api.services.driver_geo.utils.partitions import partition_maintainer
+    from api.services.driver_geo.utils.write_behind import write_behind
+
+    store = InMemoryDriverDataStore(commit_latency_seconds)
+    write_behind.save_batch = store.save_batch
+
+    async def no_maintenance() -> Tuple[int, int]:
+        return 0, 0
+
+    # There are no partitions to maintain without a database
+    partition_maintainer.maintain = no_maintenance
+
+    driver_ids = [uuid.uuid4() for _ in tracks]
+    in_flight = asyncio.Semaphore(concurrency)
+    timings, errors = [], 0
+
+    async def send(client: httpx.AsyncClient, fix: Dict[str, Any]) -> None:
+        nonlocal errors
+        async with in_flight:
+            started_at = time.perf_counter()
+            response = await client.post("/api/v1/driver-geo/", json=fix)
+            timings.append(time.perf_counter() - started_at)
+            errors += response.status_code != 200
+
+    # Starts and stops the background workers the same way the server does, stopping flushes pending records
+    async with app.router.lifespan_context(app):
+        started_at = time.perf_counter()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+            for round_nodes in zip(*tracks):
+                await asyncio.gather(*(send(client, driver_fix(G, driver_id, node))
+                                       for driver_id, node in zip(driver_ids, round_nodes)))
+        elapsed = time.perf_counter() - started_at
+
+    results = latency_stats(timings)
+    results["requests_per_second"] = len(timings) / elapsed
+    results["errors"] = errors
+    results["saved_records"] = store.records
+    results["db_batches"] = store.batches
+    return results
+
+
+def git_commit() -> str:
+    """Returns the checked out commit, so results of different commits can be told apart."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=base_dir, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    """
+    Benchmarks graph loading, validation, routing and the ingest endpoint offline on the bundled sample graph
+    and prints JSON results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark validation, routing and ingest on a sample graph.")
+    parser.add_argument("--sample-graph", default=SAMPLE_GRAPH_PATH, help="Sample graph JSON file")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="Benchmarks to run, all by default")
+    parser.add_argument("--drivers", type=int, default=200, help="Number of simulated drivers")
+    parser.add_argument("--fixes", type=int, default=20, help="Number of fixes per driver")
+    parser.add_argument("--pairs", type=int, default=300, help="Number of node pairs per distance bucket")
+    parser.add_argument("--load-repeats", type=int, default=5, help="Number of graph loads")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum ingest requests in flight")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Commit latency of the database stand-in")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the workload sampler, so runs are comparable")
+    parser.add_argument("--output", help="File to write JSON results to, stdout by default")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        G = use_sample_map(args.sample_graph, artifact_dir)
+        # Nothing is spilled while the in-memory store takes every batch, but the log must not land in the tree
+        settings.spill.directory = os.path.join(artifact_dir, "spill")
+        # Per-fix logs would dominate the timings
+        logging.getLogger().setLevel(logging.WARNING)
+
+        rng = random.Random(args.seed)
+        max_possible_distance = fit_send_interval(G)
+        tracks = sample_tracks(G, args.drivers, args.fixes, max_possible_distance, rng)
+
+        results = {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "graph": {"nodes": G.number_of_nodes(), "edges": G.number_of_edges()},
+            "routing": {"engine": settings.routing.engine, "execution_mode": settings.routing.execution_mode},
+            "workload": {"drivers": args.drivers, "fixes": args.fixes, "seed": args.seed,
+                         "send_interval_seconds": settings.driver_service.send_interval_seconds,
+                         "max_possible_distance_m": max_possible_distance},
+            "benchmarks": {},
+        }
+        benchmarks = results["benchmarks"]
+        if "graph_loading" in args.only:
+            benchmarks["graph_loading"] = bench_graph_loading(args.load_repeats)
+        if "validation" in args.only:
+            benchmarks["validation"] = asyncio.run(bench_validation(G, tracks))
+        if "routing" in args.only:
+            benchmarks["routing"] = bench_routing(G, args.pairs, rng)
+        if "ingest" in args.only:
+            benchmarks["ingest"] = asyncio.run(
+                bench_ingest(G, tracks, args.concurrency, args.db_latency_ms / 1000))
+        logger.warning("Benchmarks finished: %s", ", ".join(benchmarks))
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,16 @@
+import asyncio
 import uuid
 from threading import Timer
+from typing import Callable, Dict, List, Optional, Union
+
+import httpx
 
 from config import settings
 from constants.core.logs import logger
-from constants.map.core import city_edges
-from scripts.generators.utils.map import generate_random_points_on_roads, generate_driver_data, send_driver_data
+from constants.map.graph import city_G, city_edges
+from scripts.generators.utils.map import RoadPointSampler, generate_drivers_data, send_driver_data, \
+    send_driver_data_async
+from scripts.generators.utils.simulation import TrajectorySimulator
 
 
 def driver_coordinates_generator(num_drivers: int, interval: int, endpoint: str) -> None:
@@ -16,13 +22,11 @@ def driver_coordinates_generator(num_drivers: int, interval: int, endpoint: str)
         interval (int): The time interval (in seconds) between each data generation and sending.
         endpoint (str): The URL endpoint to which the driver data will be sent.
     """
-    driver_ids = [uuid.uuid4() for _ in range(num_drivers)]
+    generate_tick_data = create_tick_data_source(num_drivers)
 
     def update_and_send_data() -> None:
         try:
-            random_points = generate_random_points_on_roads(city_edges, num_drivers)
-            drivers_data = [generate_driver_data(driver_id, point) for driver_id, point in
-                            zip(driver_ids, random_points)]
+            drivers_data = generate_tick_data()
             logger.info(f"Generated driver data: {drivers_data}")
 
             for driver_data in drivers_data:
@@ -39,6 +43,84 @@ def driver_coordinates_generator(num_drivers: int, interval: int, endpoint: str)
     update_and_send_data()
 
 
+def create_tick_data_source(num_drivers: int) -> Callable[[], List[Dict[str, Union[str, float]]]]:
+    """
+    Creates the function generating one fix for every driver per tick, as configured by `simulation.movement`.
+
+    With `random` every fix is a fresh random point on the roads. With `trajectory` drivers follow
+    routes on the road graph, see `TrajectorySimulator`.
+
+    Args:
+        num_drivers (int): The number of drivers to generate data for.
+
+    Returns:
+        Callable[[], List[Dict[str, Union[str, float]]]]: Returns the driver data of the next tick.
+    """
+    if settings.simulation.movement == "trajectory":
+        return TrajectorySimulator.from_settings(city_G, num_drivers).step
+
+    driver_ids = [uuid.uuid4() for _ in range(num_drivers)]
+    road_sampler = RoadPointSampler(city_edges, settings.simulation.seed)
+    return lambda: generate_drivers_data(driver_ids, road_sampler.sample(num_drivers))
+
+
+async def async_driver_coordinates_generator(num_drivers: int, interval: float, endpoint: str, concurrency: int,
+                                             target_requests_per_second: Optional[float] = None) -> None:
+    """
+    Generates and sends driver data at regular intervals from a single event loop.
+
+    Requests share a pool of keep-alive HTTP/1.1 connections and at most `concurrency` of them are
+    in flight. Ticks are scheduled on the monotonic clock, so slow sends do not shift later ticks.
+    With a target rate, requests of a tick are spread evenly instead of being sent in a burst.
+
+    Args:
+        num_drivers (int): The number of drivers to generate data for.
+        interval (float): The time interval (in seconds) between ticks.
+        endpoint (str): The URL endpoint to which the driver data will be sent.
+        concurrency (int): Maximum number of requests in flight.
+        target_requests_per_second (Optional[float]): Rate to pace requests at, None to send as fast as allowed.
+    """
+    generate_tick_data = create_tick_data_source(num_drivers)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    in_flight = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def send(driver_data: Dict[str, Union[str, float]]) -> None:
+        try:
+            await send_driver_data_async(client, driver_data, endpoint)
+        finally:
+            in_flight.release()
+
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(10.0)) as client:
+        tasks = set()
+        next_tick = loop.time()
+        next_send = next_tick
+        while True:
+            try:
+                # Point and altitude generation is blocking, keep it off the event loop
+                drivers_data = await asyncio.to_thread(generate_tick_data)
+                logger.info("Generated data for %d drivers", len(drivers_data))
+
+                for driver_data in drivers_data:
+                    if target_requests_per_second:
+                        next_send = max(next_send + 1 / target_requests_per_second, loop.time())
+                        await asyncio.sleep(next_send - loop.time())
+                    await in_flight.acquire()
+                    task = asyncio.create_task(send(driver_data))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            except Exception as e:
+                logger.error("Error generating driver data: %s", e)
+
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                logger.warning("Tick overran its interval by %.3f s, skipping missed ticks", -delay)
+                next_tick = loop.time()
+            else:
+                await asyncio.sleep(delay)
+
+
 if __name__ == "__main__":
     # Retrieve settings from configuration
     NUM_DRIVERS = settings.drivers.number_of_drivers
@@ -46,4 +128,9 @@ if __name__ == "__main__":
     ENDPOINT = settings.driver_service.endpoint_url
 
     # Start the driver coordinates generator
-    driver_coordinates_generator(NUM_DRIVERS, INTERVAL, ENDPOINT)
+    if settings.drivers.generator_mode == "async":
+        asyncio.run(async_driver_coordinates_generator(
+            NUM_DRIVERS, INTERVAL, ENDPOINT, settings.drivers.concurrency,
+            settings.drivers.target_requests_per_second))
+    else:
+        driver_coordinates_generator(NUM_DRIVERS, INTERVAL, ENDPOINT)
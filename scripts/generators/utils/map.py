@@ -1,35 +1,76 @@
-from typing import Dict, Union, Optional, List
+import math
+import os
+from functools import lru_cache
+from typing import Dict, Union, Optional, List, Sequence
 from uuid import UUID
 
+import httpx
+import numpy as np
 import requests
-import random
+import shapely
 from geopandas import GeoDataFrame
 from shapely import Point
-from shapely.geometry import LineString
 from api.services.driver_geo.schemas.driver_geo import DriverDataRequestSchema
-from config import settings
+from config import settings, base_dir
 from constants.core.logs import logger
+from utils.map.artifact import city_artifact_path
+from utils.map.elevation import ElevationGrid
 
 
-def random_point_on_line(line: LineString) -> Point:
+class RoadPointSampler:
     """
-    Generates a random point on a given LineString.
+    Draws random points spread uniformly over the length of a road network.
 
-    Args:
-        line (LineString): The LineString on which to generate the random point.
-
-    Returns:
-        Point: The generated random point on the LineString.
+    Cumulative edge lengths are computed once, so a draw of N points is one uniform draw over the total
+    length, a `searchsorted` to find the edges and one vectorized interpolation. Long edges get
+    proportionally more points than short ones.
     """
-    distance = random.uniform(0, line.length)
-    point = line.interpolate(distance)
-    return point
+
+    # shapely geometry type ids of the geometries points can be interpolated on
+    _LINE_TYPE_IDS = (1, 5)  # LineString, MultiLineString
+
+    def __init__(self, roads: GeoDataFrame, seed: Optional[int] = None) -> None:
+        """
+        Args:
+            roads (GeoDataFrame): GeoDataFrame containing road geometries, with edge lengths in meters
+                in a `length` column as produced by osmnx. Geometry lengths are used when it is missing.
+            seed (Optional[int]): Seed of the random generator, None for a random one.
+        """
+        geometries = np.asarray(roads.geometry.values, dtype=object)
+        is_line = np.isin(shapely.get_type_id(geometries), self._LINE_TYPE_IDS)
+        if "length" in roads.columns:
+            lengths = roads["length"].to_numpy(dtype=np.float64)
+        else:
+            lengths = shapely.length(geometries)
+        is_line &= lengths > 0
+
+        self.geometries = geometries[is_line]
+        self.lengths = lengths[is_line]
+        self.cumulative_lengths = np.cumsum(self.lengths)
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, num_points: int) -> np.ndarray:
+        """
+        Generates random points on the roads.
+
+        Args:
+            num_points (int): Number of random points to generate.
+
+        Returns:
+            np.ndarray: Array of the generated shapely Points.
+        """
+        positions = self.rng.random(num_points) * self.cumulative_lengths[-1]
+        edges = np.minimum(np.searchsorted(self.cumulative_lengths, positions, side="right"), len(self.lengths) - 1)
+        fractions = (positions - (self.cumulative_lengths[edges] - self.lengths[edges])) / self.lengths[edges]
+        return shapely.line_interpolate_point(self.geometries[edges], np.clip(fractions, 0.0, 1.0), normalized=True)
 
 
 def generate_random_points_on_roads(roads: GeoDataFrame, num_points: int) -> List[Point]:
     """
     Generates a list of random points on roads from a GeoDataFrame.
 
+    Builds a new `RoadPointSampler` on every call, keep one around when sampling repeatedly.
+
     Args:
         roads (GeoDataFrame): GeoDataFrame containing road geometries.
         num_points (int): Number of random points to generate.
@@ -37,26 +78,28 @@ def generate_random_points_on_roads(roads: GeoDataFrame, num_points: int) -> Lis
     Returns:
         List[Point]: A list of generated random points.
     """
-    points = []
-    while len(points) < num_points:
-        random_road = roads.sample()
-        line = random_road.geometry.values[0]
-        if isinstance(line, LineString):
-            point = random_point_on_line(line)
-            points.append(point)
-        elif isinstance(line, (list, tuple)) and all(isinstance(part, LineString) for part in line):
-            for part in line:
-                point = random_point_on_line(part)
-                points.append(point)
-                if len(points) >= num_points:
-                    break
-    return points
+    return RoadPointSampler(roads).sample(num_points).tolist()
+
+
+@lru_cache(maxsize=settings.elevation.cache_size)
+def _fetch_altitude(latitude: float, longitude: float) -> Optional[float]:
+    url = settings.elevation.lookup_url.format(latitude, longitude)
+    response = requests.get(url)
+    response.raise_for_status()  # Raise an HTTPError for bad responses
+    results = response.json().get("results")
+    if results:
+        return results[0].get("elevation")
+    return None
 
 
 def get_altitude(latitude: float, longitude: float) -> Optional[float]:
     """
     Retrieves the altitude for given latitude and longitude from an external API.
 
+    Coordinates are rounded to `elevation.cache_precision` decimals (4 is about 11 meters) and answers
+    are kept in an LRU cache of `elevation.cache_size` entries, so nearby points share one request.
+    Failed requests are not cached.
+
     Args:
         latitude (float): Latitude of the location.
         longitude (float): Longitude of the location.
@@ -64,40 +107,92 @@ def get_altitude(latitude: float, longitude: float) -> Optional[float]:
     Returns:
         Optional[float]: The altitude in meters, or None if the request fails or no result is found.
     """
-    url = settings.elevation.lookup_url.format(latitude, longitude)
+    precision = settings.elevation.cache_precision
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an HTTPError for bad responses
-        results = response.json().get("results")
-        if results:
-            return results[0].get("elevation")
+        return _fetch_altitude(round(latitude, precision), round(longitude, precision))
     except requests.RequestException as e:
         logger.error(f"Failed to retrieve altitude: {e}")
     return None
 
 
-def generate_driver_data(driver_id: UUID, point: Point) -> Dict[str, Union[str, float]]:
+@lru_cache(maxsize=1)
+def get_elevation_grid() -> ElevationGrid:
+    """
+    Memory-maps the elevation grid stored in the map artifact of the configured city.
+
+    Returns:
+        ElevationGrid: The elevation grid, built with `scripts.map.build_elevation_grid`.
+
+    Raises:
+        FileNotFoundError: If no elevation grid was built for the city.
+    """
+    path = city_artifact_path(os.path.join(base_dir, settings.map.artifact_dir), settings.location.city)
+    if not ElevationGrid.exists(path):
+        raise FileNotFoundError(f"No elevation grid in {path}, build it with "
+                                f"`python -m scripts.map.build_elevation_grid` or set elevation.provider to http")
+    return ElevationGrid.load(path)
+
+
+def get_altitudes(points: Sequence[Point]) -> np.ndarray:
+    """
+    Retrieves altitudes of a batch of points from the configured elevation provider.
+
+    With the `dem` provider all points are interpolated from the local elevation grid at once,
+    with `http` they are looked up one by one through the cached `get_altitude`.
+
+    Args:
+        points (Sequence[Point]): The geographic points.
+
+    Returns:
+        np.ndarray: Altitudes in meters, NaN where unknown.
+    """
+    if settings.elevation.provider == "dem":
+        return get_elevation_grid().lookup(shapely.get_y(points), shapely.get_x(points))
+    altitudes = (get_altitude(point.y, point.x) for point in points)
+    return np.array([math.nan if altitude is None else altitude for altitude in altitudes], dtype=np.float64)
+
+
+def generate_driver_data(driver_id: UUID, point: Point, altitude: Optional[float] = None) -> Dict[str, Union[str, float]]:
     """
     Generates driver data based on a given driver ID and geographic point.
 
     Args:
         driver_id (UUID): The unique identifier for the driver.
         point (Point): The geographic point for the driver's location.
+        altitude (Optional[float]): Altitude of the point if already known, NaN if unknown.
+            Looked up with `get_altitude` when not given.
 
     Returns:
         Dict[str, Union[str, float]]: The generated driver data as a dictionary.
     """
-    altitude = get_altitude(point.y, point.x)
+    if altitude is None:
+        altitude = get_altitude(point.y, point.x)
     driver_data = DriverDataRequestSchema(
         driver_id=driver_id,
         latitude=point.y,
         longitude=point.x,
         speed=random.uniform(0, 120),
-        altitude=altitude if altitude is not None else random.uniform(200, 400)
+        altitude=altitude if altitude is not None and not math.isnan(altitude) else random.uniform(200, 400)
     )
     return driver_data.model_dump()
 
 
+def generate_drivers_data(driver_ids: Sequence[UUID], points: Sequence[Point]) -> List[Dict[str, Union[str, float]]]:
+    """
+    Generates driver data for a batch of drivers, looking up all altitudes at once.
+
+    Args:
+        driver_ids (Sequence[UUID]): The unique identifiers of the drivers.
+        points (Sequence[Point]): The geographic points of the drivers, in the same order.
+
+    Returns:
+        List[Dict[str, Union[str, float]]]: The generated driver data.
+    """
+    altitudes = get_altitudes(points)
+    return [generate_driver_data(driver_id, point, float(altitude))
+            for driver_id, point, altitude in zip(driver_ids, points, altitudes)]
+
+
 def send_driver_data(driver_data: Dict[str, Union[str, float]], endpoint: str) -> None:
     """
     Sends driver data to a specified endpoint via HTTP POST request.
@@ -112,3 +207,20 @@ def send_driver_data(driver_data: Dict[str, Union[str, float]], endpoint: str) -
         logger.info(f"Sent data for driver {driver_data['driver_id']}: {response.status_code}")
     except requests.RequestException as e:
         logger.error(f"Failed to send driver data: {e}")
+
+
+async def send_driver_data_async(client: httpx.AsyncClient, driver_data: Dict[str, Union[str, float]],
+                                 endpoint: str) -> None:
+    """
+    Sends driver data to a specified endpoint via HTTP POST request over a pooled keep-alive connection.
+
+    Args:
+        client (httpx.AsyncClient): The shared client holding the connection pool.
+        driver_data (Dict[str, Union[str, float]]): The driver data to be sent.
+        endpoint (str): The URL endpoint to which the data will be sent.
+    """
+    try:
+        response = await client.post(endpoint, json=driver_data)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.error("Failed to send driver data: %s", e)
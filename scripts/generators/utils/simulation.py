@@ -0,0 +1,174 @@
+import uuid
+from typing import Dict, List, Optional, Tuple, Union
+from uuid import UUID
+
+import networkx as nx
+import numpy as np
+import shapely
+from networkx import MultiDiGraph
+
+from api.services.driver_geo.schemas.driver_geo import DriverDataRequestSchema
+from config import settings
+from scripts.generators.utils.map import get_altitudes
+from utils.map.index import EARTH_RADIUS_M
+
+# Cruising speeds are drawn as these shares of the speed limit, leaving room for snapping error
+CRUISE_SPEED_SHARES = (0.3, 0.8)
+
+# How many destinations to try before a driver without a reachable one stays put
+ROUTE_ATTEMPTS = 10
+
+
+class SimulatedDriver:
+    """
+    Position of a simulated driver along its current route.
+    """
+
+    __slots__ = ("driver_id", "speed", "route", "distances", "position")
+
+    def __init__(self, driver_id: UUID, speed: float) -> None:
+        self.driver_id = driver_id
+        self.speed = speed
+        self.route: List[int] = []
+        self.distances = np.zeros((1, 3))
+        self.position = 0.0
+
+
+class TrajectorySimulator:
+    """
+    Moves drivers along shortest routes of the road graph and reports their positions every tick.
+
+    Every driver cruises at a constant speed below `data_limits.max_speed_kmh` towards a random
+    destination node, and picks a new destination on arrival. Positions are interpolated along the
+    edge geometries, so consecutive fixes are a realistic road distance apart. Most of them pass
+    validation without an injected anomaly, but not all: validation snaps each fix to its nearest node
+    and follows edge direction, so a fix snapped ahead of the driver, e.g. across a one-way street,
+    can be rejected.
+
+    Each fix independently gets a speed spike, an altitude spike or a teleport to a random node with
+    the configured probability. All randomness, including driver IDs, comes from one seeded generator,
+    so a seed reproduces the same workload.
+    """
+
+    def __init__(self, G: MultiDiGraph, num_drivers: int, interval: float, max_speed_kmh: float,
+                 altitude_range: Tuple[float, float], speed_anomaly_rate: float = 0.0,
+                 altitude_anomaly_rate: float = 0.0, teleport_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        self.G = G
+        self.interval = interval
+        self.max_speed_kmh = max_speed_kmh
+        self.altitude_range = altitude_range
+        self.speed_anomaly_rate = speed_anomaly_rate
+        self.altitude_anomaly_rate = altitude_anomaly_rate
+        self.teleport_rate = teleport_rate
+        self.rng = np.random.default_rng(seed)
+        self.node_ids = np.asarray(list(G.nodes))
+
+        self.drivers = []
+        for _ in range(num_drivers):
+            driver_id = uuid.UUID(bytes=self.rng.bytes(16), version=4)
+            speed = self.rng.uniform(*CRUISE_SPEED_SHARES) * max_speed_kmh
+            driver = SimulatedDriver(driver_id, speed)
+            self._route(driver, self._random_node())
+            self.drivers.append(driver)
+
+    @classmethod
+    def from_settings(cls, G: MultiDiGraph, num_drivers: int) -> "TrajectorySimulator":
+        """
+        Creates a simulator configured by the `simulation` and `data_limits` settings.
+
+        Args:
+            G (MultiDiGraph): The graph representing the city's street network.
+            num_drivers (int): The number of drivers to simulate.
+
+        Returns:
+            TrajectorySimulator: The simulator.
+        """
+        simulation = settings.simulation
+        return cls(G, num_drivers, settings.driver_service.send_interval_seconds, settings.data_limits.max_speed_kmh,
+                   (settings.data_limits.min_altitude_m, settings.data_limits.max_altitude_m),
+                   simulation.speed_anomaly_rate, simulation.altitude_anomaly_rate, simulation.teleport_rate,
+                   simulation.seed)
+
+    def _random_node(self) -> int:
+        return self.node_ids[self.rng.integers(len(self.node_ids))].item()
+
+    def _route(self, driver: SimulatedDriver, start_node: int) -> None:
+        """Sends the driver from `start_node` to a random reachable destination."""
+        for _ in range(ROUTE_ATTEMPTS):
+            try:
+                route = nx.shortest_path(self.G, start_node, self._random_node(), weight="length")
+            except nx.NetworkXNoPath:
+                continue
+            if len(route) > 1:
+                break
+        else:
+            route = [start_node]
+        driver.route = route
+        driver.position = 0.0
+        driver.distances = self._polyline(route)
+
+    def _polyline(self, route: List[int]) -> np.ndarray:
+        """Collects the vertices of the route as (longitude, latitude, distance from start in meters) rows."""
+        coordinates = [(self.G.nodes[route[0]]["x"], self.G.nodes[route[0]]["y"])]
+        for u, v in zip(route, route[1:]):
+            data = min(self.G[u][v].values(), key=lambda edge: edge.get("length", 0.0))
+            if "geometry" in data:
+                coordinates.extend(data["geometry"].coords[1:])
+            else:
+                coordinates.append((self.G.nodes[v]["x"], self.G.nodes[v]["y"]))
+
+        points = np.asarray(coordinates, dtype=np.float64)
+        lons, lats = np.radians(points[:, 0]), np.radians(points[:, 1])
+        a = (np.sin(np.diff(lats) / 2) ** 2
+             + np.cos(lats[:-1]) * np.cos(lats[1:]) * np.sin(np.diff(lons) / 2) ** 2)
+        segments = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+        return np.column_stack((points, np.concatenate(([0.0], np.cumsum(segments)))))
+
+    def _advance(self, driver: SimulatedDriver) -> Tuple[float, float]:
+        """Moves the driver by one tick and returns its new longitude and latitude."""
+        driver.position += driver.speed * 1000 / 3600 * self.interval
+        length = driver.distances[-1, 2]
+        if driver.position >= length:
+            overshoot = driver.position - length
+            self._route(driver, driver.route[-1])
+            driver.position = min(overshoot, driver.distances[-1, 2])
+        distances = driver.distances
+        return (float(np.interp(driver.position, distances[:, 2], distances[:, 0])),
+                float(np.interp(driver.position, distances[:, 2], distances[:, 1])))
+
+    def step(self) -> List[Dict[str, Union[str, float]]]:
+        """
+        Advances all drivers by one tick.
+
+        Returns:
+            List[Dict[str, Union[str, float]]]: The generated driver data, one fix per driver.
+        """
+        count = len(self.drivers)
+        teleports = self.rng.random(count) < self.teleport_rate
+        speed_spikes = self.rng.random(count) < self.speed_anomaly_rate
+        altitude_spikes = self.rng.random(count) < self.altitude_anomaly_rate
+
+        positions = []
+        for driver, teleport in zip(self.drivers, teleports):
+            if teleport:
+                self._route(driver, self._random_node())
+            positions.append(self._advance(driver))
+
+        lons, lats = np.asarray(positions).T
+        altitudes = get_altitudes(shapely.points(lons, lats))
+        min_altitude, max_altitude = self.altitude_range
+        altitudes = np.where(np.isnan(altitudes), self.rng.uniform(min_altitude, max_altitude, count), altitudes)
+        altitudes = np.where(altitude_spikes, max_altitude + self.rng.uniform(100, 1000, count), altitudes)
+        speeds = np.array([driver.speed for driver in self.drivers])
+        speeds = np.where(speed_spikes, self.max_speed_kmh * self.rng.uniform(1.2, 2.0, count), speeds)
+
+        return [
+            DriverDataRequestSchema(
+                driver_id=driver.driver_id,
+                latitude=lat,
+                longitude=lon,
+                speed=speed,
+                altitude=min(altitude, 8850.0)
+            ).model_dump()
+            for driver, lon, lat, speed, altitude in zip(self.drivers, lons, lats, speeds, altitudes)
+        ]
@@ -0,0 +1,100 @@
+import argparse
+import os
+from typing import List, Tuple
+
+import numpy as np
+import requests
+
+from config import settings, base_dir
+from constants.core.logs import logger
+from utils.map.artifact import NODE_COORDINATES_FILE, city_artifact_path, read_manifest
+from utils.map.elevation import ElevationGrid
+
+# Number of locations sent in one lookup request
+LOOKUP_BATCH_SIZE = 500
+
+
+def lookup_elevations(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Retrieves elevations of many points from the open-elevation compatible service in `elevation.lookup_url`.
+
+    Points are posted in batches to the lookup endpoint instead of one GET request per point.
+
+    Args:
+        latitudes (np.ndarray): Latitudes in degrees.
+        longitudes (np.ndarray): Longitudes in degrees.
+
+    Returns:
+        np.ndarray: Elevations in meters, NaN where the service returned none.
+    """
+    url = settings.elevation.lookup_url.split("?")[0]
+    elevations = np.full(len(latitudes), np.nan)
+    for start in range(0, len(latitudes), LOOKUP_BATCH_SIZE):
+        end = start + LOOKUP_BATCH_SIZE
+        locations = [{"latitude": float(latitude), "longitude": float(longitude)}
+                     for latitude, longitude in zip(latitudes[start:end], longitudes[start:end])]
+        response = requests.post(url, json={"locations": locations})
+        response.raise_for_status()
+        results = response.json().get("results") or []
+        elevations[start:start + len(results)] = [
+            np.nan if result.get("elevation") is None else result["elevation"] for result in results]
+        logger.info("Looked up %s of %s elevations", min(end, len(latitudes)), len(latitudes))
+    return elevations
+
+
+def get_city_bounds(path: str, city: str) -> Tuple[List[float], List[float]]:
+    """
+    Returns the bounds of a city, those of its map artifact nodes if the artifact is built.
+
+    Args:
+        path (str): The map artifact directory of the city.
+        city (str): The name of the city.
+
+    Returns:
+        Tuple[List[float], List[float]]: Latitude and longitude ranges in degrees.
+    """
+    if read_manifest(path) is not None:
+        coordinates = np.load(os.path.join(path, NODE_COORDINATES_FILE), mmap_mode="r")
+        longitudes, latitudes = coordinates[:, 0], coordinates[:, 1]
+        return [float(latitudes.min()), float(latitudes.max())], [float(longitudes.min()), float(longitudes.max())]
+    if city != settings.location.city:
+        raise SystemExit(f"No map artifact in {path}, build it first with scripts.map.build_map_artifact")
+    return settings.location.latitude_range, settings.location.longitude_range
+
+
+def main() -> None:
+    """
+    Builds the local elevation grid of a city, so the generator needs no elevation service.
+
+    The grid is resampled from a local DEM raster given with `--dem`. Without one, it is sampled from the
+    elevation service once, in batched requests, as a fallback for when no DEM of the city is at hand.
+    """
+    parser = argparse.ArgumentParser(description="Build a local elevation grid covering a city.")
+    parser.add_argument("--city", default=settings.location.city,
+                        help="City covered by the grid, defaults to location.city")
+    parser.add_argument("--artifact-dir", default=os.path.join(base_dir, settings.map.artifact_dir),
+                        help="Directory holding map artifacts, defaults to map.artifact_dir from settings.json")
+    parser.add_argument("--grid-size", type=int, default=settings.elevation.grid_size,
+                        help="Grid points along each axis, defaults to elevation.grid_size")
+    parser.add_argument("--dem", default=None,
+                        help="DEM raster in the ESRI ASCII grid format covering the city, "
+                             "defaults to sampling the elevation service")
+    args = parser.parse_args()
+
+    path = city_artifact_path(args.artifact_dir, args.city)
+    latitude_range, longitude_range = get_city_bounds(path, args.city)
+    if args.dem is not None:
+        logger.info("Resampling DEM %s", args.dem)
+        lookup = ElevationGrid.from_ascii_grid(args.dem).lookup
+    else:
+        logger.info("No DEM given, sampling the elevation service %s", settings.elevation.lookup_url)
+        lookup = lookup_elevations
+    logger.info("Building %sx%s elevation grid of latitudes %s and longitudes %s in %s",
+                args.grid_size, args.grid_size, latitude_range, longitude_range, path)
+    grid = ElevationGrid.from_lookup(latitude_range, longitude_range, args.grid_size, args.grid_size, lookup)
+    grid.save(path)
+    logger.info("Elevation grid built, %s points without elevation", int(np.isnan(grid.heights).sum()))
+
+
+if __name__ == "__main__":
+    main()
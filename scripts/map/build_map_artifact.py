@@ -0,0 +1,29 @@
+import argparse
+import os
+
+from config import settings, base_dir
+from constants.core.logs import logger
+from utils.map.artifact import build_map_artifact, city_artifact_path
+
+
+def main() -> None:
+    """
+    Builds the local map artifact of a city, so the API and the generator start without network access.
+    """
+    parser = argparse.ArgumentParser(description="Build a local map artifact from OpenStreetMap data.")
+    parser.add_argument("--city", default=settings.location.city,
+                        help="City to download, defaults to location.city from settings.json")
+    parser.add_argument("--artifact-dir", default=os.path.join(base_dir, settings.map.artifact_dir),
+                        help="Directory holding map artifacts, defaults to map.artifact_dir from settings.json")
+    parser.add_argument("--landmarks", type=int, default=settings.routing.landmarks,
+                        help="Number of ALT landmarks to precompute, 0 to skip, defaults to routing.landmarks")
+    args = parser.parse_args()
+
+    path = city_artifact_path(args.artifact_dir, args.city)
+    logger.info(f"Building map artifact for '{args.city}' in {path}")
+    manifest = build_map_artifact(args.city, path, args.landmarks)
+    logger.info(f"Map artifact built: {manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional, Union
+from urllib.parse import urljoin
+
+import httpx
+
+from config import settings
+from constants.core.logs import logger
+
+try:
+    import zstandard
+except ImportError:  # --encoding zstd is unavailable when the package is not installed
+    zstandard = None
+
+# Unpaced bodies are sent in chunks of about this size
+CHUNK_BYTES = 64 * 1024
+
+
+def parse_timestamp(value: Union[str, float, None]) -> Optional[float]:
+    """
+    Reads the capture time of a record.
+
+    Args:
+        value (Union[str, float, None]): Epoch seconds or an ISO 8601 timestamp.
+
+    Returns:
+        Optional[float]: The time in epoch seconds, None if the record has none.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return None
+
+
+async def read_capture(path: str, time_field: str, speed: float) -> AsyncIterator[bytes]:
+    """
+    Yields the records of a `.jsonl` capture, each when it is due.
+
+    Record `n` is due `(time_n - time_1) / speed` seconds after the replay started, measured on the
+    monotonic clock, so delays do not add up over a long replay. Records without a capture time
+    are sent right away.
+
+    Args:
+        path (str): The capture file with one driver data record per line.
+        time_field (str): Field holding the capture time of a record.
+        speed (float): Replay speed, 1 for the original pace, 0 to send as fast as possible.
+
+    Yields:
+        bytes: One record per line, with a trailing newline.
+    """
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    first_timestamp = None
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if speed > 0:
+                timestamp = parse_timestamp(json.loads(line).get(time_field))
+                if timestamp is not None:
+                    if first_timestamp is None:
+                        first_timestamp = timestamp
+                    delay = started_at + (timestamp - first_timestamp) / speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+            yield line.rstrip(b"\r\n") + b"\n"
+
+
+async def encode_body(lines: AsyncIterator[bytes], encoding: str, paced: bool) -> AsyncIterator[bytes]:
+    """
+    Compresses records into body chunks.
+
+    Paced records are flushed one by one, so the server sees each record when it is due.
+    Otherwise the output is collected into chunks of about `CHUNK_BYTES`.
+
+    Args:
+        lines (AsyncIterator[bytes]): The records.
+        encoding (str): "identity", "gzip" or "zstd".
+        paced (bool): Whether every record has to be sent right away.
+
+    Yields:
+        bytes: Chunks of the request body.
+    """
+    if encoding == "gzip":
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        compress, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    elif encoding == "zstd":
+        compressor = zstandard.ZstdCompressor().compressobj()
+        compress, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    else:
+        compress, flush, finish = (lambda data: data), (lambda: b""), (lambda: b"")
+
+    chunk = b""
+    async for line in lines:
+        chunk += compress(line)
+        if paced:
+            chunk += flush()
+        if chunk and (paced or len(chunk) >= CHUNK_BYTES):
+            yield chunk
+            chunk = b""
+    chunk += finish()
+    if chunk:
+        yield chunk
+
+
+async def replay_capture(path: str, endpoint: str, speed: float, time_field: str, encoding: str) -> dict:
+    """
+    Replays a capture through the streaming ingest endpoint as one request.
+
+    Args:
+        path (str): The capture file.
+        endpoint (str): URL of the streaming ingest endpoint.
+        speed (float): Replay speed, 1 for the original pace, 0 to send as fast as possible.
+        time_field (str): Field holding the capture time of a record.
+        encoding (str): Compression of the request body.
+
+    Returns:
+        dict: The response of the endpoint.
+    """
+    headers = {"Content-Type": "application/x-ndjson"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    body = encode_body(read_capture(path, time_field, speed), encoding, paced=speed > 0)
+
+    # A paced replay of hours of data is one long request, so only connecting is time limited
+    async with httpx.AsyncClient(timeout=httpx.Timeout(None, connect=10.0)) as client:
+        response = await client.post(endpoint, content=body, headers=headers)
+        response.raise_for_status()
+        return response.json()
+
+
+def main() -> None:
+    """
+    Replays a recorded `.jsonl` capture of driver data at the original pace or N times faster.
+    """
+    parser = argparse.ArgumentParser(description="Replay a .jsonl capture of driver data through the stream endpoint.")
+    parser.add_argument("capture", help="Capture file with one driver data record per line")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed, 1 for the original pace, N for N times faster, 0 for as fast as possible")
+    parser.add_argument("--time-field", default="created_at",
+                        help="Field holding the capture time as epoch seconds or ISO 8601, defaults to created_at")
+    parser.add_argument("--encoding", choices=("identity", "gzip", "zstd"), default="gzip",
+                        help="Compression of the request body")
+    parser.add_argument("--endpoint", default=urljoin(settings.driver_service.endpoint_url, "stream"),
+                        help="Streaming ingest endpoint, defaults to the stream endpoint next to driver_service.endpoint_url")
+    args = parser.parse_args()
+    if args.encoding == "zstd" and zstandard is None:
+        parser.error("--encoding zstd requires the zstandard package")
+
+    logger.info(f"Replaying {args.capture} to {args.endpoint} at {args.speed}x")
+    response = asyncio.run(replay_capture(args.capture, args.endpoint, args.speed, args.time_field, args.encoding))
+    logger.info(f"Replay finished: {response}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class DriverState:
+    """
+    Last fix of a driver, kept in `__slots__` so a record costs a fraction of a pydantic `model_dump()` dict.
+
+    `updated_at` is the monotonic time the fix was received, `captured_at` the epoch time the fix was
+    captured, if the client sent it.
+    """
+
+    __slots__ = ("latitude", "longitude", "altitude", "speed", "is_correct", "node", "updated_at", "captured_at")
+
+    def __init__(self, latitude: float, longitude: float, altitude: float, speed: float,
+                 is_correct: bool, node: Optional[int], updated_at: float, captured_at: Optional[float] = None) -> None:
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.speed = speed
+        self.is_correct = is_correct
+        self.node = node
+        self.updated_at = updated_at
+        self.captured_at = captured_at
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the record and its attribute values in bytes."""
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in
+                                         ("latitude", "longitude", "altitude", "speed", "node"))
+
+
+class DriverStateStore:
+    """
+    Per-driver state with TTL eviction.
+
+    Drivers are kept in least recently updated order, so evicting idle drivers only looks at the front
+    of the dict and costs O(1) per eviction. Besides the TTL, the number of tracked drivers is capped:
+    when the cap is reached, the least recently updated driver is dropped. `on_evict` is called with
+    the ID of every evicted driver, so structures keyed by active drivers can follow the store.
+    """
+
+    def __init__(self, ttl_seconds: float, max_drivers: int,
+                 on_evict: Optional[Callable[[str], None]] = None) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_drivers = max_drivers
+        self.on_evict = on_evict
+        self.evicted = 0
+        self._states: OrderedDict[str, DriverState] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, driver_id: str) -> bool:
+        return driver_id in self._states
+
+    def get(self, driver_id: str) -> Optional[DriverState]:
+        """
+        Returns the last fix of a driver unless it expired.
+
+        Args:
+            driver_id (str): The ID of the driver.
+
+        Returns:
+            Optional[DriverState]: The last fix, or None if the driver is unknown or idle for longer than the TTL.
+        """
+        state = self._states.get(driver_id)
+        if state is not None and time.monotonic() - state.updated_at > self.ttl_seconds:
+            return None
+        return state
+
+    def put(self, driver_id: str, state: DriverState) -> None:
+        """
+        Stores the last fix of a driver and evicts idle drivers.
+
+        Args:
+            driver_id (str): The ID of the driver.
+            state (DriverState): The driver's last fix.
+        """
+        self._states[driver_id] = state
+        self._states.move_to_end(driver_id)
+        self.evict_idle(state.updated_at)
+        while len(self._states) > self.max_drivers:
+            evicted_id, _ = self._states.popitem(last=False)
+            self.evicted += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted_id)
+
+    def swap(self, driver_id: str, state: DriverState) -> Optional[DriverState]:
+        """
+        Stores the last fix of a driver and returns the fix it replaces.
+
+        Args:
+            driver_id (str): The ID of the driver.
+            state (DriverState): The driver's last fix.
+
+        Returns:
+            Optional[DriverState]: The previous fix, or None if the driver was unknown or idle for longer than the TTL.
+        """
+        previous = self.get(driver_id)
+        self.put(driver_id, state)
+        return previous
+
+    def update_if_current(self, driver_id: str, state: DriverState) -> bool:
+        """
+        Writes back changes made to a stored fix, unless a newer fix of the driver was stored meanwhile.
+
+        Stored fixes are the objects passed to `put`, so changes are already visible and only the check is left.
+
+        Args:
+            driver_id (str): The ID of the driver.
+            state (DriverState): The fix passed to `put` earlier.
+
+        Returns:
+            bool: True if the fix is still the driver's last fix.
+        """
+        return self._states.get(driver_id) is state
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Drops drivers that were not updated for longer than the TTL.
+
+        Args:
+            now (Optional[float]): Current `time.monotonic()` value, taken when not given.
+
+        Returns:
+            int: The number of evicted drivers.
+        """
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        while self._states:
+            driver_id, state = next(iter(self._states.items()))
+            if now - state.updated_at <= self.ttl_seconds:
+                break
+            del self._states[driver_id]
+            evicted += 1
+            if self.on_evict is not None:
+                self.on_evict(driver_id)
+        self.evicted += evicted
+        return evicted
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Estimated memory taken by the store in bytes.
+
+        The size of one record and its key is measured on the most recent driver and multiplied by the
+        number of drivers, which keeps the estimate O(1) for large fleets.
+        """
+        size = sys.getsizeof(self._states)
+        if self._states:
+            driver_id, state = next(reversed(self._states.items()))
+            size += len(self._states) * (sys.getsizeof(driver_id) + state.nbytes)
+        return size
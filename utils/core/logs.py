@@ -0,0 +1,113 @@
+import atexit
+import itertools
+import json
+import logging
+import queue
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict
+
+# LogRecord attributes that are not user supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "event"}
+
+# Argument types that can not change before the listener thread formats the record
+_IMMUTABLE_ARGUMENT_TYPES = (str, int, float, bool, bytes, type(None), uuid.UUID)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+
+    Fields passed with `extra=` are included as top-level keys next to the standard ones.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in N records of every sampled event.
+
+    The event is taken from the `event` attribute set with `extra={"event": ...}`. Records of events
+    without a configured rate, like anomalies and errors, are always kept.
+    """
+
+    def __init__(self, sample_rates: Dict[str, int]) -> None:
+        super().__init__()
+        self.sample_rates = sample_rates
+        self._counters = {event: itertools.count() for event, rate in sample_rates.items() if rate > 1}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        counter = self._counters.get(getattr(record, "event", None))
+        if counter is None:
+            return True
+        return next(counter) % self.sample_rates[record.event] == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The stock `QueueHandler.prepare` formats the message in the calling thread so the record can be
+    pickled. Records here never leave the process, so records whose arguments are all immutable are
+    queued as is and the event loop only pays for creating the record. Arguments like dicts may be
+    changed by the caller before the listener gets to them, so those records are formatted right away,
+    hot paths therefore log scalar fields only.
+
+    Filters of the handler, like `SamplingFilter`, run in the calling thread before `prepare`,
+    so records dropped by sampling are never formatted nor queued.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and (not isinstance(args, tuple)
+                     or not all(isinstance(arg, _IMMUTABLE_ARGUMENT_TYPES) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def setup_logging(level: str, json_output: bool, sample_rates: Dict[str, int]) -> QueueListener:
+    """
+    Routes all logging through a queue drained by a background thread.
+
+    Args:
+        level (str): Root log level, e.g. "INFO".
+        json_output (bool): Whether to write JSON lines instead of plain text.
+        sample_rates (Dict[str, int]): Keep 1 in N records of these events.
+
+    Returns:
+        QueueListener: The running listener, stopped automatically at exit.
+    """
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(
+        JsonFormatter() if json_output
+        else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    # Sampled on the handler rather than the listener, so dropped records cost no formatting or queueing
+    queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
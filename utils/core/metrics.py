@@ -0,0 +1,401 @@
+import base64
+import bisect
+import hashlib
+import itertools
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Upper bounds of latency histogram buckets in seconds
+DEFAULT_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                           1.0, 2.5, 5.0, 10.0)
+
+
+class HyperLogLog:
+    """
+    Cardinality sketch for counting distinct values in fixed memory.
+
+    With the default precision of 14 it takes 16 KiB regardless of how many values are added
+    and estimates the count with a standard error of about 0.8%.
+    """
+
+    def __init__(self, precision: int = 14) -> None:
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = np.zeros(self.size, dtype=np.uint8)
+        self._alpha = 0.7213 / (1 + 1.079 / self.size)
+
+    def add(self, value: str) -> None:
+        """
+        Adds a value to the sketch.
+
+        Args:
+            value (str): The value to count.
+        """
+        hashed = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        """
+        Estimates the number of distinct values added so far.
+
+        Returns:
+            int: The estimated cardinality.
+        """
+        estimate = self._alpha * self.size ** 2 / float(np.exp2(-self.registers.astype(np.float64)).sum())
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.size and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+    def snapshot(self) -> str:
+        """Returns the registers encoded for a JSON document."""
+        return base64.b64encode(self.registers.tobytes()).decode()
+
+    def merge(self, snapshot: str) -> None:
+        """
+        Adds the values counted by another sketch of the same precision, as if they were added to this one.
+
+        Args:
+            snapshot (str): The `snapshot()` of the other sketch.
+        """
+        np.maximum(self.registers, np.frombuffer(base64.b64decode(snapshot), dtype=np.uint8), out=self.registers)
+
+
+class WindowedRate:
+    """
+    Sliding window event counter made of a fixed ring of time slots.
+    """
+
+    def __init__(self, window_seconds: int, slots: int) -> None:
+        self.window_seconds = window_seconds
+        self.slot_seconds = window_seconds / slots
+        self._counts = [0] * slots
+        self._slot_ids = [-1] * slots
+
+    def add(self, amount: int = 1, now: Optional[float] = None) -> None:
+        """
+        Records events.
+
+        Args:
+            amount (int): Number of events.
+            now (Optional[float]): Current `time.monotonic()` value, taken when not given.
+        """
+        slot_id = int((time.monotonic() if now is None else now) / self.slot_seconds)
+        position = slot_id % len(self._counts)
+        if self._slot_ids[position] != slot_id:
+            self._slot_ids[position] = slot_id
+            self._counts[position] = 0
+        self._counts[position] += amount
+
+    def total(self, now: Optional[float] = None) -> int:
+        """
+        Counts events within the window.
+
+        Args:
+            now (Optional[float]): Current `time.monotonic()` value, taken when not given.
+
+        Returns:
+            int: The number of events within the last `window_seconds`.
+        """
+        oldest = int((time.monotonic() if now is None else now) / self.slot_seconds) - len(self._counts) + 1
+        return sum(count for count, slot_id in zip(self._counts, self._slot_ids) if slot_id >= oldest)
+
+    def snapshot(self) -> Dict[str, List[int]]:
+        """Returns the slots as a JSON serializable dict."""
+        return {"counts": list(self._counts), "slot_ids": list(self._slot_ids)}
+
+    def merge(self, snapshot: Dict[str, List[int]]) -> None:
+        """
+        Adds the events of another window with the same slots.
+
+        Slots are numbered on the monotonic clock, which all processes of a host share,
+        so the slots of windows kept by different processes line up.
+
+        Args:
+            snapshot (Dict[str, List[int]]): The `snapshot()` of the other window.
+        """
+        for position, (count, slot_id) in enumerate(zip(snapshot["counts"], snapshot["slot_ids"])):
+            if slot_id == self._slot_ids[position]:
+                self._counts[position] += count
+            elif slot_id > self._slot_ids[position]:
+                self._slot_ids[position], self._counts[position] = slot_id, count
+
+
+class Counter:
+    """
+    Monotonic counter with per-minute and per-hour windows.
+
+    Like every metric of a `MetricsRegistry`, it is only updated from the event loop, so increments take no lock.
+    """
+
+    def __init__(self, description: str) -> None:
+        self.description = description
+        self.value = 0
+        self.per_minute = WindowedRate(60, 60)
+        self.per_hour = WindowedRate(3600, 60)
+
+    def inc(self, amount: int = 1) -> None:
+        """
+        Increments the counter.
+
+        Args:
+            amount (int): The increment.
+        """
+        now = time.monotonic()
+        self.value += amount
+        self.per_minute.add(amount, now)
+        self.per_hour.add(amount, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the total and the windows as a JSON serializable dict."""
+        return {"value": self.value, "per_minute": self.per_minute.snapshot(), "per_hour": self.per_hour.snapshot()}
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Adds the total and the windows of another counter.
+
+        Args:
+            snapshot (Dict[str, Any]): The `snapshot()` of the other counter.
+        """
+        self.value += snapshot["value"]
+        self.per_minute.merge(snapshot["per_minute"])
+        self.per_hour.merge(snapshot["per_hour"])
+
+
+class Gauge:
+    """
+    Value that can go up and down.
+    """
+
+    def __init__(self, description: str) -> None:
+        self.description = description
+        self.value: float = 0.0
+
+    def set(self, value: float) -> None:
+        """
+        Sets the gauge.
+
+        Args:
+            value (float): The new value.
+        """
+        self.value = value
+
+    def snapshot(self) -> float:
+        """Returns the value."""
+        return self.value
+
+    def merge(self, snapshot: float) -> None:
+        """
+        Keeps the higher of the two values, sums do not make sense for gauges such as the last flush duration.
+
+        Args:
+            snapshot (float): The `snapshot()` of the other gauge.
+        """
+        self.value = max(self.value, snapshot)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed bucket upper bounds, as exposed by Prometheus.
+
+    Like every metric of a `MetricsRegistry`, it is only updated from the event loop, so observations take no lock.
+    """
+
+    def __init__(self, description: str, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Records an observation.
+
+        Args:
+            value (float): The observed value in seconds.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by interpolating inside the bucket it falls into.
+
+        Args:
+            q (float): The quantile between 0 and 1.
+
+        Returns:
+            float: The estimated value in seconds, 0 when nothing was observed.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[position - 1] if position > 0 else 0.0
+                upper = self.buckets[position] if position < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+        Returns cumulative bucket counts keyed by their Prometheus `le` label.
+
+        Returns:
+            List[Tuple[str, int]]: (upper bound, number of observations not above it) pairs ending with `+Inf`.
+        """
+        bounds = [repr(bucket) for bucket in self.buckets] + ["+Inf"]
+        return list(zip(bounds, itertools.accumulate(self.counts)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the bucket counts, count and sum as a JSON serializable dict."""
+        return {"counts": list(self.counts), "count": self.count, "sum": self.sum}
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Adds the observations of another histogram with the same buckets.
+
+        Args:
+            snapshot (Dict[str, Any]): The `snapshot()` of the other histogram.
+        """
+        self.counts = [count + other for count, other in zip(self.counts, snapshot["counts"])]
+        self.count += snapshot["count"]
+        self.sum += snapshot["sum"]
+
+
+class MetricsRegistry:
+    """
+    Named counters, gauges and histograms of the service plus a unique driver sketch.
+
+    Metrics are updated, snapshotted and merged from the event loop only, which serializes every update
+    without locks. Code running on executor threads, like the graph workers or spill disk I/O, returns
+    its results to the loop and the loop updates the metrics.
+    """
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self.start_time = time.time()
+        self.counters: Dict[str, Counter] = {}
+        self.gauges: Dict[str, Gauge] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.unique_drivers = HyperLogLog()
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Registers a counter, returning the existing one if the name is taken."""
+        return self.counters.setdefault(name, Counter(description))
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        """Registers a gauge, returning the existing one if the name is taken."""
+        return self.gauges.setdefault(name, Gauge(description))
+
+    def histogram(self, name: str, description: str, buckets: Iterable[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        """Registers a histogram, returning the existing one if the name is taken."""
+        return self.histograms.setdefault(name, Histogram(description, buckets))
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        """Increments a registered counter."""
+        self.counters[name].inc(amount)
+
+    def set(self, name: str, value: float) -> None:
+        """Sets a registered gauge."""
+        self.gauges[name].set(value)
+
+    def observe(self, name: str, value: float) -> None:
+        """Records an observation of a registered histogram."""
+        self.histograms[name].observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the state of every metric as a JSON serializable dict, which another process can `merge`.
+
+        Returns:
+            Dict[str, Any]: The snapshot.
+        """
+        return {
+            "start_time": self.start_time,
+            "counters": {name: counter.snapshot() for name, counter in self.counters.items()},
+            "gauges": {name: gauge.snapshot() for name, gauge in self.gauges.items()},
+            "histograms": {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            "unique_drivers": self.unique_drivers.snapshot(),
+        }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Adds the metrics of another registry with the same metrics registered.
+
+        Counters, histograms and the unique driver sketch merge exactly, gauges keep the higher value.
+
+        Args:
+            snapshot (Dict[str, Any]): The `snapshot()` of the other registry.
+        """
+        self.start_time = min(self.start_time, snapshot["start_time"])
+        for name, counter in snapshot["counters"].items():
+            if name in self.counters:
+                self.counters[name].merge(counter)
+        for name, gauge in snapshot["gauges"].items():
+            if name in self.gauges:
+                self.gauges[name].merge(gauge)
+        for name, histogram in snapshot["histograms"].items():
+            if name in self.histograms:
+                self.histograms[name].merge(histogram)
+        self.unique_drivers.merge(snapshot["unique_drivers"])
+
+    def copy_definitions(self) -> "MetricsRegistry":
+        """
+        Returns an empty registry with the same metrics registered.
+
+        Returns:
+            MetricsRegistry: The new registry.
+        """
+        registry = MetricsRegistry(self.namespace)
+        for name, counter in self.counters.items():
+            registry.counter(name, counter.description)
+        for name, gauge in self.gauges.items():
+            registry.gauge(name, gauge.description)
+        for name, histogram in self.histograms.items():
+            registry.histogram(name, histogram.description, histogram.buckets)
+        return registry
+
+    def render_prometheus(self, extra_gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Args:
+            extra_gauges (Optional[Dict[str, Tuple[str, float]]]): Gauges computed on demand, as name -> (description, value).
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+
+        def add(name: str, kind: str, description: str, samples: List[Tuple[str, float]]) -> None:
+            full_name = f"{self.namespace}_{name}"
+            lines.append(f"# HELP {full_name} {description}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            lines.extend(f"{full_name}{suffix} {value}" for suffix, value in samples)
+
+        add("uptime_seconds", "gauge", "Time since the service started", [("", time.time() - self.start_time)])
+        add("unique_drivers", "gauge", "Estimated number of unique drivers", [("", self.unique_drivers.count())])
+        for name, counter in self.counters.items():
+            add(f"{name}_total", "counter", counter.description, [("", counter.value)])
+        for name, gauge in self.gauges.items():
+            add(name, "gauge", gauge.description, [("", gauge.value)])
+        for name, (description, value) in (extra_gauges or {}).items():
+            add(name, "gauge", description, [("", value)])
+        for name, histogram in self.histograms.items():
+            samples = [(f'_bucket{{le="{bound}"}}', count) for bound, count in histogram.cumulative()]
+            samples += [("_sum", histogram.sum), ("_count", histogram.count)]
+            add(f"{name}_seconds", "histogram", histogram.description, samples)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,33 @@
+import asyncio
+import cProfile
+import io
+import pstats
+
+_profile_lock = asyncio.Lock()
+
+
+async def capture_profile(seconds: float, limit: int = 50, sort_by: str = "cumulative") -> str:
+    """
+    Profiles the event loop thread of the live process for a while.
+
+    Only one profile can be captured at a time, further calls wait for the running one to finish.
+
+    Args:
+        seconds (float): How long to profile.
+        limit (int): Number of functions to include in the report.
+        sort_by (str): `pstats` sort key, e.g. "cumulative" or "tottime".
+
+    Returns:
+        str: The `pstats` report.
+    """
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(sort_by).print_stats(limit)
+    return output.getvalue()
@@ -0,0 +1,394 @@
+import fcntl
+import math
+import mmap
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.core.driver_state import DriverState
+from utils.map.index import EARTH_RADIUS_M
+
+# Fixed-width record of a driver: the last fix plus the last valid position for nearby queries
+STATE_DTYPE = np.dtype([
+    ("key_hi", "<u8"),
+    ("key_lo", "<u8"),
+    ("latitude", "<f8"),
+    ("longitude", "<f8"),
+    ("altitude", "<f8"),
+    ("speed", "<f8"),
+    ("node", "<i8"),
+    ("updated_at", "<f8"),
+    ("valid_latitude", "<f8"),
+    ("valid_longitude", "<f8"),
+    ("valid_node", "<i8"),
+    ("valid_at", "<f8"),
+    ("used", "u1"),
+    ("is_correct", "u1"),
+    ("has_valid", "u1"),
+    ("captured_at", "<f8"),
+])
+
+# The header holds the layout of the table, so a file of another layout is never misread,
+# and the counters of the table, so they are read without a scan
+HEADER_FIELDS = 8
+HEADER_BYTES = HEADER_FIELDS * 8
+_MAGIC, _CAPACITY, _PROBE_WINDOW, _RECORD_SIZE, _EVICTED, _USED, _VALID = range(7)
+MAGIC = 0x44474553  # "DGES"
+
+# Bump whenever the record or header layout changes, files of other versions are then left alone
+FORMAT_VERSION = 3
+
+# Graph nodes are non-negative, -1 stands for a fix that was not snapped
+NO_NODE = -1
+
+# Stands for a fix without a capture time
+NO_CAPTURE_TIME = math.nan
+
+
+def _split_key(driver_id: str) -> Tuple[int, int]:
+    key = uuid.UUID(driver_id).bytes
+    return int.from_bytes(key[:8], "little"), int.from_bytes(key[8:], "little")
+
+
+def _join_key(key_hi: int, key_lo: int) -> str:
+    return str(uuid.UUID(bytes=int(key_hi).to_bytes(8, "little") + int(key_lo).to_bytes(8, "little")))
+
+
+class SharedDriverStateStore:
+    """
+    Per-driver state shared by all worker processes of one host.
+
+    The state is a hash table of fixed-width records in a memory-mapped file, so every process that maps the
+    file sees the fixes stored by the others, whichever worker a request landed on. A driver is placed in a
+    window of `probe_window` slots after the slot its ID hashes to. An expired or empty slot of the window is
+    reused for a new driver, and when the window is full the least recently updated driver in it is evicted,
+    so the table never needs resizing or compaction. Expiry itself is lazy: a record older than the TTL is
+    ignored and overwritten later.
+
+    Writes and point reads take an exclusive `flock` on the file, which serializes them across processes.
+    A fix takes it twice: `swap` reads the previous fix and stores the new one, `update_if_current` checks
+    the fix is still current and writes back its validation result together with the valid position.
+    The file should live on a tmpfs such as `/dev/shm`, so it costs no disk I/O and does not outlive a reboot,
+    which resets the monotonic clock the records are stamped with.
+
+    The file name carries the format version and the table size, so a deployment with other settings
+    maps a file of its own and never resizes one that running workers of another deployment have mapped.
+
+    The store has the interface of `DriverStateStore`, driver IDs have to be UUID strings.
+    """
+
+    def __init__(self, path: str, capacity: int, ttl_seconds: float, probe_window: int = 32) -> None:
+        self.path = f"{path}-v{FORMAT_VERSION}-{capacity}x{probe_window}"
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.probe_window = probe_window
+
+        # The window of the last slots runs past the end instead of wrapping around
+        size = HEADER_BYTES + (capacity + probe_window) * STATE_DTYPE.itemsize
+        layout = [MAGIC, capacity, probe_window, STATE_DTYPE.itemsize]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            file_size = os.fstat(self._fd).st_size
+            if file_size == 0:
+                # A new file, sized by the first process under the lock
+                os.ftruncate(self._fd, size)
+            elif file_size != size:
+                raise RuntimeError(f"Driver state file {self.path} has an unexpected size, remove it to start over")
+            self._mmap = mmap.mmap(self._fd, size)
+            self._header = np.frombuffer(self._mmap, dtype="<i8", count=HEADER_FIELDS)
+            if self._header[_MAGIC] == 0:
+                self._header[[_MAGIC, _CAPACITY, _PROBE_WINDOW, _RECORD_SIZE]] = layout
+            elif self._header[:_EVICTED].tolist() != layout:
+                raise RuntimeError(f"Driver state file {self.path} has another layout, remove it to start over")
+        self._table = np.frombuffer(self._mmap, dtype=STATE_DTYPE, offset=HEADER_BYTES)
+        # Column views, a key lookup compares one column of the window instead of whole records
+        self._key_hi, self._key_lo, self._used = self._table["key_hi"], self._table["key_lo"], self._table["used"]
+        self._has_valid = self._table["has_valid"]
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _start(self, key_hi: int, key_lo: int) -> int:
+        # Fibonacci hashing spreads sequential IDs, the hash must not depend on the process like hash() does
+        return ((key_hi ^ key_lo) * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF) % self.capacity
+
+    def _find(self, key_hi: int, key_lo: int) -> Optional[int]:
+        start = self._start(key_hi, key_lo)
+        for position in np.flatnonzero(self._key_hi[start:start + self.probe_window] == key_hi).tolist():
+            if self._key_lo[start + position] == key_lo and self._used[start + position]:
+                return start + position
+        return None
+
+    def _is_live(self, updated_at: np.ndarray, now: float) -> np.ndarray:
+        return (now - updated_at <= self.ttl_seconds) & (updated_at <= now)
+
+    def __len__(self) -> int:
+        # Read from the header, a driver idle for longer than the TTL is counted until its slot is reused
+        return int(self._header[_USED])
+
+    def __contains__(self, driver_id: str) -> bool:
+        return self.get(driver_id) is not None
+
+    @property
+    def evicted(self) -> int:
+        """Number of drivers evicted by any process."""
+        return int(self._header[_EVICTED])
+
+    @property
+    def valid_count(self) -> int:
+        """Number of drivers with a valid position, idle ones included until their slot is reused."""
+        return int(self._header[_VALID])
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the shared table in bytes."""
+        return len(self._mmap)
+
+    @staticmethod
+    def _to_state(record: np.void) -> DriverState:
+        _, _, latitude, longitude, altitude, speed, node, updated_at, _, _, _, _, _, is_correct, _, captured_at = \
+            record.item()
+        return DriverState(latitude, longitude, altitude, speed, bool(is_correct), None if node == NO_NODE else node,
+                           updated_at, None if math.isnan(captured_at) else captured_at)
+
+    def get(self, driver_id: str) -> Optional[DriverState]:
+        """
+        Returns the last fix of a driver unless it expired.
+
+        Args:
+            driver_id (str): The ID of the driver.
+
+        Returns:
+            Optional[DriverState]: The last fix, or None if the driver is unknown or idle for longer than the TTL.
+        """
+        with self._locked():
+            index = self._find(*_split_key(driver_id))
+            if index is None:
+                return None
+            state = self._to_state(self._table[index])
+        now = time.monotonic()
+        if now - state.updated_at > self.ttl_seconds or state.updated_at > now:
+            return None
+        return state
+
+    def put(self, driver_id: str, state: DriverState) -> None:
+        """
+        Stores the last fix of a driver, evicting the least recently updated driver of its window when it is full.
+
+        Args:
+            driver_id (str): The ID of the driver.
+            state (DriverState): The driver's last fix.
+        """
+        key_hi, key_lo = _split_key(driver_id)
+        with self._locked():
+            self._put(key_hi, key_lo, self._find(key_hi, key_lo), state)
+
+    def swap(self, driver_id: str, state: DriverState) -> Optional[DriverState]:
+        """
+        Stores the last fix of a driver and returns the fix it replaces, under a single lock.
+
+        Args:
+            driver_id (str): The ID of the driver.
+            state (DriverState): The driver's last fix.
+
+        Returns:
+            Optional[DriverState]: The previous fix, or None if the driver was unknown or idle for longer than the TTL.
+        """
+        key_hi, key_lo = _split_key(driver_id)
+        with self._locked():
+            index = self._find(key_hi, key_lo)
+            previous = None if index is None else self._to_state(self._table[index])
+            self._put(key_hi, key_lo, index, state)
+        now = time.monotonic()
+        if previous is None or now - previous.updated_at > self.ttl_seconds or previous.updated_at > now:
+            return None
+        return previous
+
+    def _put(self, key_hi: int, key_lo: int, index: Optional[int], state: DriverState) -> None:
+        if index is None:
+            start = self._start(key_hi, key_lo)
+            window = self._table[start:start + self.probe_window]
+            free = np.flatnonzero((window["used"] == 0) | ~self._is_live(window["updated_at"], state.updated_at))
+            if free.size:
+                index = start + int(free[0])
+            else:
+                index = start + int(np.argmin(window["updated_at"]))
+                self._header[_EVICTED] += 1
+            # The slot may still hold an expired or evicted driver, which leaves with its valid position
+            self._header[_USED] += 1 - int(self._used[index])
+            self._header[_VALID] -= int(self._has_valid[index])
+            valid = (0.0, 0.0, NO_NODE, 0.0, 0)
+        else:
+            record = self._table[index].item()
+            valid = record[8:12] + record[14:15]
+        self._table[index] = self._to_record(key_hi, key_lo, state, valid)
+
+    @staticmethod
+    def _to_record(key_hi: int, key_lo: int, state: DriverState, valid: tuple) -> tuple:
+        valid_latitude, valid_longitude, valid_node, valid_at, has_valid = valid
+        return (key_hi, key_lo, state.latitude, state.longitude, state.altitude, state.speed,
+                NO_NODE if state.node is None else state.node, state.updated_at,
+                valid_latitude, valid_longitude, valid_node, valid_at, 1, state.is_correct, has_valid,
+                NO_CAPTURE_TIME if state.captured_at is None else state.captured_at)
+
+    def update_if_current(self, driver_id: str, state: DriverState) -> bool:
+        """
+        Writes back changes made to a stored fix, unless a newer fix of the driver was stored meanwhile.
+
+        A fix that is still current and passed validation also becomes the driver's valid position in the same
+        write, so `SharedPositionIndex.update` has nothing left to do.
+
+        Args:
+            driver_id (str): The ID of the driver.
+            state (DriverState): The fix passed to `put` earlier.
+
+        Returns:
+            bool: True if the fix is still the driver's last fix.
+        """
+        key_hi, key_lo = _split_key(driver_id)
+        with self._locked():
+            index = self._find(key_hi, key_lo)
+            if index is None:
+                return False
+            record = self._table[index].item()
+            if record[7] != state.updated_at:
+                return False
+            if state.is_correct:
+                valid = (state.latitude, state.longitude, NO_NODE if state.node is None else state.node,
+                         state.updated_at, 1)
+                self._header[_VALID] += 1 - record[14]
+            else:
+                valid = record[8:12] + record[14:15]
+            self._table[index] = self._to_record(key_hi, key_lo, state, valid)
+        return True
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Expired records are skipped on read and overwritten on write, so there is nothing to evict eagerly.
+
+        Returns:
+            int: Always 0.
+        """
+        return 0
+
+    def set_valid_position(self, driver_id: str, longitude: float, latitude: float,
+                           state: Optional[DriverState]) -> None:
+        """
+        Sets or clears the last valid position of a driver.
+
+        Args:
+            driver_id (str): The ID of the driver.
+            longitude (float): Longitude of the position.
+            latitude (float): Latitude of the position.
+            state (Optional[DriverState]): The fix at the position, None to clear it.
+        """
+        key_hi, key_lo = _split_key(driver_id)
+        valid = (0.0, 0.0, NO_NODE, 0.0, 0) if state is None else \
+            (latitude, longitude, NO_NODE if state.node is None else state.node, state.updated_at, 1)
+        with self._locked():
+            index = self._find(key_hi, key_lo)
+            if index is not None:
+                record = self._table[index].item()
+                self._header[_VALID] += valid[4] - record[14]
+                self._table[index] = record[:8] + valid[:4] + record[12:14] + valid[4:] + record[15:]
+
+    def valid_positions(self) -> np.ndarray:
+        """
+        Returns the records of the live drivers that have a valid position.
+
+        The table is scanned without the lock, a record written meanwhile may be returned half updated,
+        so callers confirm the drivers they keep with `get`.
+
+        Returns:
+            np.ndarray: A copy of the matching records.
+        """
+        table = self._table
+        return table[(table["used"] == 1) & (table["has_valid"] == 1)
+                     & self._is_live(table["updated_at"], time.monotonic())]
+
+
+class SharedPositionIndex:
+    """
+    Last valid position of every driver of a `SharedDriverStateStore`, with the parts of the `PositionGrid`
+    interface used by the controller.
+
+    The positions are stored in the records of the drivers, so they are shared by all worker processes and
+    leave with the driver when its record expires or is evicted. A query scans the positions of all live
+    drivers with vectorized operations, which takes milliseconds for a million drivers rather than the
+    microseconds of a grid, in exchange for seeing the drivers of every worker.
+    """
+
+    def __init__(self, store: SharedDriverStateStore) -> None:
+        self.store = store
+
+    def __len__(self) -> int:
+        return self.store.valid_count
+
+    def update(self, key: str, longitude: float, latitude: float, data: DriverState) -> None:
+        """
+        Sets the last valid position of a driver.
+
+        The controller calls it after `update_if_current`, which already stored the position of a valid fix,
+        so only a position that differs from the fix is written.
+
+        Args:
+            key (str): The ID of the driver.
+            longitude (float): Longitude of the position.
+            latitude (float): Latitude of the position.
+            data (DriverState): The fix at the position.
+        """
+        if (longitude, latitude) != (data.longitude, data.latitude) or not data.is_correct:
+            self.store.set_valid_position(key, longitude, latitude, data)
+
+    def remove(self, key: str) -> None:
+        """
+        Clears the last valid position of a driver.
+
+        Args:
+            key (str): The ID of the driver.
+        """
+        self.store.set_valid_position(key, 0.0, 0.0, None)
+
+    @staticmethod
+    def _valid_states(records: np.ndarray) -> Iterator[Tuple[str, DriverState]]:
+        for record in records:
+            node = int(record["valid_node"])
+            yield _join_key(record["key_hi"], record["key_lo"]), DriverState(
+                float(record["valid_latitude"]), float(record["valid_longitude"]), float(record["altitude"]),
+                float(record["speed"]), True, None if node == NO_NODE else node, float(record["valid_at"]))
+
+    def nearby(self, longitude: float, latitude: float, radius_m: float,
+               k: Optional[int] = None) -> List[Tuple[str, float, DriverState]]:
+        """
+        Finds the drivers within a radius, nearest first.
+
+        Args:
+            longitude (float): Longitude of the query point.
+            latitude (float): Latitude of the query point.
+            radius_m (float): Search radius in meters.
+            k (Optional[int]): Maximum number of drivers, None for all within the radius.
+
+        Returns:
+            List[Tuple[str, float, DriverState]]: (driver ID, straight-line distance in meters, last valid fix)
+            of every driver found.
+        """
+        records = self.store.valid_positions()
+        ky = math.radians(1) * EARTH_RADIUS_M
+        kx = ky * math.cos(math.radians(latitude))
+        distances = np.hypot((records["valid_longitude"] - longitude) * kx, (records["valid_latitude"] - latitude) * ky)
+        within = np.flatnonzero(distances <= radius_m)
+        if k is not None and within.size > k:
+            within = within[np.argpartition(distances[within], k - 1)[:k]]
+        within = within[np.argsort(distances[within])]
+        return [(driver_id, float(distance), state) for (driver_id, state), distance
+                in zip(self._valid_states(records[within]), distances[within])]
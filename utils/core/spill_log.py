@@ -0,0 +1,177 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class SpillLog:
+    """
+    Append-only log of records on local disk, split into segment files.
+
+    Records are appended as JSON lines to the active segment, and every `append` ends with a single
+    `fsync`, so a batch of records costs one disk flush however many records it holds. When the active
+    segment grows past `segment_max_bytes`, it is sealed and the next append starts a new one.
+
+    Segments are named by their creation time and the PID of their writer, so several processes can share
+    a directory and segments sort oldest first. A writer holds an exclusive `flock` on its active segment,
+    which tells readers to leave it alone. The lock is released when the segment is sealed or its writer dies,
+    so segments left by a crashed process are picked up like sealed ones.
+
+    `append` and `seal` may be called from different threads, the active segment is guarded by a lock.
+    """
+
+    def __init__(self, directory: str, segment_max_bytes: int) -> None:
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self._active: Optional[IO[bytes]] = None
+        self._active_path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _open_segment(self) -> Tuple[IO[bytes], str]:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}")
+        # The segment is locked under a temporary name, so no reader can claim it before it is locked
+        segment = open(f"{path}.new", "ab")
+        fcntl.flock(segment.fileno(), fcntl.LOCK_EX)
+        os.rename(f"{path}.new", path)
+        # Makes the new file itself durable, not only its content
+        directory_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+        return segment, path
+
+    def append(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Appends records and waits until they are on disk.
+
+        Args:
+            records (List[Dict[str, Any]]): JSON serializable records.
+        """
+        if not records:
+            return
+        data = b"".join(json.dumps(record).encode() + b"\n" for record in records)
+        with self._lock:
+            if self._active is None:
+                self._active, self._active_path = self._open_segment()
+            self._active.write(data)
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            if self._active.tell() >= self.segment_max_bytes:
+                self._seal()
+
+    def seal(self) -> None:
+        """Closes the active segment, so it can be read, the next append starts a new segment."""
+        with self._lock:
+            self._seal()
+
+    def _seal(self) -> None:
+        if self._active is not None:
+            self._active.close()
+            self._active = self._active_path = None
+
+    def segments(self) -> List[str]:
+        """
+        Lists the segments of all writers of the directory, oldest first, including active ones.
+
+        Returns:
+            List[str]: Paths of the segment files.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(names) if name.endswith(SEGMENT_SUFFIX)]
+
+    def has_backlog(self) -> bool:
+        """Whether any records of the directory are waiting to be replayed."""
+        return bool(self.segments())
+
+    def backlog_bytes(self) -> int:
+        """Size of all segments of the directory in bytes."""
+        size = 0
+        for path in self.segments():
+            try:
+                size += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return size
+
+    def is_active(self, path: str) -> bool:
+        """Whether a segment is the active segment of this log."""
+        return self._active_path == path
+
+
+class SegmentReader:
+    """
+    Exclusive reader of one sealed segment, released by `close` or by deleting the segment with `remove`.
+    """
+
+    def __init__(self, path: str, segment: IO[bytes]) -> None:
+        self.path = path
+        self._segment = segment
+
+    @classmethod
+    def claim(cls, path: str) -> Optional["SegmentReader"]:
+        """
+        Locks a segment for reading, unless it is active or being read by another process.
+
+        Args:
+            path (str): Path of the segment file.
+
+        Returns:
+            Optional[SegmentReader]: The reader, None if the segment is locked or gone.
+        """
+        try:
+            segment = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            fcntl.flock(segment.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            segment.close()
+            return None
+        # The segment may have been replayed and deleted by another process before the lock was taken,
+        # names are never reused, so an existing path is still the same segment
+        if not os.path.exists(path):
+            segment.close()
+            return None
+        return cls(path, segment)
+
+    def batches(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Reads the records in batches.
+
+        A line torn by a crash in the middle of an append can only be the last one of a segment, it is skipped.
+
+        Args:
+            batch_size (int): Maximum number of records per batch.
+
+        Yields:
+            List[Dict[str, Any]]: The next batch of records.
+        """
+        batch = []
+        for line in self._segment:
+            try:
+                batch.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def remove(self) -> None:
+        """Deletes the fully replayed segment."""
+        os.remove(self.path)
+        self.close()
+
+    def close(self) -> None:
+        """Releases the segment."""
+        self._segment.close()
@@ -0,0 +1,149 @@
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from utils.core.metrics import MetricsRegistry
+
+# Ingest stages in the order a request goes through them
+STAGES = ("parse", "snap", "route", "persist", "serialize")
+
+
+class Trace:
+    """
+    Stage timings of one request.
+    """
+
+    __slots__ = ("path", "started_at", "handler_started_at", "handler_finished_at", "stages")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.started_at = time.perf_counter()
+        self.handler_started_at: Optional[float] = None
+        self.handler_finished_at: Optional[float] = None
+        self.stages: Dict[str, float] = {}
+
+    def as_dict(self) -> dict:
+        """Returns the trace with stage timings in seconds."""
+        return {"path": self.path, "stages": dict(self.stages)}
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class Tracer:
+    """
+    Records how long each request spends in every ingest stage.
+
+    Every stage timing goes to a histogram of the metrics registry named after the stage, so percentiles
+    are aggregated over all requests. A `sample_rate` share of requests is also kept as a whole
+    in a bounded buffer of per-request traces.
+
+    `parse` is measured from the arrival of the request until the handler starts, which covers
+    reading the body and pydantic validation. `serialize` is measured from the end of the handler
+    until the response starts, which covers building the JSON body.
+    """
+
+    def __init__(self, registry: MetricsRegistry, sample_rate: float, buffer_size: int) -> None:
+        self.registry = registry
+        self.sample_rate = sample_rate
+        self.traces: Deque[dict] = deque(maxlen=buffer_size)
+        for stage in STAGES:
+            registry.histogram(stage, f"Time spent in the {stage} stage of ingest")
+
+    def start(self, path: str) -> Tuple[Trace, Token]:
+        """
+        Starts the trace of a request and makes it current.
+
+        Args:
+            path (str): The request path.
+
+        Returns:
+            Tuple[Trace, Token]: The trace and the token to pass to `reset`.
+        """
+        trace = Trace(path)
+        return trace, _current_trace.set(trace)
+
+    def reset(self, token: Token) -> None:
+        """Restores the trace that was current before `start`."""
+        _current_trace.reset(token)
+
+    def mark_handler_start(self) -> None:
+        """Marks the start of an ingest handler, which ends the `parse` stage."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.handler_started_at = time.perf_counter()
+            self._record(trace, "parse", trace.handler_started_at - trace.started_at)
+
+    def mark_handler_end(self) -> None:
+        """Marks the end of an ingest handler, which starts the `serialize` stage."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.handler_finished_at = time.perf_counter()
+
+    def finish(self, trace: Trace) -> None:
+        """
+        Completes the trace once the response starts.
+
+        Requests whose handler did not mark itself, like metrics or settings, are not recorded.
+
+        Args:
+            trace (Trace): The trace returned by `start`.
+        """
+        if trace.handler_finished_at is None:
+            return
+        self._record(trace, "serialize", time.perf_counter() - trace.handler_finished_at)
+        if self.sample_rate and random.random() < self.sample_rate:
+            self.traces.append(trace.as_dict())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Times the enclosed block as a stage of the current request.
+
+        Args:
+            name (str): The stage name.
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(_current_trace.get(), name, time.perf_counter() - started_at)
+
+    def _record(self, trace: Optional[Trace], name: str, elapsed: float) -> None:
+        self.registry.observe(name, elapsed)
+        if trace is not None:
+            trace.stages[name] = trace.stages.get(name, 0.0) + elapsed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Aggregates stage timings over all recorded requests.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Count, mean and percentiles in seconds of every stage.
+        """
+        result = {}
+        for stage in STAGES:
+            histogram = self.registry.histograms[stage]
+            result[stage] = {
+                "count": histogram.count,
+                "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                "p50": histogram.quantile(0.5),
+                "p90": histogram.quantile(0.9),
+                "p99": histogram.quantile(0.99),
+            }
+        return result
+
+    def sampled_traces(self, limit: int) -> List[dict]:
+        """
+        Returns the most recent sampled traces.
+
+        Args:
+            limit (int): Maximum number of traces.
+
+        Returns:
+            List[dict]: The traces, newest first.
+        """
+        return list(reversed(self.traces))[:limit]
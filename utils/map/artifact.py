@@ -0,0 +1,222 @@
+import json
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+
+from utils.map.csr import CSR_INDICES_FILE, CSR_INDPTR_FILE, CSR_LENGTHS_FILE, CSR_NODE_IDS_FILE, CSRGraph
+from utils.map.index import NodeIndex
+from utils.map.landmarks import LANDMARK_FROM_FILE, LANDMARK_POSITIONS_FILE, LANDMARK_TO_FILE, LandmarkIndex
+
+if TYPE_CHECKING:
+    from geopandas import GeoDataFrame
+    from networkx import MultiDiGraph
+
+# Bump whenever the layout of the artifact changes, older artifacts are then ignored
+ARTIFACT_VERSION = 2
+
+MANIFEST_FILE = "manifest.json"
+GRAPH_FILE = "graph.pickle"
+EDGES_FILE = "edges.pickle"
+NODE_IDS_FILE = "node_ids.npy"
+NODE_COORDINATES_FILE = "node_coordinates.npy"
+
+# Every file a build may write, other files of the directory, e.g. the elevation grid, are left alone
+ARTIFACT_FILES = (
+    MANIFEST_FILE, GRAPH_FILE, EDGES_FILE, NODE_IDS_FILE, NODE_COORDINATES_FILE,
+    CSR_NODE_IDS_FILE, CSR_INDPTR_FILE, CSR_INDICES_FILE, CSR_LENGTHS_FILE,
+    LANDMARK_POSITIONS_FILE, LANDMARK_FROM_FILE, LANDMARK_TO_FILE,
+)
+
+
+def city_artifact_path(artifact_dir: str, city_name: str) -> str:
+    """
+    Builds the directory of the map artifact of a city.
+
+    Args:
+        artifact_dir (str): Directory holding map artifacts of all cities.
+        city_name (str): The name of the city, e.g. "Lviv, Ukraine".
+
+    Returns:
+        str: The artifact directory, e.g. "<artifact_dir>/lviv-ukraine".
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", city_name.lower()).strip("-")
+    return os.path.join(artifact_dir, slug)
+
+
+def build_map_artifact(city_name: str, path: str, landmarks: int = 0) -> dict:
+    """
+    Downloads city road data once and stores it as a local map artifact.
+
+    The graph and edge geometries are pickled with the highest protocol. Node IDs and coordinates
+    as well as the CSR routing arrays are stored as plain `.npy` files, which are memory-mapped on load.
+    The snapping index is rebuilt from the mapped coordinates in milliseconds.
+    Optionally the ALT landmark tables are precomputed as well.
+
+    Args:
+        city_name (str): The name of the city for which to build the artifact.
+        path (str): Directory to write the artifact to.
+        landmarks (int): Number of ALT landmarks to precompute, 0 to skip.
+
+    Returns:
+        dict: The manifest of the written artifact.
+    """
+    from utils.map.core import load_city_road_data
+
+    G, edges = load_city_road_data(city_name)
+    return write_map_artifact(G, edges, city_name, path, landmarks)
+
+
+def write_map_artifact(G: "MultiDiGraph", edges: "GeoDataFrame", city_name: str, path: str, landmarks: int = 0) -> dict:
+    """
+    Stores an already loaded city graph as a local map artifact, see `build_map_artifact`.
+
+    Args:
+        G (MultiDiGraph): The graph representing the city's street network.
+        edges (GeoDataFrame): The edges of the graph.
+        city_name (str): The name of the city the artifact is looked up by.
+        path (str): Directory to write the artifact to.
+        landmarks (int): Number of ALT landmarks to precompute, 0 to skip.
+
+    Returns:
+        dict: The manifest of the written artifact.
+    """
+    os.makedirs(path, exist_ok=True)
+    # Files are written to a staging directory next to the artifact and then renamed into place,
+    # so processes memory-mapping the previous files keep reading them intact
+    staging = tempfile.mkdtemp(prefix=".build-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with open(os.path.join(staging, GRAPH_FILE), "wb") as f:
+            pickle.dump(G, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(staging, EDGES_FILE), "wb") as f:
+            pickle.dump(edges, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        node_ids, xs, ys = zip(*((node, data["x"], data["y"]) for node, data in G.nodes(data=True)))
+        np.save(os.path.join(staging, NODE_IDS_FILE), np.asarray(node_ids))
+        np.save(os.path.join(staging, NODE_COORDINATES_FILE), np.column_stack((xs, ys)).astype(np.float64))
+        csr = CSRGraph.from_graph(G)
+        csr.save(staging)
+        if landmarks > 0:
+            LandmarkIndex.build(csr, landmarks).save(staging)
+
+        manifest = {
+            "version": ARTIFACT_VERSION,
+            "city": city_name,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "nodes": G.number_of_nodes(),
+            "edges": G.number_of_edges(),
+            "landmarks": landmarks,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=4)
+
+        # The previous manifest is removed first and the new one is moved last,
+        # so an interrupted build never looks complete
+        try:
+            os.remove(os.path.join(path, MANIFEST_FILE))
+        except FileNotFoundError:
+            pass
+        # Files of a previous build this one does not write, e.g. landmark tables, would be stale
+        written = set(os.listdir(staging))
+        for name in ARTIFACT_FILES:
+            if name not in written:
+                try:
+                    os.remove(os.path.join(path, name))
+                except FileNotFoundError:
+                    pass
+        for name in sorted(os.listdir(staging), key=lambda name: name == MANIFEST_FILE):
+            os.replace(os.path.join(staging, name), os.path.join(path, name))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return manifest
+
+
+def read_manifest(path: str) -> Optional[dict]:
+    """
+    Reads the manifest of a map artifact.
+
+    Args:
+        path (str): The artifact directory.
+
+    Returns:
+        Optional[dict]: The manifest, or None if there is no complete artifact of the current version.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == ARTIFACT_VERSION else None
+
+
+def load_graph(path: str) -> Tuple["MultiDiGraph", "GeoDataFrame"]:
+    """
+    Loads the city graph and its edges from a map artifact written by `build_map_artifact`.
+
+    Args:
+        path (str): The artifact directory.
+
+    Returns:
+        Tuple[MultiDiGraph, GeoDataFrame]: The city graph and its edges.
+    """
+    with open(os.path.join(path, GRAPH_FILE), "rb") as f:
+        G = pickle.load(f)
+    with open(os.path.join(path, EDGES_FILE), "rb") as f:
+        edges = pickle.load(f)
+    return G, edges
+
+
+def load_node_index(path: str) -> NodeIndex:
+    """
+    Builds the snapping index from the memory-mapped node arrays of a map artifact, without loading the graph.
+
+    Args:
+        path (str): The artifact directory.
+
+    Returns:
+        NodeIndex: The snapping index over all nodes of the city graph.
+    """
+    node_ids = np.load(os.path.join(path, NODE_IDS_FILE), mmap_mode="r")
+    coordinates = np.load(os.path.join(path, NODE_COORDINATES_FILE), mmap_mode="r")
+    return NodeIndex(node_ids, coordinates[:, 0], coordinates[:, 1])
+
+
+def load_map_artifact(path: str) -> Tuple["MultiDiGraph", "GeoDataFrame", NodeIndex]:
+    """
+    Loads a map artifact written by `build_map_artifact`.
+
+    Args:
+        path (str): The artifact directory.
+
+    Returns:
+        Tuple[MultiDiGraph, GeoDataFrame, NodeIndex]: The city graph, its edges and the snapping index.
+    """
+    G, edges = load_graph(path)
+    return G, edges, load_node_index(path)
+
+
+def load_city_map(city_name: str, artifact_dir: str) -> Tuple["MultiDiGraph", "GeoDataFrame", NodeIndex]:
+    """
+    Loads the city map from its local artifact, downloading it from OpenStreetMap only when the artifact is missing.
+
+    Args:
+        city_name (str): The name of the city for which to load road data.
+        artifact_dir (str): Directory holding map artifacts of all cities.
+
+    Returns:
+        Tuple[MultiDiGraph, GeoDataFrame, NodeIndex]: The city graph, its edges and the snapping index.
+    """
+    path = city_artifact_path(artifact_dir, city_name)
+    manifest = read_manifest(path)
+    if manifest is not None and manifest.get("city") == city_name:
+        return load_map_artifact(path)
+
+    from utils.map.core import load_city_road_data
+
+    G, edges = load_city_road_data(city_name)
+    return G, edges, NodeIndex.from_graph(G)
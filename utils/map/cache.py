@@ -0,0 +1,69 @@
+import math
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class PathLengthCache:
+    """
+    Bounded LRU cache of road distances between snapped graph nodes.
+
+    Besides the length, every entry keeps the cutoff it was computed with: a finite length is exact
+    and answers any later query, while `math.inf` only means "farther than the cutoff" and is reused
+    only for queries with the same or a smaller cutoff.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Tuple[int, int], Tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, original_node: int, destination_node: int, cutoff: Optional[float] = None) -> Optional[float]:
+        """
+        Looks up the distance between two nodes.
+
+        Args:
+            original_node (int): ID of the starting node.
+            destination_node (int): ID of the destination node.
+            cutoff (Optional[float]): Search radius the caller would use, None for an unbounded search.
+
+        Returns:
+            Optional[float]: The cached distance in meters, or None if it has to be computed.
+        """
+        key = (original_node, destination_node)
+        entry = self._entries.get(key)
+        if entry is not None:
+            length, entry_cutoff = entry
+            if length != math.inf or (cutoff is not None and cutoff <= entry_cutoff):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return length
+        self.misses += 1
+        return None
+
+    def put(self, original_node: int, destination_node: int, length: float, cutoff: Optional[float] = None) -> None:
+        """
+        Stores the distance between two nodes, evicting the least recently used entry when full.
+
+        Args:
+            original_node (int): ID of the starting node.
+            destination_node (int): ID of the destination node.
+            length (float): The distance in meters, `math.inf` if it exceeds the cutoff.
+            cutoff (Optional[float]): Search radius the distance was computed with, None for an unbounded search.
+        """
+        if self.max_size <= 0:
+            return
+        key = (original_node, destination_node)
+        self._entries[key] = (length, math.inf if cutoff is None else cutoff)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drops all entries and resets the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,166 @@
+import math
+import os
+from typing import TYPE_CHECKING, Dict, Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
+
+CSR_NODE_IDS_FILE = "csr_node_ids.npy"
+CSR_INDPTR_FILE = "csr_indptr.npy"
+CSR_INDICES_FILE = "csr_indices.npy"
+CSR_LENGTHS_FILE = "csr_lengths.npy"
+
+
+class CSRGraph:
+    """
+    Array-backed road graph for shortest path queries.
+
+    Adjacency is stored in compressed sparse row form: `indptr` holds the offsets of every node's
+    outgoing edges in `indices` (targets) and `lengths` (meters). Parallel edges of the multigraph
+    are collapsed to the shortest one, which is the only one a shortest path can use.
+    Searches run in C through `scipy.sparse.csgraph.dijkstra`. Node IDs are kept sorted,
+    so mapping an OSM node ID to its row is a binary search instead of a Python dict.
+    """
+
+    def __init__(self, node_ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray, lengths: np.ndarray) -> None:
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.lengths = lengths
+        size = len(node_ids)
+        self.matrix = csr_matrix((lengths, indices, indptr), shape=(size, size), copy=False)
+        self._reverse_matrix: Optional[csr_matrix] = None
+
+    @classmethod
+    def from_graph(cls, G: "MultiDiGraph") -> "CSRGraph":
+        """
+        Converts an osmnx graph to its CSR representation.
+
+        Args:
+            G (MultiDiGraph): The graph representing the city's street network.
+
+        Returns:
+            CSRGraph: The array-backed graph.
+        """
+        node_ids = np.sort(np.fromiter(G.nodes, dtype=np.int64, count=G.number_of_nodes()))
+        edges = [(u, v, length) for u, v, length in G.edges(data="length") if u != v]
+        sources = np.searchsorted(node_ids, np.fromiter((edge[0] for edge in edges), dtype=np.int64, count=len(edges)))
+        targets = np.searchsorted(node_ids, np.fromiter((edge[1] for edge in edges), dtype=np.int64, count=len(edges)))
+        lengths = np.fromiter((edge[2] for edge in edges), dtype=np.float64, count=len(edges))
+
+        # Sort by source, target and length, then keep the first (shortest) edge of every pair
+        order = np.lexsort((lengths, targets, sources))
+        sources, targets, lengths = sources[order], targets[order], lengths[order]
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        sources, targets, lengths = sources[keep], targets[keep], lengths[keep]
+
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=len(node_ids)), out=indptr[1:])
+        return cls(node_ids, indptr, targets.astype(np.int32), lengths)
+
+    @classmethod
+    def load(cls, path: str) -> "CSRGraph":
+        """
+        Memory-maps arrays saved by `save`, so every process reading them shares the same pages.
+
+        Args:
+            path (str): Directory holding the arrays.
+
+        Returns:
+            CSRGraph: The array-backed graph.
+        """
+        return cls(*(np.load(os.path.join(path, name), mmap_mode="r") for name in
+                     (CSR_NODE_IDS_FILE, CSR_INDPTR_FILE, CSR_INDICES_FILE, CSR_LENGTHS_FILE)))
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """
+        Checks whether arrays saved by `save` are present.
+
+        Args:
+            path (str): Directory holding the arrays.
+
+        Returns:
+            bool: True if all arrays are present, False otherwise.
+        """
+        return all(os.path.exists(os.path.join(path, name)) for name in
+                   (CSR_NODE_IDS_FILE, CSR_INDPTR_FILE, CSR_INDICES_FILE, CSR_LENGTHS_FILE))
+
+    def save(self, path: str) -> None:
+        """
+        Saves the arrays as `.npy` files.
+
+        Args:
+            path (str): Directory to write the arrays to.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name, array in ((CSR_NODE_IDS_FILE, self.node_ids), (CSR_INDPTR_FILE, self.indptr),
+                            (CSR_INDICES_FILE, self.indices), (CSR_LENGTHS_FILE, self.lengths)):
+            np.save(os.path.join(path, name), np.asarray(array))
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken by the arrays in bytes."""
+        return sum(array.nbytes for array in (self.node_ids, self.indptr, self.indices, self.lengths))
+
+    def position(self, node_id: int) -> int:
+        """
+        Finds the row of an OSM node ID.
+
+        Args:
+            node_id (int): The OSM node ID.
+
+        Returns:
+            int: The row of the node in the arrays.
+
+        Raises:
+            KeyError: If the node is not in the graph.
+        """
+        position = int(np.searchsorted(self.node_ids, node_id))
+        if position >= len(self.node_ids) or self.node_ids[position] != node_id:
+            raise KeyError(f"Node {node_id} is not in the graph")
+        return position
+
+    def path_length(self, original_node: int, destination_node: int, cutoff: Optional[float] = None) -> float:
+        """
+        Computes the shortest path length between two nodes.
+
+        Args:
+            original_node (int): OSM ID of the starting node.
+            destination_node (int): OSM ID of the destination node.
+            cutoff (Optional[float]): Search radius in meters, the search does not go beyond it.
+
+        Returns:
+            float: The length of the shortest path in meters, `math.inf` if there is none within the cutoff.
+        """
+        source = self.position(original_node)
+        target = self.position(destination_node)
+        if source == target:
+            return 0.0
+        distances = dijkstra(self.matrix, directed=True, indices=source,
+                             limit=math.inf if cutoff is None else cutoff)
+        return float(distances[target])
+
+    def path_lengths_to(self, destination_node: int, cutoff: float) -> Dict[int, float]:
+        """
+        Computes the shortest path lengths from every node within a radius to one node.
+
+        A single search over the reversed edges answers all starting nodes at once.
+
+        Args:
+            destination_node (int): OSM ID of the destination node.
+            cutoff (float): Search radius in meters, farther nodes are left out.
+
+        Returns:
+            Dict[int, float]: Road distance in meters to the destination by OSM ID of every node within the radius.
+        """
+        if self._reverse_matrix is None:
+            self._reverse_matrix = self.matrix.T.tocsr()
+        distances = dijkstra(self._reverse_matrix, directed=True, indices=self.position(destination_node), limit=cutoff)
+        reachable = np.flatnonzero(np.isfinite(distances))
+        return dict(zip(self.node_ids[reachable].tolist(), distances[reachable].tolist()))
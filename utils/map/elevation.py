@@ -0,0 +1,143 @@
+import json
+import os
+from typing import Callable, List
+
+import numpy as np
+
+ELEVATION_FILE = "elevation.npy"
+ELEVATION_META_FILE = "elevation.json"
+
+
+class ElevationGrid:
+    """
+    Digital elevation model on a regular latitude/longitude grid.
+
+    `heights[i, j]` is the elevation in meters at latitude `south + i * lat_step` and longitude
+    `west + j * lon_step`. Lookups interpolate bilinearly between the four surrounding grid points
+    and are vectorized, so a batch of points costs a handful of NumPy operations. Points outside
+    the grid, and cells next to missing (NaN) heights, give NaN.
+    """
+
+    def __init__(self, heights: np.ndarray, south: float, west: float, lat_step: float, lon_step: float) -> None:
+        self.heights = heights
+        self.south = south
+        self.west = west
+        self.lat_step = lat_step
+        self.lon_step = lon_step
+
+    @classmethod
+    def from_lookup(cls, latitude_range: List[float], longitude_range: List[float], rows: int, cols: int,
+                    lookup: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> "ElevationGrid":
+        """
+        Samples an elevation source on a grid spanning the given bounds.
+
+        Args:
+            latitude_range (List[float]): South and north bounds in degrees.
+            longitude_range (List[float]): West and east bounds in degrees.
+            rows (int): Number of grid points along latitude, at least 2.
+            cols (int): Number of grid points along longitude, at least 2.
+            lookup (Callable[[np.ndarray, np.ndarray], np.ndarray]): Returns elevations of flat arrays of
+                latitudes and longitudes, NaN where unknown.
+
+        Returns:
+            ElevationGrid: The sampled grid.
+        """
+        south, north = min(latitude_range), max(latitude_range)
+        west, east = min(longitude_range), max(longitude_range)
+        latitudes, longitudes = np.meshgrid(np.linspace(south, north, rows), np.linspace(west, east, cols),
+                                            indexing="ij")
+        heights = np.asarray(lookup(latitudes.ravel(), longitudes.ravel()), dtype=np.float32).reshape(rows, cols)
+        return cls(heights, south, west, (north - south) / (rows - 1), (east - west) / (cols - 1))
+
+    @classmethod
+    def from_ascii_grid(cls, path: str) -> "ElevationGrid":
+        """
+        Reads a DEM raster in the ESRI ASCII grid format, e.g. an SRTM or Copernicus tile exported with
+        `gdal_translate -of AAIGrid`, in WGS84 degrees.
+
+        Args:
+            path (str): The `.asc` file.
+
+        Returns:
+            ElevationGrid: The grid of the raster, NaN where the raster has no data.
+        """
+        header = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.strip().partition(" ")
+                if not key or not key[0].isalpha():
+                    break
+                header[key.lower()] = float(value)
+        heights = np.loadtxt(path, skiprows=len(header), dtype=np.float32, ndmin=2)
+        if "nodata_value" in header:
+            heights[heights == header["nodata_value"]] = np.nan
+        cellsize = header["cellsize"]
+        # Corner coordinates are the outer edge of the corner cell, grid points lie at cell centers
+        offset = cellsize / 2 if "xllcorner" in header else 0
+        west = header.get("xllcorner", header.get("xllcenter")) + offset
+        south = header.get("yllcorner", header.get("yllcenter")) + offset
+        # Rows of the file run from north to south
+        return cls(heights[::-1].copy(), south, west, cellsize, cellsize)
+
+    @classmethod
+    def load(cls, path: str) -> "ElevationGrid":
+        """
+        Memory-maps a grid saved by `save`, only the pages touched by lookups are read from disk.
+
+        Args:
+            path (str): Directory holding the grid.
+
+        Returns:
+            ElevationGrid: The mapped grid.
+        """
+        with open(os.path.join(path, ELEVATION_META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        heights = np.load(os.path.join(path, ELEVATION_FILE), mmap_mode="r")
+        return cls(heights, meta["south"], meta["west"], meta["lat_step"], meta["lon_step"])
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """Checks whether a complete grid is stored in the directory."""
+        return all(os.path.exists(os.path.join(path, name)) for name in (ELEVATION_FILE, ELEVATION_META_FILE))
+
+    def save(self, path: str) -> None:
+        """
+        Stores the grid as a `.npy` array with its bounds in a JSON file.
+
+        Args:
+            path (str): Directory to write the grid to.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, ELEVATION_FILE), np.asarray(self.heights, dtype=np.float32))
+        meta = {"south": self.south, "west": self.west, "lat_step": self.lat_step, "lon_step": self.lon_step,
+                "rows": self.heights.shape[0], "cols": self.heights.shape[1]}
+        # The bounds are written last, so an interrupted save never looks complete
+        with open(os.path.join(path, ELEVATION_META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=4)
+
+    def lookup(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        Interpolates elevations of a batch of points.
+
+        Args:
+            latitudes (np.ndarray): Latitudes in degrees.
+            longitudes (np.ndarray): Longitudes in degrees, same shape as `latitudes`.
+
+        Returns:
+            np.ndarray: Elevations in meters, NaN for points outside the grid.
+        """
+        rows, cols = self.heights.shape
+        y = (np.asarray(latitudes, dtype=np.float64) - self.south) / self.lat_step
+        x = (np.asarray(longitudes, dtype=np.float64) - self.west) / self.lon_step
+        inside = (y >= 0) & (y <= rows - 1) & (x >= 0) & (x <= cols - 1)
+
+        # Points on the north or east edge use the last cell with a fraction of 1
+        row = np.clip(np.floor(np.where(inside, y, 0)).astype(np.intp), 0, rows - 2)
+        col = np.clip(np.floor(np.where(inside, x, 0)).astype(np.intp), 0, cols - 2)
+        ty = np.where(inside, y, 0) - row
+        tx = np.where(inside, x, 0) - col
+
+        heights = self.heights
+        south = heights[row, col] * (1 - tx) + heights[row, col + 1] * tx
+        north = heights[row + 1, col] * (1 - tx) + heights[row + 1, col + 1] * tx
+        return np.where(inside, south * (1 - ty) + north * ty, np.nan)
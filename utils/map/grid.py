@@ -0,0 +1,119 @@
+import math
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from utils.map.index import EARTH_RADIUS_M
+
+
+class PositionGrid:
+    """
+    Uniform grid of moving points for radius and k-nearest queries.
+
+    Points are projected with a local equirectangular projection and bucketed into square cells of
+    `cell_size_m`. Moving a point is O(1): it only changes its bucket when it crosses a cell border.
+    A query only looks at the cells overlapping the search radius, so its cost depends on the
+    number of points nearby rather than on the total number of points.
+    """
+
+    def __init__(self, cell_size_m: float, origin_latitude: float) -> None:
+        self.cell_size_m = cell_size_m
+        self._ky = math.radians(1) * EARTH_RADIUS_M
+        self._kx = self._ky * math.cos(math.radians(origin_latitude))
+        self._points: Dict[Hashable, Tuple[float, float, Tuple[int, int], Any]] = {}
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size_m), math.floor(y / self.cell_size_m)
+
+    def update(self, key: Hashable, longitude: float, latitude: float, data: Any = None) -> None:
+        """
+        Inserts a point or moves it to a new position.
+
+        Args:
+            key (Hashable): The ID of the point.
+            longitude (float): Longitude of the new position.
+            latitude (float): Latitude of the new position.
+            data (Any): Payload returned with the point by `nearby`.
+        """
+        x, y = longitude * self._kx, latitude * self._ky
+        cell = self._cell(x, y)
+        previous = self._points.get(key)
+        if previous is None or previous[2] != cell:
+            if previous is not None:
+                self._discard(key, previous[2])
+            self._cells.setdefault(cell, set()).add(key)
+        self._points[key] = (x, y, cell, data)
+
+    def remove(self, key: Hashable) -> None:
+        """
+        Removes a point if it is indexed.
+
+        Args:
+            key (Hashable): The ID of the point.
+        """
+        previous = self._points.pop(key, None)
+        if previous is not None:
+            self._discard(key, previous[2])
+
+    def _discard(self, key: Hashable, cell: Tuple[int, int]) -> None:
+        members = self._cells[cell]
+        members.discard(key)
+        if not members:
+            del self._cells[cell]
+
+    def nearby(self, longitude: float, latitude: float, radius_m: float,
+               k: Optional[int] = None) -> List[Tuple[Hashable, float, Any]]:
+        """
+        Finds the points within a radius, nearest first.
+
+        Cells are visited in rings around the cell of the query point. With `k` given, the search
+        stops as soon as `k` points are found closer than any point of the unvisited rings can be.
+
+        Args:
+            longitude (float): Longitude of the query point.
+            latitude (float): Latitude of the query point.
+            radius_m (float): Search radius in meters.
+            k (Optional[int]): Maximum number of points, None for all within the radius.
+
+        Returns:
+            List[Tuple[Hashable, float, Any]]: (key, straight-line distance in meters, payload) of every point found.
+        """
+        x, y = longitude * self._kx, latitude * self._ky
+        cx, cy = self._cell(x, y)
+        rings = math.ceil(radius_m / self.cell_size_m)
+        found = []
+
+        def visit(cells) -> None:
+            for cell in cells:
+                for key in self._cells.get(cell, ()):
+                    px, py, _, data = self._points[key]
+                    distance = math.hypot(px - x, py - y)
+                    if distance <= radius_m:
+                        found.append((distance, key, data))
+
+        if (2 * rings + 1) ** 2 > len(self._cells):
+            # A radius much larger than the populated area, walk the occupied cells instead
+            visit([cell for cell in self._cells if abs(cell[0] - cx) <= rings and abs(cell[1] - cy) <= rings])
+        else:
+            for ring in range(rings + 1):
+                visit(_ring_cells(cx, cy, ring))
+                # Points of the next rings are at least `ring` cells away from the query point
+                if k is not None and sum(1 for item in found if item[0] <= ring * self.cell_size_m) >= k:
+                    break
+
+        found.sort(key=lambda item: item[0])
+        return [(key, distance, data) for distance, key, data in found[:k]]
+
+
+def _ring_cells(cx: int, cy: int, ring: int) -> List[Tuple[int, int]]:
+    """Returns the cells at Chebyshev distance `ring` from the cell (cx, cy)."""
+    if ring == 0:
+        return [(cx, cy)]
+    cells = [(cx + dx, cy + dy) for dx in range(-ring, ring + 1) for dy in (-ring, ring)]
+    cells += [(cx + dx, cy + dy) for dx in (-ring, ring) for dy in range(-ring + 1, ring)]
+    return cells
@@ -0,0 +1,56 @@
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+if TYPE_CHECKING:
+    from networkx import MultiDiGraph
+
+EARTH_RADIUS_M = 6371008.8
+
+
+class NodeIndex:
+    """
+    KD-tree over graph node coordinates for nearest-node snapping.
+
+    Coordinates are projected with a local equirectangular projection centered on the graph,
+    which is accurate to well below a meter at city scale and keeps queries free of pyproj calls.
+    """
+
+    def __init__(self, node_ids: np.ndarray, longitudes: np.ndarray, latitudes: np.ndarray) -> None:
+        self.node_ids = node_ids
+        self._ky = math.radians(1) * EARTH_RADIUS_M
+        self._kx = self._ky * math.cos(math.radians(float(latitudes.mean())))
+        self._tree = cKDTree(self._project(longitudes, latitudes))
+
+    @classmethod
+    def from_graph(cls, G: "MultiDiGraph") -> "NodeIndex":
+        """
+        Builds the index from node `x`/`y` attributes of an unprojected osmnx graph.
+
+        Args:
+            G (MultiDiGraph): The graph representing the city's street network.
+
+        Returns:
+            NodeIndex: The index over all nodes of the graph.
+        """
+        node_ids, xs, ys = zip(*((node, data["x"], data["y"]) for node, data in G.nodes(data=True)))
+        return cls(np.asarray(node_ids), np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+
+    def _project(self, longitudes: np.ndarray, latitudes: np.ndarray) -> np.ndarray:
+        return np.column_stack((np.asarray(longitudes) * self._kx, np.asarray(latitudes) * self._ky))
+
+    def nearest(self, longitude: float, latitude: float) -> int:
+        """
+        Finds the node closest to a point.
+
+        Args:
+            longitude (float): Longitude of the point.
+            latitude (float): Latitude of the point.
+
+        Returns:
+            int: ID of the nearest node.
+        """
+        _, position = self._tree.query((longitude * self._kx, latitude * self._ky))
+        return self.node_ids[position].item()
@@ -0,0 +1,198 @@
+import heapq
+import math
+import os
+from typing import Dict, Optional
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from utils.map.csr import CSRGraph
+
+LANDMARK_POSITIONS_FILE = "landmark_positions.npy"
+LANDMARK_FROM_FILE = "landmark_from.npy"
+LANDMARK_TO_FILE = "landmark_to.npy"
+
+
+class LandmarkIndex:
+    """
+    ALT (A*, landmarks, triangle inequality) speed-up structure for point-to-point road distances.
+
+    Preprocessing runs one forward and one backward Dijkstra from each of a few landmarks spread over
+    the graph and stores the distances. By the triangle inequality they give a lower bound of the
+    distance between any two nodes, which is used both to reject queries whose bound already exceeds
+    the cutoff without any search, and as the A* heuristic for the remaining ones.
+
+    Distances to and from landmarks are stored as `(nodes, landmarks)` arrays with NaN for unreachable
+    pairs, which are skipped when computing the bound, so the bound stays admissible.
+    """
+
+    def __init__(self, csr: CSRGraph, positions: np.ndarray, from_landmarks: np.ndarray,
+                 to_landmarks: np.ndarray) -> None:
+        self.csr = csr
+        self.positions = positions
+        self.from_landmarks = from_landmarks
+        self.to_landmarks = to_landmarks
+
+    @classmethod
+    def build(cls, csr: CSRGraph, count: int) -> "LandmarkIndex":
+        """
+        Selects landmarks with the farthest-point heuristic and computes their distance tables.
+
+        Args:
+            csr (CSRGraph): The array-backed road graph.
+            count (int): Number of landmarks, more give tighter bounds at the cost of memory.
+
+        Returns:
+            LandmarkIndex: The landmark index over the graph.
+        """
+        size = len(csr.node_ids)
+        matrix = csr.matrix
+        reverse = matrix.T.tocsr()
+        count = max(1, min(count, size))
+
+        positions = [0]
+        from_rows = [dijkstra(matrix, directed=True, indices=0)]
+        closest = np.where(np.isinf(from_rows[0]), -1.0, from_rows[0])
+        while len(positions) < count:
+            # The next landmark is the reachable node farthest from all landmarks chosen so far
+            candidate = int(np.argmax(closest))
+            if closest[candidate] <= 0:
+                break
+            positions.append(candidate)
+            row = dijkstra(matrix, directed=True, indices=candidate)
+            from_rows.append(row)
+            closest = np.minimum(closest, row)
+        to_rows = [dijkstra(reverse, directed=True, indices=position) for position in positions]
+
+        def table(rows) -> np.ndarray:
+            distances = np.column_stack(rows)
+            distances[np.isinf(distances)] = np.nan
+            return np.ascontiguousarray(distances)
+
+        return cls(csr, np.asarray(positions, dtype=np.int32), table(from_rows), table(to_rows))
+
+    @classmethod
+    def load(cls, csr: CSRGraph, path: str) -> "LandmarkIndex":
+        """
+        Memory-maps distance tables saved by `save`.
+
+        Args:
+            csr (CSRGraph): The array-backed road graph the tables were built for.
+            path (str): Directory holding the tables.
+
+        Returns:
+            LandmarkIndex: The landmark index over the graph.
+        """
+        return cls(csr, *(np.load(os.path.join(path, name), mmap_mode="r") for name in
+                          (LANDMARK_POSITIONS_FILE, LANDMARK_FROM_FILE, LANDMARK_TO_FILE)))
+
+    @staticmethod
+    def exists(path: str, nodes: int) -> bool:
+        """
+        Checks whether tables saved by `save` are present and cover a graph with the given number of nodes.
+
+        Args:
+            path (str): Directory holding the tables.
+            nodes (int): Number of nodes of the graph the tables must have been built for.
+
+        Returns:
+            bool: True if the tables are present and match the graph, False otherwise.
+        """
+        try:
+            positions, from_landmarks, to_landmarks = (np.load(os.path.join(path, name), mmap_mode="r") for name in
+                                                       (LANDMARK_POSITIONS_FILE, LANDMARK_FROM_FILE, LANDMARK_TO_FILE))
+        except (OSError, ValueError):
+            return False
+        return from_landmarks.shape == to_landmarks.shape == (nodes, len(positions))
+
+    def save(self, path: str) -> None:
+        """
+        Saves the distance tables as `.npy` files.
+
+        Args:
+            path (str): Directory to write the tables to.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name, array in ((LANDMARK_POSITIONS_FILE, self.positions), (LANDMARK_FROM_FILE, self.from_landmarks),
+                            (LANDMARK_TO_FILE, self.to_landmarks)):
+            np.save(os.path.join(path, name), np.asarray(array))
+
+    def _lower_bound(self, source: int, target_from: np.ndarray, target_to: np.ndarray) -> float:
+        forward = target_from - self.from_landmarks[source]
+        backward = self.to_landmarks[source] - target_to
+        return max(float(np.fmax.reduce(forward, initial=0.0)), float(np.fmax.reduce(backward, initial=0.0)))
+
+    def _lower_bounds(self, nodes: np.ndarray, target_from: np.ndarray, target_to: np.ndarray) -> np.ndarray:
+        forward = np.fmax.reduce(target_from - self.from_landmarks[nodes], axis=1, initial=0.0)
+        backward = np.fmax.reduce(self.to_landmarks[nodes] - target_to, axis=1, initial=0.0)
+        return np.fmax(forward, backward)
+
+    def lower_bound(self, original_node: int, destination_node: int) -> float:
+        """
+        Computes a lower bound of the road distance between two nodes without searching the graph.
+
+        Args:
+            original_node (int): OSM ID of the starting node.
+            destination_node (int): OSM ID of the destination node.
+
+        Returns:
+            float: A distance in meters that the shortest path is never shorter than.
+        """
+        target = self.csr.position(destination_node)
+        return self._lower_bound(self.csr.position(original_node), self.from_landmarks[target],
+                                 self.to_landmarks[target])
+
+    def path_length(self, original_node: int, destination_node: int, cutoff: Optional[float] = None) -> float:
+        """
+        Computes the shortest path length between two nodes with landmark-guided A*.
+
+        The bounds of all neighbors of a settled node are computed in one vectorized step, so the search
+        pays one NumPy call per node rather than per edge. Without a cutoff, the A* search would settle
+        too large a part of the graph for a Python loop, the query runs the C Dijkstra of `CSRGraph` instead.
+
+        Args:
+            original_node (int): OSM ID of the starting node.
+            destination_node (int): OSM ID of the destination node.
+            cutoff (Optional[float]): Search radius in meters, the search does not go beyond it.
+
+        Returns:
+            float: The length of the shortest path in meters, `math.inf` if there is none within the cutoff.
+        """
+        if cutoff is None:
+            return self.csr.path_length(original_node, destination_node)
+
+        source = self.csr.position(original_node)
+        target = self.csr.position(destination_node)
+        if source == target:
+            return 0.0
+
+        target_from = np.asarray(self.from_landmarks[target])
+        target_to = np.asarray(self.to_landmarks[target])
+        if self._lower_bound(source, target_from, target_to) > cutoff:
+            return math.inf
+
+        indptr, indices, lengths = self.csr.indptr, self.csr.indices, self.csr.lengths
+        distances: Dict[int, float] = {source: 0.0}
+        settled = set()
+        heap = [(0.0, 0.0, source)]
+        while heap:
+            _, distance, node = heapq.heappop(heap)
+            if node == target:
+                return distance
+            if node in settled:
+                continue
+            settled.add(node)
+
+            start, end = int(indptr[node]), int(indptr[node + 1])
+            if start == end:
+                continue
+            neighbors = indices[start:end]
+            bounds = self._lower_bounds(neighbors, target_from, target_to)
+            for neighbor, length, bound in zip(neighbors.tolist(), lengths[start:end].tolist(), bounds.tolist()):
+                neighbor_distance = distance + length
+                if neighbor_distance > cutoff or neighbor_distance >= distances.get(neighbor, math.inf):
+                    continue
+                distances[neighbor] = neighbor_distance
+                if neighbor_distance + bound <= cutoff:
+                    heapq.heappush(heap, (neighbor_distance + bound, neighbor_distance, neighbor))
+        return math.inf